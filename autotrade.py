@@ -1,51 +1,41 @@
+"""
+AI 비트코인 자동매매 봇
+
+사용법:
+    python autotrade.py                     # daemon과 같음 (정해진 시각마다 매매)
+    python autotrade.py daemon
+    python autotrade.py run-once            # 매매 사이클 1회
+    python autotrade.py dry-run             # 분석과 AI 판단까지만 (주문/기록 없음)
+    python autotrade.py reflect             # 결과 라벨 갱신 + 반성 일기 + 교훈 압축
+    python autotrade.py backfill --days 30  # 캔들 캐시와 결과 라벨 채우기
+    python autotrade.py bench               # 시작 시간 벤치마크 (backend/bench_startup.py)
+
+selenium, openai, pandas, ta, pyupbit 같은 무거운 의존성은 해당 기능을 실행하는 함수 안에서만 import합니다.
+"""
 import os
-import requests  # 공포 탐욕 지수 API 호출을 위한 requests 라이브러리
-from dotenv import load_dotenv
-import pyupbit
-import pandas as pd
-import ta  # ta 라이브러리 사용
 import json
-from openai import OpenAI
 import time
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.action_chains import ActionChains
+import asyncio
+import sys
+import argparse
 from datetime import datetime
-import base64
-from pydantic import BaseModel
-from youtube_transcript_api import YouTubeTranscriptApi
-import sqlite3  # SQLite for storing trade data
-import schedule
-import time
+from functools import lru_cache
+from dotenv import load_dotenv
+from scheduler import AsyncScheduler
+
+# backend/의 공용 모듈 사용 (각 함수 안에서 import)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
 
 ## ai 스크립트 바꾸고 스케줄표대로 시간 실행 바꿈
 
 
 load_dotenv()
 
-def fetch_past_reflections():
-    """
-    최근 거래에 대한 reflection 데이터를 가져오는 함수
-    """
-    conn = sqlite3.connect('ai_trading.db')
-    cursor = conn.cursor()
-    
-    # 최근 5개의 reflection 데이터를 가져옴
-    cursor.execute('SELECT reflection FROM trades WHERE reflection IS NOT NULL ORDER BY timestamp DESC LIMIT 5')
-    past_reflections = cursor.fetchall()
-
-    # 가져온 데이터를 정리
-    reflections = [reflection[0] for reflection in past_reflections if reflection[0]]
-    
-    conn.close()
-    return reflections
-
 # SQLite 관련 함수 정의
 def initialize_database():
-    conn = sqlite3.connect('ai_trading.db')  # 데이터베이스 파일 생성/연결
+    from database import get_db_connection
+
+    conn = get_db_connection()  # backend와 같은 파일 (database.DB_PATH, AI_TRADING_DB)
     cursor = conn.cursor()
     
     # 매매 기록 테이블 생성
@@ -67,7 +57,9 @@ def initialize_database():
     conn.close()
 
 def insert_trade(timestamp, decision, reason, percentage, btc_balance, krw_balance, btc_avg_buy_price, btc_krw_price):
-    conn = sqlite3.connect('ai_trading.db')
+    from database import get_db_connection
+
+    conn = get_db_connection()
     cursor = conn.cursor()
 
     # reflection 컬럼을 포함하고 기본값을 NULL로 삽입
@@ -75,42 +67,59 @@ def insert_trade(timestamp, decision, reason, percentage, btc_balance, krw_balan
         INSERT INTO trades (timestamp, decision, reason, percentage, btc_balance, krw_balance, btc_avg_buy_price, btc_krw_price, reflection)
         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
     ''', (timestamp, decision, reason, percentage, btc_balance, krw_balance, btc_avg_buy_price, btc_krw_price, None))  # 기본값 None
+    trade_id = cursor.lastrowid
 
     conn.commit()
     conn.close()
+    return trade_id
 
 
-# SQLite 데이터베이스 초기화
-initialize_database()
+def generate_reflection():
+    import pandas as pd
+    from resilience import openai_client
+    from trade_labels import label_trades, to_epoch_ms
+    from reflection_index import get_reflection_index
+    from sentiment_archive import align_sentiment
+    from database import get_db_connection
 
-from openai import OpenAI
-import json
+    # 구간이 지난 거래의 결과 라벨(ret_1h/4h/24h/72h)을 로컬 캔들로 먼저 채움
+    label_trades(fetch_candles=True)
 
-def generate_reflection():
-    conn = sqlite3.connect('ai_trading.db')
+    conn = get_db_connection()
     cursor = conn.cursor()
 
-    # 최근 매매 기록을 가져옴 (예: 5건)
-    cursor.execute('SELECT * FROM trades ORDER BY timestamp DESC LIMIT 5')
+    # 24시간 결과가 나온 거래 중 아직 반성 일기가 없는 최근 거래 (최대 5건)
+    # 항상 같은 구간의 결과로 평가하므로 실행 시각에 따라 판단 기준이 달라지지 않음
+    cursor.execute('''
+        SELECT id, timestamp, decision, reason, percentage, btc_balance, krw_balance,
+               btc_avg_buy_price, btc_krw_price, ret_1h, ret_4h, ret_24h, ret_72h
+        FROM trades
+        WHERE reflection IS NULL AND ret_24h IS NOT NULL
+        ORDER BY id DESC LIMIT 5
+    ''')
     recent_trades = cursor.fetchall()
 
+    # 거래 당시의 공포-탐욕 지수와 뉴스 (보관소에서 거래 시각 기준 as-of 조회)
+    sentiment = align_sentiment(to_epoch_ms(pd.Series([trade[1] for trade in recent_trades], dtype=object)))
+
     # 최신 시장 데이터를 가져옴
-    current_price = pyupbit.get_current_price("KRW-BTC")
     fear_greed_data = get_fear_and_greed_index()
 
     # AI 클라이언트 초기화
-    client = OpenAI()
+    client = openai_client()
 
-    for trade in recent_trades:
-        trade_id, timestamp, decision, reason, percentage, btc_balance, krw_balance, btc_avg_buy_price, btc_krw_price, reflection = trade
-        
-        # 이미 반성 일기가 존재하는지 확인
-        if reflection:
-            #print(f"Trade {trade_id} already has a reflection, skipping.")
-            continue  # 이미 작성된 경우에는 생략
+    for trade, at_trade in zip(recent_trades, sentiment.itertuples()):
+        trade_id, timestamp, decision, reason, percentage, btc_balance, krw_balance, btc_avg_buy_price, btc_krw_price, *returns = trade
 
-        # 매매 후 BTC 가격 변화 분석
-        price_change = ((current_price - btc_krw_price) / btc_krw_price) * 100
+        # 매매 후 구간별 BTC 가격 변화 (아직 지나지 않은 구간은 N/A)
+        outcome = ", ".join(
+            f"{label}: {ret * 100:.2f}%" if ret is not None else f"{label}: N/A"
+            for label, ret in zip(["1h", "4h", "24h", "72h"], returns)
+        )
+        fear_greed_at_trade = (f"{at_trade.fear_greed} ({at_trade.fear_greed_class})"
+                               if pd.notna(at_trade.fear_greed) else "N/A")
+        headlines_at_trade = ("; ".join(item["title"] for item in at_trade.headlines)
+                              if at_trade.headlines else "N/A")
         
         # AI에게 전달할 메시지 작성
         prompt = f"""
@@ -125,9 +134,10 @@ def generate_reflection():
         KRW balance: {krw_balance}
         BTC average buy price: {btc_avg_buy_price}
         BTC price at trade: {btc_krw_price}
-        Current BTC price: {current_price}
-        Price change since trade: {price_change:.2f}%
-        Fear and Greed Index: {fear_greed_data['value']} ({fear_greed_data['classification']})
+        Price change after the trade: {outcome}
+        Fear and Greed Index at trade time: {fear_greed_at_trade}
+        News headlines at trade time: {headlines_at_trade}
+        Current Fear and Greed Index: {fear_greed_data['value']} ({fear_greed_data['classification']})
 
         Reflect on whether the decision to {decision} was correct or incorrect. Provide suggestions for improving future decisions based on the market conditions and the Fear and Greed Index.
         """
@@ -152,17 +162,30 @@ def generate_reflection():
         ''', (reflection_entry, trade_id))
         print(f"Reflection added for trade {trade_id}: {reflection_entry[:100]}...")  # 일부 출력
 
+        # 검색 인덱스에 바로 반영
+        get_reflection_index().add(trade_id, reflection_entry,
+                                   {"timestamp": timestamp, "decision": decision, "percentage": percentage})
+
     conn.commit()
     conn.close()
 
 
 
-class AIDecision(BaseModel):
-    decision: str  # either "buy", "sell", or "hold"
-    reason: str    # explanation of the decision
-    percentage: int
+@lru_cache(maxsize=None)
+def get_decision_model():
+    """AI 응답 모델 (pydantic은 판단이 필요할 때만 import)"""
+    from pydantic import BaseModel
+
+    class AIDecision(BaseModel):
+        decision: str  # either "buy", "sell", or "hold"
+        reason: str    # explanation of the decision
+        percentage: int
+
+    return AIDecision
 
 def get_youtube_transcript(video_id):
+    from youtube_transcript_api import YouTubeTranscriptApi
+
     try:
         transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
         transcript = transcript_list.find_transcript(['ko'])  # Fetch Korean transcript
@@ -175,8 +198,14 @@ def get_youtube_transcript(video_id):
 
 
 def capture_chart_image():
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.common.action_chains import ActionChains
 
     # ## 로컬용
+    # from webdriver_manager.chrome import ChromeDriverManager
     # # 크롬 옵션 설정
     # chrome_options = Options()
     # chrome_options.add_argument("--headless")  # 브라우저를 보이지 않게 실행
@@ -239,226 +268,100 @@ def capture_chart_image():
         time.sleep(1)  # 지표 적용 후 기다림
 
         screenshot_png = driver.get_screenshot_as_png()  # 스크린샷을 PNG 바이너리로 얻음
-        encoded_image = base64.b64encode(screenshot_png).decode('utf-8')  # Base64로 인코딩
         print("screenshot saved")
 
-        
-        return encoded_image
+        # 크롭/축소/재압축은 prepare_chart()에서
+        return screenshot_png
 
     finally:
         # 드라이버 종료
         driver.quit()
 
 
-def get_latest_news():
+def get_fear_and_greed_index():
     """
-    SerpApi를 사용하여 최신 뉴스 헤드라인과 시간 정보를 가져오는 함수 (최대 5개)
+    공포 탐욕 지수 (판단 서비스 캐시 공유, backend/decision_service.py)
     """
-    api_key = os.getenv("SERP_API_KEY")  # .env 파일에 저장된 API 키 사용
-    params = {
-        "q": "btc",  # 비트코인 관련 최신 뉴스 검색어 변경
-        "tbm": "nws",  # 뉴스 모드
-        "api_key": api_key,
-    }
-    url = "https://serpapi.com/search.json"
-    
-    try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()  # HTTP 에러 발생 시 예외 발생
-        news_data = response.json()
-
-        # 뉴스 헤드라인과 시간 정보를 가져옴
-        headlines_with_time = [
-            (news['title'], news.get('date', 'No date information')) 
-            for news in news_data.get('news_results', [])
-        ]
-        return headlines_with_time[:5]  # 최대 5개의 뉴스만 반환
-
-    except requests.exceptions.HTTPError as http_err:
-        print(f"HTTP error occurred: {http_err}")  # HTTP 에러 처리
-    except Exception as err:
-        print(f"An error occurred: {err}")  # 일반 에러 처리
-    return None
+    from decision_service import get_decision_service
 
-def get_fear_and_greed_index():
-    """
-    공포 탐욕 지수를 API로부터 가져오는 함수
+    return get_decision_service().fear_greed()
+
+# AI 자동매매 시스템 함수
+def prepare_chart():
     """
-    url = "https://api.alternative.me/fng/?limit=1"
-    try:
-        response = requests.get(url)
-        response.raise_for_status()  # HTTP 에러 발생 시 예외 발생
-        data = response.json()
-        fear_greed_value = data['data'][0]['value']
-        fear_greed_classification = data['data'][0]['value_classification']
-        return {
-            'value': fear_greed_value,
-            'classification': fear_greed_classification
-        }
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching Fear and Greed Index: {e}")
-        return None
+    차트 스크린샷을 전송용으로 변환, prepare_chart_image 결과 반환
 
-def add_technical_indicators(df):
+    직전에 보낸 차트와 지각적으로 같으면 이미지를 보내지 않습니다 (chart_image.py).
+    기준 해시는 판단이 성공한 뒤에 저장합니다 (ai_trading).
     """
-    주어진 데이터프레임에 보조지표 추가 (ta 라이브러리 사용)
+    from chart_image import prepare_chart_image
+
+    prepared = prepare_chart_image(capture_chart_image())
+    saved_bytes = prepared["original_bytes"] - prepared["bytes"]
+    saved_tokens = (prepared["original_tokens"] - prepared["tokens"]) if prepared["original_tokens"] else 0
+    if prepared["skipped"]:
+        print(f"Chart image unchanged (hash distance {prepared['distance']}), not sent: "
+              f"saved {saved_bytes:,} bytes, {saved_tokens} tokens")
+    else:
+        print(f"Chart image: {prepared['original_bytes']:,} -> {prepared['bytes']:,} bytes, "
+              f"{prepared['original_tokens']} -> {prepared['tokens']} tokens (detail={prepared['detail']}): "
+              f"saved {saved_bytes:,} bytes, {saved_tokens} tokens")
+    return prepared
+
+def ai_trading(dry_run=False, capture_chart=True):
     """
-    # NaN 값이 있는 행을 제거
-    df = df.dropna()
-
-    # Bollinger Bands
-    bb_indicator = ta.volatility.BollingerBands(close=df["close"], window=20, window_dev=2)
-    df['bb_mavg'] = bb_indicator.bollinger_mavg()
-    df['bb_hband'] = bb_indicator.bollinger_hband()
-    df['bb_lband'] = bb_indicator.bollinger_lband()
+    매매 사이클 1회
 
-    # RSI
-    df['rsi'] = ta.momentum.RSIIndicator(close=df['close'], window=14).rsi()
-
-    # MACD
-    macd_indicator = ta.trend.MACD(close=df['close'], window_slow=26, window_fast=12, window_sign=9)
-    df['macd'] = macd_indicator.macd()
-    df['macd_signal'] = macd_indicator.macd_signal()
-    df['macd_diff'] = macd_indicator.macd_diff()
-
-    # Simple Moving Average (SMA 20)
-    df['sma_20'] = ta.trend.SMAIndicator(close=df['close'], window=20).sma_indicator()
-
-    # Exponential Moving Average (EMA 12)
-    df['ema_12'] = ta.trend.EMAIndicator(close=df['close'], window=12).ema_indicator()
-
-    return df
+    Args:
+        dry_run: AI 판단까지만 하고 주문, 거래 기록, 반성 일기는 건너뜀
+        capture_chart: False면 차트 이미지(selenium) 없이 판단
+    """
+    import resilience
+    from execution import ExecutionEngine, link_execution_to_trade
+    from snapshots import link_snapshot_to_trade
+    from paper_exchange import get_exchange
+    from lessons import compact_reflections
+    from decision_service import request_decision
+    from risk import get_risk_engine
+    from chart_image import commit_chart_hash
 
-# AI 자동매매 시스템 함수
-def ai_trading():
     # Upbit 객체 생성
-    access = os.getenv("UPBIT_ACCESS_KEY")
-    secret = os.getenv("UPBIT_SECRET_KEY")
-    upbit = pyupbit.Upbit(access, secret)
+    # TRADING_MODE=paper 이면 모의 거래소 (backend/paper_exchange.py)
+    upbit = get_exchange()
 
-    # 1. 현재 투자 상태 조회
+    # 1. 현재 투자 상태 조회 (주문을 내는 이 프로세스의 거래소 기준)
     all_balances = upbit.get_balances()
-    filtered_balances = [balance for balance in all_balances if balance['currency'] in ['BTC', 'KRW']]
-    
-    # 2. 오더북(호가 데이터) 조회
-    orderbook = pyupbit.get_orderbook("KRW-BTC")
-    
-    # 3. 차트 데이터 조회 및 보조지표 추가
-    # 30일 일봉 데이터
-    df_daily = pyupbit.get_ohlcv("KRW-BTC", interval="day", count=30)
-    df_daily = add_technical_indicators(df_daily)  # 일봉 데이터에 보조지표 추가
-    
-    # 24시간 시간봉 데이터
-    df_hourly = pyupbit.get_ohlcv("KRW-BTC", interval="minute60", count=24)
-    df_hourly = add_technical_indicators(df_hourly)  # 시간봉 데이터에 보조지표 추가
 
-    # 4. 공포 탐욕 지수 가져오기
-    fear_greed_data = get_fear_and_greed_index()
-    if fear_greed_data is not None:
-        print(f"Fear and Greed Index: {fear_greed_data['value']} ({fear_greed_data['classification']})")
-    
-    # 5. 최신 뉴스 헤드라인과 시간 정보 가져오기
-    latest_news = get_latest_news()
-    if latest_news:
-        print("Latest Bitcoin News Headlines:")
-        for i, (headline, date) in enumerate(latest_news, 1):
-            print(f"{i}. {headline} (Published on: {date})")
-
-    # 6. 차트 이미지 Base64 가져오기 (1번 코드 활용)
-    chart_image_base64 = capture_chart_image()
-
-    # 7. Fetch YouTube transcript data
-    # youtube_transcript = get_youtube_transcript("KSsA92e0GK8")
-    # if youtube_transcript:
-    #     print("YouTube Transcript Data:")
-    #     print(youtube_transcript)
-    f = open("strategy.txt", "r", encoding="utf-8")
-    youtube_transcript = f.read()
-    f.close()
-
-
-    # 8. 과거 매매에 대한 reflection 데이터를 가져옴
-    past_reflections = fetch_past_reflections()
-
-
-    # AI에게 데이터 제공하고 판단 받기
-    client = OpenAI()
-
-    response = client.chat.completions.create(
-    model="gpt-4o-2024-08-06",
-    messages=[
-        {
-            "role": "system",
-            "content": """You are an expert in Bitcoin investing. Analyze the provided data including technical indicators, the Fear and Greed Index, and the latest Bitcoin news headlines. Tell me whether to buy, sell, or hold at the moment. Consider the following indicators in your analysis:
-            - Bollinger Bands (bb_mavg, bb_hband, bb_lband)
-            - RSI (rsi)
-            - MACD (macd, macd_signal, macd_diff)
-            - Moving Averages (sma_20, ema_12)
-            - Fear and Greed Index (value, classification)
-            - Latest Bitcoin News Headlines with publication time
-            - YouTube Transcript Data
-            - Chart Data (Image)
-            - Past Trade Reflections: {past_reflections}
-
-            My main objective is to make money from this trade, so please make a buy or sell decision based on this objective.
-            Keep in mind that it is currently overbought due to the US election. The market may be overheated, but Bitcoin is getting a lot of attention.
-            
-            Respond in JSON format with three fields: 'decision', 'reason', and 'percentage'. 
-            The 'percentage' field should be a number between 0 and 100, 
-            representing the percentage of your available KRW to use for a 'buy' decision or the percentage of your BTC to sell for a 'sell' decision."""
-        },
-        {
-            "role": "user",
-            "content": [
-                {
-                    "type": "text",
-                    "text": (
-                        f"Current investment status: {json.dumps(filtered_balances)}\n"
-                        f"Orderbook: {json.dumps(orderbook)}\n"
-                        f"Daily OHLCV with indicators (30 days): {df_daily.to_json()}\n"
-                        f"Hourly OHLCV with indicators (24 hours): {df_hourly.to_json()}\n"
-                        f"Fear and Greed Index: {fear_greed_data}\n"
-                        f"Latest News Headlines: {latest_news}\n"
-                        f"YouTube Transcript: {youtube_transcript}"
-                    ),
-
-                    #"text": f"Current investment status: {json.dumps(filtered_balances)}\nOrderbook: {json.dumps(orderbook)}\nDaily OHLCV with indicators (30 days): {df_daily.to_json()}\nHourly OHLCV with indicators (24 hours): {df_hourly.to_json()}\nFear and Greed Index: {fear_greed_data}\nLatest News Headlines: {latest_news}\nYouTube Transcript: {youtube_transcript}",
-                },
-                {
-                    "type": "image_url",
-                    "image_url": {
-                        "url": f"data:image/png;base64,{chart_image_base64}"
-                    }
-                }
-            ]
-        }
-    ],
-    response_format={
-            "type": "json_schema",
-            "json_schema": {
-                "name": "BitcoinInvestmentDecision",  # Adding a name to the schema
-                "strict": True,
-                "schema": {
-                    "type": "object",
-                    "properties": {
-                        "decision": {"type": "string", "enum": ["buy", "sell", "hold"]},
-                        "reason": {"type": "string"},
-                        "percentage": {"type": "integer"}
-                    },
-                    "required": ["decision", "reason", "percentage"],
-                    "additionalProperties": False
-                }
-            }
-        }
-    )
+    # 2. 차트 이미지 Base64 가져오기 (크롭/축소 후 변화가 없으면 생략)
+    chart = prepare_chart() if capture_chart else None
+
+    # 3. 호가, 캔들+보조지표, 공포 탐욕 지수, 뉴스, strategy.txt, 과거 reflection을 모아 AI 판단
+    # 대시보드 AI 분석과 같은 판단 서비스 사용 (backend/decision_service.py, 입력 캐시 공유)
+    decision = request_decision(balances=all_balances,
+                                chart_image=chart["image"] if chart else None,
+                                chart_detail=chart["detail"] if chart else None,
+                                chart_unchanged_since=chart["unchanged_since"] if chart else None)
+    snapshot_id = decision["snapshot_id"]
+
     # Getting structured response
-    result = AIDecision.model_validate_json(response.choices[0].message.content)
+    result = get_decision_model().model_validate(decision)
+
+    # 모델이 이미지를 보고 판단했으므로 이번 이미지를 다음 비교 기준으로 저장
+    if chart and not chart["skipped"] and chart["hash"]:
+        commit_chart_hash(chart["hash"])
 
     print(f"### AI Decision: {result.decision.upper()} ###")
     print(f"### Reason: {result.reason} ###")
 
+    if dry_run:
+        print(f"### Dry run: {result.decision} {result.percentage}% - 주문과 거래 기록을 건너뜁니다 ###")
+        return result
+
     # Handling AI's decision
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    # 호가를 보고 시장가/지정가/분할 주문 중 선택 (AI 응답을 기다리는 동안 호가가 바뀌었으므로 다시 조회)
+    engine = ExecutionEngine(upbit)
+    execution = None
 
     # Handling AI's decision
     if result.decision == "buy":
@@ -469,8 +372,15 @@ def ai_trading():
         if 0 <= percentage <= 100:
             amount_to_buy = my_krw * (percentage / 100) * 0.9995
             if amount_to_buy > 5000:  # Ensure minimum order size
-                print(f"### Buy Order Executed: {amount_to_buy} KRW worth of BTC ###")
-                print(upbit.buy_market_order("KRW-BTC", amount_to_buy))
+                orderbook = engine.fetch_orderbook()
+                check = get_risk_engine().check("buy", amount_to_buy, orderbook, my_krw, upbit.get_balance("BTC"))
+                if check["allowed"]:
+                    amount_to_buy = check["amount"]
+                    execution = engine.execute("buy", amount_to_buy, orderbook=orderbook)
+                    print(f"### Buy Order Executed: {amount_to_buy} KRW worth of BTC "
+                          f"({execution['plan']['strategy']}, realized {execution['realized_price']}) ###")
+                else:
+                    print("### Buy Order Rejected by risk limits ###")
             else:
                 print("### Buy Order Failed: Insufficient KRW (less than 5000 KRW) ###")
         else:
@@ -483,12 +393,18 @@ def ai_trading():
         # Ensure the percentage is between 0 and 100
         if 0 <= percentage <= 100:
             amount_to_sell = my_btc * (percentage / 100)
-            current_price = pyupbit.get_orderbook(ticker="KRW-BTC")['orderbook_units'][0]["ask_price"]
-            value_in_krw = amount_to_sell * current_price  # Convert BTC to KRW value
+            orderbook = engine.fetch_orderbook()
+            value_in_krw = orderbook.estimate_sell(amount_to_sell)["krw"]  # 매수호가를 따라 체결될 예상 금액
 
             if value_in_krw > 5000:  # Ensure minimum order size
-                print(f"### Sell Order Executed: {amount_to_sell} BTC worth of {value_in_krw} KRW ###")
-                print(upbit.sell_market_order("KRW-BTC", amount_to_sell))
+                check = get_risk_engine().check("sell", amount_to_sell, orderbook, upbit.get_balance("KRW"), my_btc)
+                if check["allowed"]:
+                    amount_to_sell = check["amount"]
+                    execution = engine.execute("sell", amount_to_sell, orderbook=orderbook)
+                    print(f"### Sell Order Executed: {amount_to_sell} BTC "
+                          f"({execution['plan']['strategy']}, realized {execution['realized_price']}) ###")
+                else:
+                    print("### Sell Order Rejected by risk limits ###")
             else:
                 print("### Sell Order Failed: Insufficient BTC (less than 5000 KRW worth) ###")
         else:
@@ -503,23 +419,181 @@ def ai_trading():
     btc_balance = next((float(balance['balance']) for balance in balances if balance['currency'] == 'BTC'), 0)
     krw_balance = next((float(balance['balance']) for balance in balances if balance['currency'] == 'KRW'), 0)
     btc_avg_buy_price = next((float(balance['avg_buy_price']) for balance in balances if balance['currency'] == 'BTC'), 0)
-    current_btc_price = pyupbit.get_current_price("KRW-BTC")
+    current_btc_price = resilience.get_current_price("KRW-BTC")
 
     # 거래 정보 로깅
-    insert_trade(timestamp, result.decision, result.reason,  result.percentage,
+    trade_id = insert_trade(timestamp, result.decision, result.reason,  result.percentage,
               btc_balance, krw_balance, btc_avg_buy_price, current_btc_price)
+    if execution is not None:
+        link_execution_to_trade(execution["execution_id"], trade_id)
+    if snapshot_id is not None:
+        link_snapshot_to_trade(snapshot_id, trade_id)
     
     # 매매 후 반성 일기 작성
     generate_reflection()
 
+    # 이전 실행 이후 쌓인 반성 일기를 교훈으로 압축 (MIN_BATCH개 이상일 때만)
+    try:
+        compaction = compact_reflections()
+        if compaction["processed"]:
+            print(f"Compacted {compaction['processed']} reflections into {compaction['updated']} lessons")
+    except Exception as e:
+        print(f"Reflection compaction failed: {e}")
+
 # Define multiple times to run the ai_trading function
 scheduled_times = ["09:00", "14:00", "18:00"]  # 원하는 시간을 추가
 
-# Schedule ai_trading function for each time in scheduled_times
-for scheduled_time in scheduled_times:
-    schedule.every().day.at(scheduled_time).do(ai_trading)
-
-# Run the scheduler
-while True:
-    schedule.run_pending()
-    time.sleep(60)  # Check every minute if it's time to run the function
+def initialize_all():
+    """SQLite 데이터베이스와 backend 테이블 초기화"""
+    from execution import initialize_execution_table
+    from ledger import initialize_ledger_tables
+    from lessons import initialize_lesson_tables
+    from candle_cache import initialize_candle_table
+    from trade_labels import initialize_label_columns
+    from sentiment_archive import initialize_sentiment_tables
+    from snapshots import initialize_snapshot_tables
+    from chart_image import initialize_chart_image_table
+    from model_router import initialize_model_call_table
+    from risk import initialize_risk_tables
+
+    initialize_database()
+    initialize_execution_table()
+    initialize_ledger_tables()
+    initialize_lesson_tables()
+    initialize_candle_table()
+    initialize_label_columns()
+    initialize_sentiment_tables()
+    initialize_snapshot_tables()
+    initialize_chart_image_table()
+    initialize_model_call_table()
+    initialize_risk_tables()
+
+def run_daemon(args):
+    initialize_all()
+
+    # 사이클이 길어져도 다음 시각과 겹치지 않도록 skip, 30분 넘게 걸리면 실패로 기록
+    scheduler = AsyncScheduler()
+    scheduler.add_daily_job(ai_trading, scheduled_times, overlap="skip", timeout=30 * 60)
+
+    # Run the scheduler
+    asyncio.run(scheduler.run())
+
+def run_once(args):
+    initialize_all()
+    ai_trading(capture_chart=not args.no_chart)
+
+def run_dry(args):
+    initialize_all()
+    ai_trading(dry_run=True, capture_chart=not args.no_chart)
+
+def run_reflect(args):
+    from lessons import compact_reflections
+
+    initialize_all()
+    generate_reflection()
+    compaction = compact_reflections(force=args.force)
+    print(f"Compacted {compaction['processed']} reflections into {compaction['updated']} lessons")
+
+def run_backfill(args):
+    from candle_cache import backfill_range
+    from trade_labels import label_trades
+    from sentiment_archive import backfill_fear_greed
+
+    initialize_all()
+    print(f"Backfilled Fear and Greed Index: {backfill_fear_greed(full=args.full_fear_greed)} days")
+    since = int((time.time() - args.days * 86400) * 1000)
+    for interval in args.intervals:
+        pages = backfill_range(interval, since, max_pages=args.max_pages)
+        print(f"Backfilled {interval}: {pages} pages")
+    labels = label_trades()
+    print(f"Labeled {labels['labeled']} outcomes for {labels['pending']} pending trades")
+
+def run_replay(args):
+    """저장된 스냅샷으로 당시 프롬프트를 다시 만들고, --run이면 모델을 다시 호출해 판단 비교"""
+    from snapshots import load_snapshot, replay_messages, get_storage_stats
+
+    initialize_all()
+    if args.stats:
+        print(json.dumps(get_storage_stats(), indent=2))
+        return
+
+    snapshot = load_snapshot(snapshot_id=args.snapshot, trade_id=args.trade)
+    if snapshot is None:
+        sys.exit("Snapshot not found")
+
+    messages, identical = replay_messages(snapshot)
+    print(f"Snapshot {snapshot['id']} (trade {snapshot['trade_id']}, {snapshot['created_at']}, {snapshot['model']})")
+    print(f"Prompt rebuilt: {'identical' if identical else 'DIFFERENT from the original'}")
+    print(f"Original response: {snapshot['response']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(messages, f, ensure_ascii=False, indent=2)
+        print(f"Messages written to {args.output}")
+
+    if args.run:
+        from resilience import openai_client
+        from decision_prompt import RESPONSE_FORMAT
+
+        response = openai_client().chat.completions.create(
+            model=args.model or snapshot["model"],
+            messages=messages,
+            response_format=RESPONSE_FORMAT,
+        )
+        print(f"Replayed response: {response.choices[0].message.content}")
+
+def run_bench(args):
+    from bench_startup import main as bench_main
+
+    bench_main(repeat=args.repeat, output=args.output)
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="AI Bitcoin auto trading")
+    subparsers = parser.add_subparsers(dest="command")
+
+    subparsers.add_parser("daemon", help="정해진 시각마다 매매 (기본값)").set_defaults(func=run_daemon)
+
+    for name, func, help_text in [
+        ("run-once", run_once, "매매 사이클 1회 실행"),
+        ("dry-run", run_dry, "분석과 AI 판단만 (주문/기록 없음)"),
+    ]:
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument("--no-chart", action="store_true", help="차트 이미지 캡처 생략")
+        sub.set_defaults(func=func)
+
+    reflect = subparsers.add_parser("reflect", help="결과 라벨 갱신 + 반성 일기 + 교훈 압축")
+    reflect.add_argument("--force", action="store_true", help="일기 수가 적어도 압축 실행")
+    reflect.set_defaults(func=run_reflect)
+
+    backfill = subparsers.add_parser("backfill", help="캔들 캐시, 공포-탐욕 지수 이력, 결과 라벨 채우기")
+    backfill.add_argument("--days", type=int, default=30)
+    backfill.add_argument("--intervals", nargs="+", default=["minute60", "day"])
+    backfill.add_argument("--max-pages", type=int, default=50)
+    backfill.add_argument("--full-fear-greed", action="store_true", help="공포-탐욕 지수 전체 이력 다시 받기")
+    backfill.set_defaults(func=run_backfill)
+
+    replay = subparsers.add_parser("replay", help="판단 입력 스냅샷으로 당시 프롬프트 재현")
+    target = replay.add_mutually_exclusive_group(required=True)
+    target.add_argument("--snapshot", type=int, help="스냅샷 ID")
+    target.add_argument("--trade", type=int, help="거래 ID (연결된 스냅샷)")
+    target.add_argument("--stats", action="store_true", help="스냅샷 저장 용량")
+    replay.add_argument("--output", help="재현한 메시지를 JSON으로 저장할 파일")
+    replay.add_argument("--run", action="store_true", help="모델을 다시 호출해 판단 비교")
+    replay.add_argument("--model", help="--run에 사용할 모델 (기본: 당시 모델)")
+    replay.set_defaults(func=run_replay)
+
+    bench = subparsers.add_parser("bench", help="시작 시간 벤치마크")
+    bench.add_argument("--repeat", type=int, default=5)
+    bench.add_argument("--output", help="결과를 JSON Lines로 추가할 파일")
+    bench.set_defaults(func=run_bench)
+
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command is None:
+        args.func = run_daemon
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
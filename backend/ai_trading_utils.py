@@ -2,61 +2,17 @@
 AI 거래 분석 및 실행을 위한 유틸리티 함수들
 autotrade.py의 로직을 API 형태로 제공
 """
-import os
 from dotenv import load_dotenv
-import pyupbit
 import pandas as pd
-import requests
-from openai import OpenAI
 from datetime import datetime
-from typing import Dict, Optional
-import json
+from typing import Dict
 
-load_dotenv()
-
-# OpenAI 클라이언트 초기화
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from execution import ExecutionEngine
+from paper_exchange import get_exchange
+from decision_service import request_decision
+from risk import get_risk_engine
 
-def get_fear_and_greed_index() -> Optional[Dict]:
-    """공포-탐욕 지수 조회"""
-    try:
-        url = "https://api.alternative.me/fng/?limit=1"
-        response = requests.get(url, timeout=10)
-        data = response.json()
-
-        if 'data' in data and len(data['data']) > 0:
-            return {
-                'value': int(data['data'][0]['value']),
-                'classification': data['data'][0]['value_classification']
-            }
-    except Exception as e:
-        print(f"공포-탐욕 지수 조회 실패: {e}")
-    return None
-
-def get_bitcoin_news() -> str:
-    """최신 비트코인 뉴스 조회"""
-    try:
-        serp_api_key = os.getenv("SERP_API_KEY")
-        if not serp_api_key:
-            return "뉴스 API 키가 설정되지 않았습니다."
-
-        url = "https://serpapi.com/search.json"
-        params = {
-            "q": "btc",
-            "tbm": "nws",
-            "api_key": serp_api_key
-        }
-
-        response = requests.get(url, params=params, timeout=10)
-        data = response.json()
-
-        news_results = data.get("news_results", [])
-        headlines = [item.get("title", "") for item in news_results[:5]]
-
-        return "\n".join(headlines) if headlines else "뉴스를 가져올 수 없습니다."
-    except Exception as e:
-        print(f"뉴스 조회 실패: {e}")
-        return "뉴스 조회에 실패했습니다."
+load_dotenv()
 
 def calculate_technical_indicators(df: pd.DataFrame) -> Dict:
     """기술적 지표 계산"""
@@ -102,7 +58,7 @@ def calculate_technical_indicators(df: pd.DataFrame) -> Dict:
 
 def get_ai_trading_decision(include_balance: bool = False) -> Dict:
     """
-    AI 거래 분석 실행
+    AI 거래 분석 실행 (autotrade.py와 같은 판단 서비스, decision_service.py)
 
     Args:
         include_balance: True면 실제 잔고 정보 포함, False면 분석만
@@ -113,118 +69,59 @@ def get_ai_trading_decision(include_balance: bool = False) -> Dict:
             'reason': '의사결정 근거',
             'percentage': 0-100,
             'current_price': 현재가,
-            'confidence': 신뢰도(선택)
+            'timestamp': 분석 시각,
+            'snapshot_id': 입력 스냅샷 ID
         }
+        분석에 실패하면 'error': True인 hold 결과 (거래 실행/기록 대상이 아님)
     """
     try:
-        # 1. 현재 시장 데이터 수집
-        current_price = pyupbit.get_current_price("KRW-BTC")
-
-        # 2. OHLCV 데이터
-        df_daily = pyupbit.get_ohlcv("KRW-BTC", interval="day", count=30)
-        df_hourly = pyupbit.get_ohlcv("KRW-BTC", interval="minute60", count=24)
-
-        # 3. 기술적 지표 계산
-        indicators = calculate_technical_indicators(df_daily)
-
-        # 4. 공포-탐욕 지수
-        fear_greed = get_fear_and_greed_index()
-
-        # 5. 뉴스
-        news = get_bitcoin_news()
-
-        # 6. 잔고 정보 (선택적)
-        balance_info = ""
+        # 잔고 정보 (선택적)
+        balances = None
         if include_balance:
             try:
-                access = os.getenv("UPBIT_ACCESS_KEY")
-                secret = os.getenv("UPBIT_SECRET_KEY")
-                if access and secret:
-                    upbit = pyupbit.Upbit(access, secret)
+                upbit = get_exchange()
+                if upbit is not None:
                     balances = upbit.get_balances()
-
-                    btc_balance = 0
-                    krw_balance = 0
-                    btc_avg_buy_price = 0
-
-                    for b in balances:
-                        if b['currency'] == 'BTC':
-                            btc_balance = float(b['balance'])
-                            btc_avg_buy_price = float(b['avg_buy_price'])
-                        elif b['currency'] == 'KRW':
-                            krw_balance = float(b['balance'])
-
-                    balance_info = f"\n현재 보유 자산:\n- BTC: {btc_balance:.8f} (평균 매입가: {btc_avg_buy_price:,.0f}원)\n- KRW: {krw_balance:,.0f}원"
             except Exception as e:
                 print(f"잔고 조회 실패: {e}")
 
-        # 7. AI 프롬프트 구성
-        # 헬퍼 함수: 숫자를 포맷팅하거나 'N/A' 반환
-        def format_value(val):
-            return f"{val:,.0f}" if val is not None else "N/A"
-
-        prompt = f"""
-당신은 비트코인 투자 전문가입니다. 아래 데이터를 분석하여 투자 결정을 내려주세요.
-
-## 현재 시장 상황
-- 현재 BTC 가격: {current_price:,.0f}원
-- 공포-탐욕 지수: {fear_greed['value'] if fear_greed else 'N/A'} ({fear_greed['classification'] if fear_greed else 'N/A'})
-
-## 기술적 지표
-- RSI (14): {format_value(indicators.get('rsi'))}
-- MACD: {format_value(indicators.get('macd'))}
-- MACD Signal: {format_value(indicators.get('macd_signal'))}
-- 볼린저 밴드 상단: {format_value(indicators.get('bb_upper'))}
-- 볼린저 밴드 중간: {format_value(indicators.get('bb_middle'))}
-- 볼린저 밴드 하단: {format_value(indicators.get('bb_lower'))}
-- SMA (20일): {format_value(indicators.get('sma_20'))}
-- EMA (12일): {format_value(indicators.get('ema_12'))}
-
-## 최신 뉴스
-{news}
-
-{balance_info}
-
-다음 형식으로 답변해주세요:
-{{
-    "decision": "buy" 또는 "sell" 또는 "hold",
-    "reason": "상세한 분석 근거 (2-3문장)",
-    "percentage": 0-100 사이의 숫자 (매수/매도 시 자산의 몇 %를 사용할지)
-}}
-
-주의사항:
-- RSI가 30 이하면 과매도(매수 고려), 70 이상이면 과매수(매도 고려)
-- MACD가 시그널선을 상향 돌파하면 매수 신호, 하향 돌파하면 매도 신호
-- 공포-탐욕 지수가 낮을수록 매수 기회, 높을수록 매도 고려
-- 볼린저 밴드 하단 근처는 매수, 상단 근처는 매도 고려
-"""
-
-        # 8. OpenAI API 호출
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "당신은 비트코인 투자 전문가입니다. 데이터를 분석하여 JSON 형식으로만 답변하세요."},
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"}
-        )
-
-        result = json.loads(response.choices[0].message.content)
-        result['current_price'] = current_price
-        result['timestamp'] = datetime.now().isoformat()
-
-        return result
+        return request_decision(balances=balances)
 
     except Exception as e:
         print(f"AI 분석 실패: {e}")
+        # 오류 경로에서는 외부 조회를 하지 않음 (같은 장애로 다시 실패할 수 있음)
         return {
             'decision': 'hold',
             'reason': f'AI 분석 중 오류 발생: {str(e)}',
             'percentage': 0,
-            'current_price': pyupbit.get_current_price("KRW-BTC"),
-            'timestamp': datetime.now().isoformat()
+            'current_price': None,
+            'timestamp': datetime.now().isoformat(),
+            'error': True
         }
 
+def _execution_result(execution: Dict, message: str) -> Dict:
+    """ExecutionEngine 결과를 execute_trade 응답 형식으로 변환"""
+    plan = execution['plan']
+    message += f" ({plan['strategy']}, 예상 체결가 {plan['expected_price']:,.0f}원"
+    if execution['realized_price']:
+        message += f", 실제 체결가 {execution['realized_price']:,.0f}원"
+    message += ")"
+    return {
+        'success': execution['status'] != 'failed',
+        'message': message if execution['status'] != 'failed' else f"주문 실패: {execution['orders']}",
+        'order_info': execution['orders'],
+        'execution_id': execution['execution_id'],
+        'strategy': plan['strategy'],
+        'expected_price': plan['expected_price'],
+        'expected_slippage_bps': plan['expected_slippage_bps'],
+        'realized_price': execution['realized_price'],
+        'realized_slippage_bps': execution['realized_slippage_bps']
+    }
+
+def _risk_rejection(check: Dict) -> Dict:
+    reason = "; ".join(v['message'] for v in check['violations'])
+    return {'success': False, 'message': f'리스크 한도로 주문 거부: {reason}', 'order_info': None, 'risk': check}
+
 def execute_trade(decision: str, percentage: int) -> Dict:
     """
     실제 거래 실행
@@ -241,17 +138,19 @@ def execute_trade(decision: str, percentage: int) -> Dict:
         }
     """
     try:
-        access = os.getenv("UPBIT_ACCESS_KEY")
-        secret = os.getenv("UPBIT_SECRET_KEY")
+        # TRADING_MODE=paper 이면 모의 거래소
+        upbit = get_exchange()
 
-        if not access or not secret:
+        if upbit is None:
             return {
                 'success': False,
                 'message': 'Upbit API 키가 설정되지 않았습니다.',
                 'order_info': None
             }
 
-        upbit = pyupbit.Upbit(access, secret)
+        # 주문 크기 검증과 예상 체결가 계산에 같은 호가 스냅샷 사용
+        engine = ExecutionEngine(upbit)
+        orderbook = engine.fetch_orderbook()
 
         if decision == "buy":
             # 매수
@@ -264,13 +163,14 @@ def execute_trade(decision: str, percentage: int) -> Dict:
             if amount_to_buy < 5000:
                 return {'success': False, 'message': f'주문 금액이 최소 금액(5,000원)보다 작습니다. (금액: {amount_to_buy:,.0f}원)', 'order_info': None}
 
-            order = upbit.buy_market_order("KRW-BTC", amount_to_buy)
+            check = get_risk_engine().check("buy", amount_to_buy, orderbook, krw, upbit.get_balance("BTC") or 0.0,
+                                            source="api")
+            if not check['allowed']:
+                return _risk_rejection(check)
+            amount_to_buy = check['amount']
 
-            return {
-                'success': True,
-                'message': f'매수 주문 완료: {amount_to_buy:,.0f}원',
-                'order_info': order
-            }
+            execution = engine.execute("buy", amount_to_buy, orderbook=orderbook)
+            return _execution_result(execution, f'매수 주문 완료: {amount_to_buy:,.0f}원')
 
         elif decision == "sell":
             # 매도
@@ -279,19 +179,22 @@ def execute_trade(decision: str, percentage: int) -> Dict:
                 return {'success': False, 'message': 'BTC 잔고 조회 실패', 'order_info': None}
 
             amount_to_sell = btc * (percentage / 100)
-            current_price = pyupbit.get_current_price("KRW-BTC")
-            value_in_krw = amount_to_sell * current_price
+            estimate = orderbook.estimate_sell(amount_to_sell)
+            value_in_krw = estimate['krw']
 
             if value_in_krw < 5000:
                 return {'success': False, 'message': f'주문 금액이 최소 금액(5,000원)보다 작습니다. (금액: {value_in_krw:,.0f}원)', 'order_info': None}
 
-            order = upbit.sell_market_order("KRW-BTC", amount_to_sell)
+            check = get_risk_engine().check("sell", amount_to_sell, orderbook, upbit.get_balance("KRW") or 0.0, btc,
+                                            source="api")
+            if not check['allowed']:
+                return _risk_rejection(check)
+            if check['amount'] != amount_to_sell:
+                amount_to_sell = check['amount']
+                value_in_krw = orderbook.estimate_sell(amount_to_sell)['krw']
 
-            return {
-                'success': True,
-                'message': f'매도 주문 완료: {amount_to_sell:.8f} BTC (약 {value_in_krw:,.0f}원)',
-                'order_info': order
-            }
+            execution = engine.execute("sell", amount_to_sell, orderbook=orderbook)
+            return _execution_result(execution, f'매도 주문 완료: {amount_to_sell:.8f} BTC (약 {value_in_krw:,.0f}원)')
 
         else:  # hold
             return {
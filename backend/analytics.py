@@ -0,0 +1,234 @@
+"""
+거래 성과 분석
+거래 기록(trades), 원장 체결(fills), 캔들 캐시(candles)를 한 번에 읽어 NumPy/pandas 벡터 연산으로 계산합니다.
+
+- 결정(buy/sell/hold) 이후 구간별 수익률과 적중률, 비중(percentage) 구간별 적중률
+- 평가액 곡선 기반 최대 낙폭, 샤프/소르티노 비율, BTC 노출 비율, 회전율
+
+구간별 수익률은 trades의 라벨 컬럼(trade_labels.py)을 우선 사용하고, 비어 있으면 캔들로 계산합니다.
+결과는 (마지막 거래 ID, 마지막 체결 ID, 마지막 1시간 캔들, 라벨 수)가 바뀔 때까지 캐시합니다.
+"""
+import threading
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from database import get_db_connection, table_exists
+from trade_labels import (
+    HOUR_MS, HORIZONS, LABEL_COLUMNS, forward_returns,
+    has_label_columns, get_label_version, to_epoch_ms
+)
+
+# hold 결정은 이 범위 안에서 움직였으면 적중으로 봄
+HOLD_BAND = 0.01
+
+PERCENTAGE_BUCKETS = [0, 10, 30, 60, 101]
+PERCENTAGE_LABELS = ["0-9", "10-29", "30-59", "60-100"]
+
+PRICE_INTERVAL = "minute60"
+HOURS_PER_YEAR = 24 * 365
+
+_cache: Dict = {"key": None, "result": None}
+_cache_lock = threading.Lock()
+
+# ==================== 데이터 로드 ====================
+
+def _cache_key(conn) -> Tuple:
+    trade_id = conn.execute("SELECT MAX(id) FROM trades").fetchone()[0]
+    fill_id = conn.execute("SELECT MAX(id) FROM fills").fetchone()[0] if table_exists(conn, "fills") else None
+    candle_ts = None
+    if table_exists(conn, "candles"):
+        candle_ts = conn.execute("SELECT MAX(ts) FROM candles WHERE interval = ?", (PRICE_INTERVAL,)).fetchone()[0]
+    return trade_id, fill_id, candle_ts, get_label_version(conn)
+
+def _load_frames(conn) -> Tuple[pd.DataFrame, pd.DataFrame, Optional[pd.DataFrame]]:
+    labels = "".join(f", {c}" for c in LABEL_COLUMNS) if has_label_columns(conn) else ""
+    trades = pd.read_sql_query(f'''
+        SELECT id, timestamp, decision, percentage, btc_balance, krw_balance, btc_krw_price{labels}
+        FROM trades ORDER BY timestamp, id
+    ''', conn)
+    # timestamp는 KST 문자열 → epoch 밀리초
+    trades["ts"] = to_epoch_ms(trades["timestamp"])
+
+    candles = pd.DataFrame(columns=["ts", "close"])
+    if table_exists(conn, "candles") and len(trades):
+        candles = pd.read_sql_query('''
+            SELECT ts, close FROM candles
+            WHERE interval = ? AND ts >= ?
+            ORDER BY ts
+        ''', conn, params=(PRICE_INTERVAL, int(trades["ts"].iloc[0]) - HOUR_MS))
+
+    fills = None
+    if table_exists(conn, "fills"):
+        fills = pd.read_sql_query("SELECT funds FROM fills", conn)
+
+    return trades, candles, fills
+
+# ==================== 계산 ====================
+
+def _price_series(trades: pd.DataFrame, candles: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """1시간 캔들 종가(캔들이 끝나는 시각)와 거래 시점 가격을 합친 시간순 가격 시계열"""
+    ts = np.concatenate([candles["ts"].to_numpy(np.int64) + HOUR_MS, trades["ts"].to_numpy(np.int64)])
+    price = np.concatenate([candles["close"].to_numpy(np.float64), trades["btc_krw_price"].to_numpy(np.float64)])
+    order = np.argsort(ts, kind="stable")
+    ts, price = ts[order], price[order]
+    keep = np.r_[ts[1:] != ts[:-1], True]  # 같은 시각이면 뒤의 값
+    return ts[keep], price[keep]
+
+def _hits(decisions: np.ndarray, ret: np.ndarray) -> np.ndarray:
+    """결정별 적중 여부 (buy: 상승, sell: 하락, hold: ±HOLD_BAND 이내), 수익률이 없으면 NaN"""
+    hit = np.select(
+        [decisions == "buy", decisions == "sell", decisions == "hold"],
+        [ret > 0, ret < 0, np.abs(ret) <= HOLD_BAND],
+        default=False,
+    ).astype(np.float64)
+    hit[np.isnan(ret)] = np.nan
+    return hit
+
+def _decision_table(df: pd.DataFrame, group: str) -> Dict:
+    """group별 표본 수, 평균 수익률, 적중률 (구간별)"""
+    grouped = df.groupby(group, observed=True)
+    table = {}
+    for key, part in grouped:
+        entry = {"count": int(len(part))}
+        for label in HORIZONS:
+            ret = part[f"ret_{label}"]
+            n = int(ret.notna().sum())
+            entry[label] = {
+                "n": n,
+                "mean_return": float(ret.mean()) * 100 if n else None,
+                "hit_rate": float(part[f"hit_{label}"].mean()) * 100 if n else None,
+            }
+        table[str(key)] = entry
+    return table
+
+def equity_curve(trades: pd.DataFrame, price_ts: np.ndarray, price: np.ndarray) -> pd.DataFrame:
+    """각 가격 시점의 평가액 (직전 거래 기록의 잔고를 그 시점 가격으로 평가)"""
+    trade_ts = trades["ts"].to_numpy(np.int64)
+    mask = price_ts >= trade_ts[0]
+    ts, px = price_ts[mask], price[mask]
+    idx = np.searchsorted(trade_ts, ts, side="right") - 1
+    btc = trades["btc_balance"].to_numpy(np.float64)[idx]
+    krw = trades["krw_balance"].to_numpy(np.float64)[idx]
+    btc_value = btc * px
+    return pd.DataFrame({"ts": ts, "equity": krw + btc_value, "btc_value": btc_value})
+
+def risk_metrics(curve: pd.DataFrame) -> Dict:
+    """최대 낙폭, 샤프/소르티노 (연율화, 무위험 수익률 0), BTC 노출 비율"""
+    equity = curve["equity"].to_numpy(np.float64)
+    ts = curve["ts"].to_numpy(np.int64)
+    if len(equity) < 2 or np.any(equity <= 0):
+        return {"max_drawdown": None, "sharpe": None, "sortino": None, "exposure": None}
+
+    peak = np.maximum.accumulate(equity)
+    drawdown = equity / peak - 1
+    trough = int(np.argmin(drawdown))
+    peak_at = int(np.argmax(equity[:trough + 1])) if trough > 0 else 0
+
+    returns = np.diff(equity) / equity[:-1]
+    spacing_hours = np.median(np.diff(ts)) / HOUR_MS
+    periods_per_year = HOURS_PER_YEAR / spacing_hours if spacing_hours > 0 else HOURS_PER_YEAR
+    std = returns.std(ddof=1) if len(returns) > 1 else 0.0
+    downside = np.minimum(returns, 0)
+    downside_std = np.sqrt(np.mean(downside ** 2))
+    mean = returns.mean()
+
+    # 노출 비율은 시간 가중 (각 시점의 비중이 다음 시점까지 유지)
+    weights = np.diff(ts).astype(np.float64)
+    exposure = float(np.sum((curve["btc_value"].to_numpy()[:-1] / equity[:-1]) * weights) / weights.sum())
+
+    return {
+        "max_drawdown": float(drawdown[trough]) * 100,
+        "max_drawdown_peak_ts": int(ts[peak_at]),
+        "max_drawdown_trough_ts": int(ts[trough]),
+        "sharpe": float(mean / std * np.sqrt(periods_per_year)) if std > 0 else None,
+        "sortino": float(mean / downside_std * np.sqrt(periods_per_year)) if downside_std > 0 else None,
+        "exposure": exposure * 100,
+        "total_return": float(equity[-1] / equity[0] - 1) * 100,
+    }
+
+def turnover_metrics(trades: pd.DataFrame, curve: pd.DataFrame, fills: Optional[pd.DataFrame]) -> Dict:
+    """거래 금액 합계와 평균 평가액 대비 회전율 (원장이 있으면 실제 체결 금액 기준)"""
+    if fills is not None and len(fills):
+        traded = float(fills["funds"].sum())
+        source = "ledger"
+    else:
+        btc = trades["btc_balance"].to_numpy(np.float64)
+        traded = float(np.sum(np.abs(np.diff(btc)) * trades["btc_krw_price"].to_numpy(np.float64)[1:]))
+        source = "snapshots"
+
+    avg_equity = float(curve["equity"].mean()) if len(curve) else 0.0
+    span_years = (curve["ts"].iloc[-1] - curve["ts"].iloc[0]) / HOUR_MS / HOURS_PER_YEAR if len(curve) > 1 else 0
+    turnover = traded / avg_equity if avg_equity > 0 else None
+    return {
+        "traded_krw": traded,
+        "turnover": turnover,
+        "annual_turnover": float(turnover / span_years) if turnover is not None and span_years > 0 else None,
+        "source": source,
+    }
+
+def compute_analytics(trades: pd.DataFrame, candles: pd.DataFrame, fills: Optional[pd.DataFrame] = None) -> Dict:
+    """거래/캔들/체결 데이터로 전체 분석 결과 계산"""
+    if trades.empty:
+        return {"trade_count": 0, "horizons": list(HORIZONS)}
+
+    price_ts, price = _price_series(trades, candles)
+    decisions = trades["decision"].to_numpy()
+
+    df = pd.DataFrame({
+        "decision": decisions,
+        "bucket": pd.cut(trades["percentage"], PERCENTAGE_BUCKETS, right=False, labels=PERCENTAGE_LABELS),
+    })
+    returns = forward_returns(trades["ts"].to_numpy(np.int64), trades["btc_krw_price"].to_numpy(np.float64),
+                              price_ts, price)
+    for label, ret in returns.items():
+        # trade_labels.py가 저장한 라벨이 있으면 그 값을 사용
+        if f"ret_{label}" in trades:
+            stored = trades[f"ret_{label}"].astype(np.float64).to_numpy()
+            ret = np.where(np.isnan(stored), ret, stored)
+        df[f"ret_{label}"] = ret
+        df[f"hit_{label}"] = _hits(decisions, ret)
+
+    active = df[df["decision"] != "hold"]
+    by_bucket = {
+        decision: _decision_table(active[active["decision"] == decision], "bucket")
+        for decision in ("buy", "sell")
+    }
+
+    curve = equity_curve(trades, price_ts, price)
+
+    return {
+        "trade_count": int(len(trades)),
+        "first_trade_ts": int(trades["ts"].iloc[0]),
+        "last_trade_ts": int(trades["ts"].iloc[-1]),
+        "horizons": list(HORIZONS),
+        "hold_band": HOLD_BAND * 100,
+        "by_decision": _decision_table(df, "decision"),
+        "by_percentage": by_bucket,
+        "risk": risk_metrics(curve),
+        "turnover": turnover_metrics(trades, curve, fills),
+        "price_points": int(len(price_ts)),
+    }
+
+def get_analytics() -> Dict:
+    """분석 결과 조회 (새 거래/체결/캔들이 없으면 캐시 반환)"""
+    conn = get_db_connection()
+    try:
+        if not table_exists(conn, "trades"):
+            return compute_analytics(pd.DataFrame(), pd.DataFrame())
+
+        key = _cache_key(conn)
+        with _cache_lock:
+            if _cache["key"] == key:
+                return _cache["result"]
+
+        trades, candles, fills = _load_frames(conn)
+    finally:
+        conn.close()
+
+    result = compute_analytics(trades, candles, fills)
+    with _cache_lock:
+        _cache["key"] = key
+        _cache["result"] = result
+    return result
@@ -0,0 +1,54 @@
+"""
+비동기 실행 유틸리티
+pyupbit, sqlite3, OpenAI 같은 블로킹 호출을 이벤트 루프 밖의 스레드 풀에서 실행합니다.
+"""
+import os
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+import httpx
+
+from resilience import HTTP_TIMEOUT
+
+# 일반 I/O (시세 조회, DB 조회) 용 스레드 풀
+IO_WORKERS = int(os.getenv("BLOCKING_IO_WORKERS", "8"))
+# AI 분석 용 스레드 풀 (수 초씩 걸리는 OpenAI 호출이 시세 조회 스레드를 점유하지 않도록 분리)
+AI_WORKERS = int(os.getenv("AI_WORKERS", "2"))
+
+_io_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="blocking-io")
+_ai_executor = ThreadPoolExecutor(max_workers=AI_WORKERS, thread_name_prefix="ai-call")
+
+# 외부 HTTP API 호출용 비동기 클라이언트 (startup 시 생성)
+_http_client: httpx.AsyncClient = None
+
+
+async def run_blocking(func: Callable, *args, **kwargs) -> Any:
+    """블로킹 함수를 I/O 스레드 풀에서 실행"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_io_executor, functools.partial(func, *args, **kwargs))
+
+
+async def run_ai(func: Callable, *args, **kwargs) -> Any:
+    """AI 분석처럼 오래 걸리는 블로킹 함수를 전용 스레드 풀에서 실행"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_ai_executor, functools.partial(func, *args, **kwargs))
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """공용 비동기 HTTP 클라이언트 반환 (없으면 생성)"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(timeout=HTTP_TIMEOUT)
+    return _http_client
+
+
+async def shutdown():
+    """HTTP 클라이언트와 스레드 풀 정리"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+    _io_executor.shutdown(wait=False)
+    _ai_executor.shutdown(wait=False)
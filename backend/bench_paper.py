@@ -0,0 +1,73 @@
+"""
+모의 거래소 재생 벤치마크
+합성 호가에 대해 매수/매도 사이클을 반복해 초당 처리 가능한 사이클 수를 측정합니다.
+
+사용법:
+    python bench_paper.py            # 기본 10,000 사이클
+    python bench_paper.py 50000
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+
+import database
+from execution import ExecutionEngine, initialize_execution_table
+from ledger import initialize_ledger_tables, get_ledger_state
+from paper_exchange import PaperUpbit, SyntheticOrderbook
+
+def run_cycles(exchange: PaperUpbit, n: int, trade) -> float:
+    random.seed(0)
+    started = time.perf_counter()
+    for _ in range(n):
+        if random.random() < 0.5:
+            trade("buy", exchange.get_balance("KRW") * random.uniform(0.05, 0.5) * 0.9995)
+        else:
+            trade("sell", exchange.get_balance("BTC") * random.uniform(0.05, 1.0))
+    return time.perf_counter() - started
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+
+    # 1) 거래소 직접 호출 (시장가 + 체결 조회)
+    exchange = PaperUpbit(krw=100_000_000, orderbook_source=SyntheticOrderbook(seed=1))
+
+    def direct(side, amount):
+        order = (exchange.buy_market_order("KRW-BTC", amount) if side == "buy"
+                 else exchange.sell_market_order("KRW-BTC", amount))
+        if "uuid" in order:
+            exchange.get_order(order["uuid"])
+
+    elapsed = run_cycles(exchange, n, direct)
+    print(f"{'시장가 주문 + 체결 조회':<36} {n / elapsed:>10,.0f} cycles/s")
+
+    # 2) 실행 엔진 전체 (호가 분석, 전략 선택, 체결 추적, executions 기록)
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, "bench.db")
+        initialize_execution_table()
+        initialize_ledger_tables()
+        exchange = PaperUpbit(krw=100_000_000, orderbook_source=SyntheticOrderbook(seed=1))
+        engine = ExecutionEngine(exchange, sleep=lambda seconds: None, order_timeout=0)
+
+        def via_engine(side, amount):
+            if (amount if side == "buy" else amount * 1e8) >= 5000:
+                engine.execute(side, amount)
+
+        m = max(n // 10, 1)
+        elapsed = run_cycles(exchange, m, via_engine)
+        print(f"{'ExecutionEngine (DB 기록 포함)':<36} {m / elapsed:>10,.0f} cycles/s")
+
+        started = time.perf_counter()
+        state = get_ledger_state()
+        print(f"{'원장 전체 재계산':<36} {(time.perf_counter() - started) * 1000:>10.1f} ms")
+        started = time.perf_counter()
+        get_ledger_state()
+        print(f"{'원장 증분 갱신 (새 체결 없음)':<36} {(time.perf_counter() - started) * 1000:>10.1f} ms")
+        print(f"원장 BTC {state.position:.8f} / KRW {state.cash:,.0f} / 실현 손익 {state.realized_pnl:,.0f}원 / 수수료 {state.fees:,.0f}원")
+
+    balances = {b["currency"]: b["balance"] for b in exchange.get_balances()}
+    print(f"최종 잔고: {balances}")
+
+if __name__ == "__main__":
+    main()
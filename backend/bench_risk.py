@@ -0,0 +1,84 @@
+"""
+리스크 검사 벤치마크
+원장(fills)에 체결이 쌓여 있을 때 주문 검사 한 번에 걸리는 시간을 측정합니다.
+매번 원장을 조회하는 방식과 RiskEngine의 증분 갱신 방식을 비교합니다.
+
+사용법:
+    python bench_risk.py            # 기본 체결 10,000건, 검사 10,000회
+    python bench_risk.py 100000 20000
+"""
+import os
+import sys
+import time
+import tempfile
+from datetime import datetime, timedelta
+
+import database
+from database import get_db_connection
+from ledger import initialize_ledger_tables
+from orderbook_analytics import OrderbookSnapshot
+from risk import RiskEngine, RiskLimits, initialize_risk_tables
+
+def make_orderbook(price: float = 90_000_000) -> OrderbookSnapshot:
+    return OrderbookSnapshot(
+        ask_prices=[price + 1000 * (i + 1) for i in range(15)],
+        ask_sizes=[0.5] * 15,
+        bid_prices=[price - 1000 * i for i in range(15)],
+        bid_sizes=[0.5] * 15,
+    )
+
+def insert_fills(n: int):
+    start = datetime.now() - timedelta(days=30)
+    conn = get_db_connection()
+    conn.executemany('''
+        INSERT INTO fills (order_uuid, seq, filled_at, side, price, volume, funds, fee)
+        VALUES (?, 0, ?, ?, 90000000, 0.001, 90000, 45)
+    ''', [(f"bench-{i}", (start + timedelta(minutes=4 * i)).isoformat(sep=" ", timespec="seconds"),
+           "buy" if i % 2 else "sell") for i in range(n)])
+    conn.commit()
+    conn.close()
+
+def scan_check(conn, limits: RiskLimits, amount: float, orderbook: OrderbookSnapshot) -> bool:
+    """비교용: 검사할 때마다 원장을 조회"""
+    today = datetime.now().strftime("%Y-%m-%d")
+    row = conn.execute('''
+        SELECT MAX(filled_at) AS last_fill_at,
+               SUM(CASE WHEN filled_at >= ? THEN funds ELSE 0 END) AS turnover
+        FROM fills
+    ''', (today,)).fetchone()
+    depth = float((orderbook.ask_prices * orderbook.ask_sizes).sum())
+    return amount <= depth * limits.max_depth_share and row["turnover"] is not None
+
+def main():
+    n_fills = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    n_checks = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+    limits = RiskLimits(cooldown_seconds=0, daily_loss_pct=0)
+    orderbook = make_orderbook()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, "bench.db")
+        initialize_ledger_tables()
+        initialize_risk_tables()
+        insert_fills(n_fills)
+
+        conn = get_db_connection()
+        started = time.perf_counter()
+        for _ in range(n_checks):
+            scan_check(conn, limits, 1_000_000, orderbook)
+        elapsed = time.perf_counter() - started
+        conn.close()
+        print(f"{'원장 조회 후 검사':<24} {elapsed / n_checks * 1e6:>10,.1f} µs/check")
+
+        engine = RiskEngine(limits)
+        started = time.perf_counter()
+        engine.check("buy", 1_000_000, orderbook, 10_000_000, 0.1)
+        print(f"{'RiskEngine 첫 검사 (전체 반영)':<24} {(time.perf_counter() - started) * 1e6:>10,.1f} µs")
+
+        started = time.perf_counter()
+        for _ in range(n_checks):
+            engine.check("buy", 1_000_000, orderbook, 10_000_000, 0.1)
+        elapsed = time.perf_counter() - started
+        print(f"{'RiskEngine 증분 검사':<24} {elapsed / n_checks * 1e6:>10,.1f} µs/check")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+직렬화 / 압축 벤치마크
+대표 응답(거래 내역 500건, 캔들 200개, 대시보드 스냅샷)과 1초 주기 WebSocket 메시지에 대해
+인코딩별 전송 바이트와 메시지당 CPU 시간을 측정합니다.
+
+사용법:
+    python bench_serialization.py            # WebSocket 메시지 기본 5,000개
+    python bench_serialization.py 20000
+"""
+import sys
+import json
+import time
+import zlib
+import random
+from datetime import datetime, timedelta
+
+import serialization
+from serialization import dumps, orjson, brotli, msgpack
+
+def synthetic_trades(n: int = 500):
+    start = datetime(2024, 1, 1)
+    return [
+        {
+            "id": n - i,
+            "timestamp": (start + timedelta(hours=n - i)).strftime("%Y-%m-%d %H:%M:%S"),
+            "decision": random.choice(["buy", "sell", "hold"]),
+            "reason_preview": "RSI와 MACD, 볼린저 밴드, 공포-탐욕 지수를 종합적으로 고려한 판단입니다. "[:random.randint(40, 60)],
+            "percentage": random.randint(0, 100),
+            "btc_balance": round(random.uniform(0, 1), 8),
+            "krw_balance": round(random.uniform(0, 1e7), 2),
+            "btc_avg_buy_price": round(random.uniform(5e7, 9e7)),
+            "btc_krw_price": round(random.uniform(5e7, 9e7)),
+        }
+        for i in range(n)
+    ]
+
+def synthetic_candles(n: int = 200):
+    ts = 1_700_000_000_000
+    price = 7e7
+    candles = []
+    for i in range(n):
+        price *= 1 + random.gauss(0, 0.005)
+        candles.append({
+            "ts": ts + i * 3_600_000, "open": price, "high": price * 1.003, "low": price * 0.997,
+            "close": price * (1 + random.gauss(0, 0.002)), "volume": random.uniform(10, 300),
+        })
+    return {"interval": "minute60", "count": n, "data": candles}
+
+def market_messages(n: int, binary: bool):
+    """/ws/market 메시지 (json은 ISO 시각, msgpack은 epoch 밀리초)"""
+    now = datetime(2024, 1, 1)
+    price = 70_000_000.0
+    for i in range(n):
+        price += random.choice([-1000, 0, 1000])
+        moment = now + timedelta(seconds=i)
+        data = ({"price": price, "ts": int(moment.timestamp() * 1000)} if binary
+                else {"price": price, "timestamp": moment.isoformat()})
+        yield {"type": "market_update", "data": data}
+
+def per_call_us(fn, value, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(value)
+    return (time.perf_counter() - started) / repeat * 1e6
+
+def stdlib_json(value) -> bytes:
+    """starlette JSONResponse와 같은 설정"""
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+class PerMessageDeflate:
+    """RFC 7692 permessage-deflate (컨텍스트 유지, 메시지마다 sync flush 후 꼬리 4바이트 제거)"""
+
+    def __init__(self):
+        self._compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+
+    def __call__(self, data: bytes) -> bytes:
+        return (self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH))[:-4]
+
+def gzip_bytes(data: bytes, level: int) -> bytes:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+def bench_rest():
+    payloads = {
+        "trades x500": synthetic_trades(),
+        "candles x200": synthetic_candles(),
+        "dashboard": {"sections": {"trades": synthetic_trades(20), "candles": synthetic_candles(24)}},
+    }
+    encoders = [("json", stdlib_json)]
+    if orjson is not None:
+        encoders.append(("orjson", dumps))
+
+    print("REST 응답 직렬화")
+    print(f"{'payload':<14} {'encoder':<8} {'bytes':>9} {'us/call':>10}")
+    for name, payload in payloads.items():
+        for encoder_name, encode in encoders:
+            print(f"{name:<14} {encoder_name:<8} {len(encode(payload)):>9,} {per_call_us(encode, payload, 50):>10,.1f}")
+
+    compressors = [
+        ("gzip-6", lambda b: gzip_bytes(b, 6)),
+        ("gzip-9", lambda b: gzip_bytes(b, 9)),
+    ]
+    if brotli is not None:
+        compressors.append((f"br-{serialization.BROTLI_QUALITY}",
+                            lambda b: brotli.compress(b, quality=serialization.BROTLI_QUALITY)))
+
+    print("\nREST 응답 압축")
+    print(f"{'payload':<14} {'encoding':<8} {'bytes':>9} {'ratio':>7} {'us/call':>10}")
+    for name, payload in payloads.items():
+        raw = dumps(payload)
+        print(f"{name:<14} {'identity':<8} {len(raw):>9,} {1:>7.2f} {0:>10.1f}")
+        for compressor_name, compress in compressors:
+            size = len(compress(raw))
+            print(f"{name:<14} {compressor_name:<8} {size:>9,} {len(raw) / size:>7.2f} "
+                  f"{per_call_us(compress, raw, 50):>10,.1f}")
+
+def bench_websocket(n: int):
+    cases = [("json (send_json)", False, stdlib_json, False)]
+    if orjson is not None:
+        cases.append(("orjson", False, dumps, False))
+    cases.append(("json + deflate", False, dumps, True))
+    if msgpack is not None:
+        cases.append(("msgpack", True, msgpack.packb, False))
+        cases.append(("msgpack + deflate", True, msgpack.packb, True))
+
+    print(f"\nWebSocket /ws/market 메시지 {n:,}개")
+    print(f"{'encoding':<20} {'bytes/msg':>10} {'us/msg':>8}")
+    for name, binary, encode, deflate in cases:
+        random.seed(0)
+        messages = list(market_messages(n, binary))
+        compress = PerMessageDeflate() if deflate else None
+        total = 0
+        started = time.perf_counter()
+        for message in messages:
+            frame = encode(message)
+            if compress is not None:
+                frame = compress(frame)
+            total += len(frame)
+        elapsed = time.perf_counter() - started
+        print(f"{name:<20} {total / n:>10.1f} {elapsed / n * 1e6:>8.2f}")
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    random.seed(0)
+    print(f"orjson: {'O' if orjson else 'X'}, brotli: {'O' if brotli else 'X'}, msgpack: {'O' if msgpack else 'X'}\n")
+    bench_rest()
+    bench_websocket(n)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+autotrade.py 시작 시간 벤치마크
+새 파이썬 프로세스에서 각 경로를 실행하는 데 걸리는 시간(중앙값)을 측정합니다.
+
+사용법:
+    python bench_startup.py                       # 기본 5회 반복
+    python bench_startup.py 10 startup.jsonl      # 10회 반복, 결과를 JSON Lines로 추가 기록
+    python ../autotrade.py bench --output startup.jsonl
+"""
+import os
+import sys
+import json
+import time
+import statistics
+import subprocess
+from datetime import datetime
+from typing import Dict, Optional
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+CASES = [
+    ("python 인터프리터", "pass"),
+    ("import autotrade", "import autotrade"),
+    ("CLI 인자 파싱", "import autotrade; autotrade.build_parser().parse_args(['dry-run'])"),
+    # 참고: 예전처럼 모듈 로드 시 전부 import했을 때의 비용
+    ("매매 경로 의존성 (openai, pandas, ta, pyupbit)", "import openai, pandas, ta, pyupbit"),
+    ("차트 경로 의존성 (selenium)", "import selenium.webdriver"),
+]
+
+def measure(code: str, repeat: int) -> Optional[float]:
+    """새 프로세스에서 code를 실행하는 데 걸린 시간의 중앙값 (밀리초), 실패하면 None"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, "-c", code], cwd=ROOT,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        elapsed = (time.perf_counter() - started) * 1000
+        if result.returncode != 0:
+            return None
+        timings.append(elapsed)
+    return statistics.median(timings)
+
+def main(repeat: int = 5, output: Optional[str] = None) -> Dict[str, Optional[float]]:
+    results = {}
+    for name, code in CASES:
+        results[name] = measure(code, repeat)
+        value = f"{results[name]:>10.1f} ms" if results[name] is not None else "  (설치 안 됨)"
+        print(f"{name:<44} {value}")
+
+    if output:
+        with open(output, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"at": datetime.now().isoformat(timespec="seconds"),
+                                "repeat": repeat, "results": results}, ensure_ascii=False) + "\n")
+    return results
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5, sys.argv[2] if len(sys.argv) > 2 else None)
@@ -0,0 +1,107 @@
+"""
+거래 내역 조회 벤치마크
+대량의 합성 거래 데이터로 OFFSET/전체 컬럼 조회와 keyset/필드 선택 조회를 비교합니다.
+
+사용법:
+    python bench_trades.py            # 기본 100,000건
+    python bench_trades.py 500000     # 건수 지정
+"""
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta
+
+import database
+
+LIST_FIELDS = ["id", "timestamp", "decision", "reason_preview", "percentage",
+               "btc_balance", "krw_balance", "btc_avg_buy_price", "btc_krw_price"]
+
+def create_synthetic_db(path: str, n: int):
+    """긴 reason/reflection 텍스트를 가진 합성 거래 데이터 생성"""
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE trades (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT, decision TEXT, reason TEXT, percentage INTEGER,
+            btc_balance REAL, krw_balance REAL, btc_avg_buy_price REAL,
+            btc_krw_price REAL, reflection TEXT
+        )
+    ''')
+    start = datetime(2020, 1, 1)
+    paragraph = "RSI와 MACD, 볼린저 밴드, 공포-탐욕 지수를 종합적으로 고려한 판단입니다. " * 20
+    rows = (
+        (
+            (start + timedelta(hours=i)).strftime("%Y-%m-%d %H:%M:%S"),
+            random.choice(["buy", "sell", "hold"]),
+            paragraph[:random.randint(300, 800)],
+            random.randint(0, 100),
+            random.random(), random.random() * 1e7, 9e7, 9e7 + random.random() * 1e7,
+            paragraph * 3
+        )
+        for i in range(n)
+    )
+    conn.executemany('''
+        INSERT INTO trades (timestamp, decision, reason, percentage, btc_balance,
+                            krw_balance, btc_avg_buy_price, btc_krw_price, reflection)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
+    conn.commit()
+    conn.close()
+
+def measure(label: str, func, repeat: int = 5):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    size = len(json.dumps(result, ensure_ascii=False).encode()) if not isinstance(result, int) else result
+    print(f"{label:<44} {best * 1000:>9.2f} ms {size / 1024:>10.1f} KB")
+
+def offset_page(offset: int, limit: int = 100):
+    """기존 방식: SELECT * + OFFSET"""
+    conn = database.get_db_connection()
+    rows = conn.execute(
+        "SELECT * FROM trades ORDER BY timestamp DESC LIMIT ? OFFSET ?", (limit, offset)
+    ).fetchall()
+    conn.close()
+    return [dict(row) for row in rows]
+
+def keyset_cursor_at(offset: int) -> str:
+    """offset 위치의 keyset 커서 (측정 대상 아님)"""
+    conn = database.get_db_connection()
+    row = conn.execute(
+        "SELECT id, timestamp FROM trades ORDER BY timestamp DESC, id DESC LIMIT 1 OFFSET ?", (offset - 1,)
+    ).fetchone()
+    conn.close()
+    return database.encode_trade_cursor(dict(row))
+
+def export_size() -> int:
+    return sum(len(chunk) for chunk in database.iter_trades_json(fields=LIST_FIELDS))
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, "bench.db")
+        print(f"합성 거래 데이터 {n:,}건 생성 중...")
+        create_synthetic_db(database.DB_PATH, n)
+        database.initialize_trade_indexes()
+
+        deep = n // 2
+        cursor = keyset_cursor_at(deep)
+
+        print(f"\n{'':<44} {'best':>12} {'payload':>13}")
+        measure("첫 페이지 SELECT * (기존)", lambda: database.get_all_trades(limit=100))
+        measure("첫 페이지 목록 필드", lambda: database.get_all_trades(limit=100, fields=LIST_FIELDS))
+        measure(f"{deep:,}번째 페이지 OFFSET + SELECT *", lambda: offset_page(deep))
+        measure(f"{deep:,}번째 페이지 keyset + 목록 필드",
+                lambda: database.get_all_trades(limit=100, cursor=cursor, fields=LIST_FIELDS))
+        measure("전체 내보내기 스트리밍 (목록 필드)", export_size, repeat=1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+OHLCV 캔들 로컬 캐시
+pyupbit에서 받은 캔들을 SQLite에 저장해 두고, 이미 가진 구간은 다시 요청하지 않습니다.
+타임스탬프는 캔들 시작 시각의 epoch 밀리초(ts)로 저장합니다.
+"""
+import math
+import time
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+from database import get_db_connection
+from resilience import get_ohlcv
+
+TICKER = "KRW-BTC"
+KST = ZoneInfo("Asia/Seoul")
+
+# 한 번에 반환하는 최대 캔들 수 (pyupbit 1회 요청 한도)
+MAX_PAGE_SIZE = 200
+
+# 같은 interval을 다시 갱신하기까지의 최소 간격 (초)
+REFRESH_SECONDS = 5
+
+VALID_INTERVALS = ["minute1", "minute3", "minute5", "minute10", "minute15",
+                   "minute30", "minute60", "minute240", "day", "week", "month"]
+
+CANDLE_COLUMNS = ["ts", "open", "high", "low", "close", "volume", "value"]
+
+_refresh_locks: Dict[str, threading.Lock] = {interval: threading.Lock() for interval in VALID_INTERVALS}
+_last_refresh: Dict[str, float] = {}
+
+def interval_seconds(interval: str) -> int:
+    """캔들 하나의 길이 (초). week/month는 최소 길이로 계산"""
+    if interval.startswith("minute"):
+        return int(interval[len("minute"):]) * 60
+    return {"day": 86400, "week": 7 * 86400, "month": 28 * 86400}[interval]
+
+def initialize_candle_table():
+    """candles 테이블 생성"""
+    conn = get_db_connection()
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS candles (
+            interval TEXT NOT NULL,
+            ts INTEGER NOT NULL,
+            open REAL NOT NULL,
+            high REAL NOT NULL,
+            low REAL NOT NULL,
+            close REAL NOT NULL,
+            volume REAL NOT NULL,
+            value REAL,
+            PRIMARY KEY (interval, ts)
+        ) WITHOUT ROWID
+    ''')
+    conn.commit()
+    conn.close()
+
+def ts_to_kst_string(ts: int) -> str:
+    """epoch 밀리초 → pyupbit 인덱스와 같은 KST 문자열"""
+    return datetime.fromtimestamp(ts / 1000, KST).strftime("%Y-%m-%d %H:%M:%S")
+
+def _index_to_ts(index) -> int:
+    """pyupbit 인덱스(KST naive) → epoch 밀리초"""
+    return int(index.tz_localize(KST).timestamp() * 1000)
+
+def _to_param(ts: int) -> str:
+    """epoch 밀리초 → Upbit API의 to 파라미터 (UTC 기준, 해당 시각 미포함)"""
+    return datetime.fromtimestamp(ts / 1000, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+def _store_frame(interval: str, df) -> int:
+    """pyupbit DataFrame을 캐시에 저장 (이미 있는 캔들은 최신 값으로 덮어씀)"""
+    if df is None or len(df) == 0:
+        return 0
+
+    rows = [
+        (
+            interval,
+            _index_to_ts(index),
+            float(row.open), float(row.high), float(row.low), float(row.close),
+            float(row.volume),
+            float(row.value) if "value" in df.columns else None
+        )
+        for index, row in zip(df.index, df.itertuples(index=False))
+    ]
+
+    conn = get_db_connection()
+    conn.executemany('''
+        INSERT OR REPLACE INTO candles (interval, ts, open, high, low, close, volume, value)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
+    conn.commit()
+    conn.close()
+    return len(rows)
+
+def _latest_ts(interval: str) -> Optional[int]:
+    conn = get_db_connection()
+    row = conn.execute("SELECT MAX(ts) AS ts FROM candles WHERE interval = ?", (interval,)).fetchone()
+    conn.close()
+    return row["ts"]
+
+def _oldest_ts(interval: str) -> Optional[int]:
+    conn = get_db_connection()
+    row = conn.execute("SELECT MIN(ts) AS ts FROM candles WHERE interval = ?", (interval,)).fetchone()
+    conn.close()
+    return row["ts"]
+
+def refresh_latest(interval: str, min_count: int = MAX_PAGE_SIZE):
+    """
+    최신 캔들 갱신
+
+    캐시의 마지막 캔들 이후에 생긴 캔들 수(+ 아직 진행 중인 마지막 캔들)만 요청합니다.
+    서버가 오래 멈춰 빈 구간이 한 페이지(MAX_PAGE_SIZE)보다 길면 마지막 캔들에 닿을 때까지
+    이전 페이지를 이어서 받습니다.
+    """
+    with _refresh_locks[interval]:
+        if time.time() - _last_refresh.get(interval, 0) < REFRESH_SECONDS:
+            return
+
+        latest = _latest_ts(interval)
+        if latest is None:
+            _store_frame(interval, get_ohlcv(TICKER, interval=interval, count=max(min_count, 1), stale=False))
+            _last_refresh[interval] = time.time()
+            return
+
+        until = None
+        while True:
+            end = until / 1000 if until is not None else time.time()
+            missing = int((end - latest / 1000) // interval_seconds(interval)) + 1
+            count = max(1, min(MAX_PAGE_SIZE, missing))
+            if until is None:
+                df = get_ohlcv(TICKER, interval=interval, count=count, stale=False)
+            else:
+                df = get_ohlcv(TICKER, interval=interval, count=count, to=_to_param(until),
+                               stale=False, allow_none=True)
+            if df is None or len(df) == 0:
+                break
+            _store_frame(interval, df)
+
+            oldest = _index_to_ts(df.index[0])
+            if oldest <= latest or (until is not None and oldest >= until):
+                break  # 빈 구간을 다 채웠거나 더 이전 캔들이 없음
+            until = oldest
+        _last_refresh[interval] = time.time()
+
+def backfill_before(interval: str, until: int, count: int):
+    """until(epoch 밀리초) 이전 캔들을 count개 받아 캐시에 저장"""
+    _store_frame(interval, get_ohlcv(TICKER, interval=interval, count=count, to=_to_param(until),
+                                     stale=False, allow_none=True))
+
+def backfill_range(interval: str, since: int, max_pages: int = 50) -> int:
+    """최신 캔들을 갱신하고 since(epoch 밀리초)까지 과거 캔들을 채움, 받은 과거 페이지 수 반환"""
+    refresh_latest(interval)
+    pages = 0
+    while pages < max_pages:
+        oldest = _oldest_ts(interval)
+        if oldest is None or oldest <= since:
+            break
+        backfill_before(interval, oldest, MAX_PAGE_SIZE)
+        pages += 1
+        if _oldest_ts(interval) == oldest:
+            break  # 더 이전 캔들이 없음
+    return pages
+
+def query_candles(interval: str, count: int, since: Optional[int] = None,
+                  until: Optional[int] = None) -> List[Dict]:
+    """
+    캐시에서 캔들 조회 (since 이상, until 미만, 시간순 정렬)
+
+    since가 있으면 since부터 앞으로 count개, 없으면 가장 최근 count개를 반환합니다.
+    """
+    conditions = ["interval = ?"]
+    params: list = [interval]
+    if since is not None:
+        conditions.append("ts >= ?")
+        params.append(since)
+    if until is not None:
+        conditions.append("ts < ?")
+        params.append(until)
+    params.append(count)
+
+    conn = get_db_connection()
+    rows = conn.execute(f'''
+        SELECT {", ".join(CANDLE_COLUMNS)}
+        FROM candles
+        WHERE {" AND ".join(conditions)}
+        ORDER BY ts {"ASC" if since is not None else "DESC"}
+        LIMIT ?
+    ''', params).fetchall()
+    conn.close()
+
+    candles = [dict(row) for row in rows]
+    return candles if since is not None else candles[::-1]
+
+def get_candles(interval: str, count: int = 30, since: Optional[int] = None,
+                until: Optional[int] = None) -> List[Dict]:
+    """
+    캔들 조회 (캐시 우선)
+
+    Args:
+        interval: pyupbit interval
+        count: 최대 캔들 수 (MAX_PAGE_SIZE로 제한)
+        since: 이 시각(epoch 밀리초)부터 앞으로 count개 (진행 중인 캔들 갱신을 위해 since 자신도 포함)
+               캐시보다 이전이면 요청당 ceil(count / MAX_PAGE_SIZE)페이지만 과거로 채우므로,
+               since까지 닿지 못하면 캐시의 가장 오래된 캔들부터 반환
+        until: 이 시각 이전 캔들만 (과거 페이지 조회용 커서)
+    """
+    count = max(1, min(count, MAX_PAGE_SIZE))
+
+    if since is not None:
+        # 캐시보다 이전 시각부터 요청하면 과거 캔들을 이어서 채움 (빈 구간 없이)
+        # since=0 같은 요청 하나가 거래소를 수십 번 호출하지 않도록 요청당 페이지 수 제한
+        oldest = _oldest_ts(interval)
+        if oldest is None or oldest > since:
+            backfill_range(interval, since, max_pages=math.ceil(count / MAX_PAGE_SIZE))
+        else:
+            refresh_latest(interval, min_count=count)
+    elif until is None:
+        refresh_latest(interval, min_count=count)
+
+    candles = query_candles(interval, count, since=since, until=until)
+
+    # 요청한 개수만큼 캐시에 없으면 가장 오래된 캔들 이전 구간을 거래소에서 채움
+    if since is None and len(candles) < count:
+        oldest = _oldest_ts(interval)
+        if oldest is not None or until is not None:
+            before = min(t for t in (oldest, until) if t is not None)
+            backfill_before(interval, before, count - len(candles))
+            candles = query_candles(interval, count, since=since, until=until)
+
+    return candles
@@ -0,0 +1,171 @@
+"""
+차트 이미지 전처리
+셀레니움 전체 화면 스크린샷을 GPT-4o에 보내기 전에 차트 영역만 잘라 줄이고 색상 수를 줄여 다시 압축합니다.
+직전에 보낸 이미지와 지각적으로 같으면(dHash 해밍 거리) 이번 사이클에는 보내지 않습니다.
+
+- 크롭: CHART_CROP="x0,y0,x1,y1"(0~1 비율)을 지정하지 않으면 가장자리 단색 여백을 자동으로 제거
+- 크기: CHART_MAX_WIDTH x CHART_MAX_HEIGHT 안으로 축소
+- 색상: CHART_COLORS개 팔레트 PNG (0이면 양자화 없이 PNG 재압축)
+- detail: CHART_DETAIL=low | high | auto (auto는 512px 안에 들어가면 low)
+- 변경 감지: 직전 전송 이미지와의 dHash 거리가 CHART_HASH_THRESHOLD 이하이고
+  CHART_RESEND_SECONDS가 지나지 않았으면 전송 생략
+  기준 해시는 판단이 성공한 뒤에 commit_chart_hash로 저장 (모델이 실제로 본 이미지만 기준이 됨)
+
+Pillow가 없으면 원본을 그대로 보냅니다.
+"""
+import os
+import io
+import math
+import time
+import base64
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from database import get_db_connection
+
+try:
+    from PIL import Image, ImageChops  # 선택 의존성: 이미지 처리
+except ImportError:
+    Image = None
+
+MAX_WIDTH = int(os.getenv("CHART_MAX_WIDTH", "1024"))
+MAX_HEIGHT = int(os.getenv("CHART_MAX_HEIGHT", "768"))
+COLORS = int(os.getenv("CHART_COLORS", "64"))
+DETAIL = os.getenv("CHART_DETAIL", "auto")
+CROP = os.getenv("CHART_CROP")
+HASH_THRESHOLD = int(os.getenv("CHART_HASH_THRESHOLD", "4"))
+RESEND_SECONDS = int(os.getenv("CHART_RESEND_SECONDS", str(12 * 3600)))
+
+HASH_SIZE = 16        # 16x16 = 256비트 (8x8은 마지막 캔들 변화를 놓치기 쉬움)
+BORDER_TOLERANCE = 12  # 자동 크롭 시 여백으로 보는 색 차이
+
+def initialize_chart_image_table():
+    """chart_image_state 테이블 생성 (직전에 보낸 이미지의 해시)"""
+    conn = get_db_connection()
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS chart_image_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            dhash TEXT NOT NULL,
+            sent_at REAL NOT NULL
+        )
+    ''')
+    conn.commit()
+    conn.close()
+
+def vision_tokens(width: int, height: int, detail: str) -> int:
+    """GPT-4o 이미지 입력 토큰 (low는 고정 85, high는 512px 타일당 170 + 85)"""
+    if detail == "low":
+        return 85
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    return 85 + 170 * math.ceil(width / 512) * math.ceil(height / 512)
+
+def dhash(image, size: int = HASH_SIZE) -> str:
+    """difference hash (인접 픽셀 밝기 비교), 16진수 문자열"""
+    small = np.asarray(image.convert("L").resize((size + 1, size), Image.Resampling.LANCZOS), dtype=np.int16)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return np.packbits(bits).tobytes().hex()
+
+def hash_distance(a: str, b: str) -> int:
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+def crop_chart(image, crop: Optional[str] = CROP):
+    """차트 영역만 남김 (비율 지정 또는 단색 여백 자동 제거)"""
+    width, height = image.size
+    if crop:
+        x0, y0, x1, y1 = (float(v) for v in crop.split(","))
+        return image.crop((int(x0 * width), int(y0 * height), int(x1 * width), int(y1 * height)))
+
+    background = Image.new(image.mode, image.size, image.getpixel((0, 0)))
+    mask = ImageChops.difference(image, background).convert("L").point(lambda p: 255 if p > BORDER_TOLERANCE else 0)
+    box = mask.getbbox()
+    return image.crop(box) if box else image
+
+def choose_detail(width: int, height: int, detail: str = DETAIL) -> str:
+    if detail in ("low", "high"):
+        return detail
+    return "low" if max(width, height) <= 512 else "high"
+
+def process_chart_image(png: bytes) -> Tuple[bytes, str, str]:
+    """
+    크롭 → 축소 → 양자화/재압축
+
+    Returns:
+        (PNG 바이트, detail, dHash)
+    """
+    image = Image.open(io.BytesIO(png)).convert("RGB")
+    image = crop_chart(image)
+    image.thumbnail((MAX_WIDTH, MAX_HEIGHT), Image.Resampling.LANCZOS)
+    image_hash = dhash(image)
+
+    if COLORS:
+        image = image.quantize(colors=COLORS, method=Image.Quantize.FASTOCTREE)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue(), choose_detail(*image.size), image_hash
+
+def prepare_chart_image(png: bytes) -> Dict:
+    """
+    스크린샷을 전송용으로 변환하고 직전 전송 이미지와 비교
+
+    기준 해시는 바꾸지 않음 (판단이 성공하면 호출한 쪽에서 commit_chart_hash(result["hash"]))
+
+    Returns:
+        {"image": base64 또는 None(변화 없어 생략), "detail", "skipped", "distance", "hash",
+         "unchanged_since": 생략 시 기준 이미지를 보낸 시각 ("%Y-%m-%d %H:%M:%S"),
+         "original_bytes", "bytes", "original_tokens", "tokens"}
+        bytes/tokens는 실제로 보내는 양 (생략하면 0)
+    """
+    original_size = Image.open(io.BytesIO(png)).size if Image is not None else None
+    result = {
+        "original_bytes": len(png),
+        "original_tokens": vision_tokens(*original_size, "high") if original_size else None,
+    }
+    if Image is None:
+        return {**result, "image": base64.b64encode(png).decode("utf-8"), "detail": "high",
+                "skipped": False, "distance": None, "hash": None, "unchanged_since": None,
+                "bytes": len(png), "tokens": result["original_tokens"]}
+
+    processed, detail, image_hash = process_chart_image(png)
+    width, height = Image.open(io.BytesIO(processed)).size
+
+    conn = get_db_connection()
+    try:
+        last = conn.execute("SELECT dhash, sent_at FROM chart_image_state WHERE id = 1").fetchone()
+        distance = hash_distance(image_hash, last["dhash"]) if last else None
+        skipped = (distance is not None and distance <= HASH_THRESHOLD
+                   and time.time() - last["sent_at"] < RESEND_SECONDS)
+    finally:
+        conn.close()
+
+    return {
+        **result,
+        "image": None if skipped else base64.b64encode(processed).decode("utf-8"),
+        "detail": detail,
+        "skipped": skipped,
+        "distance": distance,
+        "hash": image_hash,
+        "unchanged_since": datetime.fromtimestamp(last["sent_at"]).strftime("%Y-%m-%d %H:%M:%S") if skipped else None,
+        "bytes": 0 if skipped else len(processed),
+        "tokens": 0 if skipped else vision_tokens(width, height, detail),
+    }
+
+def commit_chart_hash(image_hash: str):
+    """
+    모델에 보낸 이미지의 해시를 기준으로 저장 (판단이 성공한 뒤 호출)
+
+    생략한 사이클은 호출하지 않으므로 기준 해시가 바뀌지 않음 (조금씩 바뀌는 변화가 누적되도록)
+    """
+    conn = get_db_connection()
+    try:
+        conn.execute('''
+            INSERT INTO chart_image_state (id, dhash, sent_at) VALUES (1, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET dhash = excluded.dhash, sent_at = excluded.sent_at
+        ''', (image_hash, time.time()))
+        conn.commit()
+    finally:
+        conn.close()
@@ -0,0 +1,119 @@
+"""
+대시보드 스냅샷
+화면의 모든 위젯 데이터를 한 번에 만들어 HTTP(/api/dashboard)와 WebSocket(/ws/dashboard)이 함께 사용합니다.
+
+- 데이터는 그룹 단위로 조회 (예: 통계/거래 내역/반성 일기는 DB 연결 하나로 함께 읽음)
+- 그룹마다 유효 시간(TTL)이 있어 오래된 그룹만 다시 조회하고, 오래된 그룹들은 동시에 조회
+- 같은 그룹을 여러 요청이 동시에 갱신하려 하면 한 번만 조회하고 결과를 공유
+- 섹션별 버전(내용 해시)으로 바뀐 섹션만 골라 보낼 수 있음 (조회 오류가 생기거나 풀린 것도 함께)
+"""
+import json
+import time
+import asyncio
+import hashlib
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+# 그룹 조회 함수: {섹션 이름: 값}을 반환하는 async 함수
+GroupFetcher = Callable[[], Awaitable[Dict[str, Any]]]
+
+def section_version(value: Any) -> str:
+    """섹션 내용 해시 (내용이 같으면 같은 버전)"""
+    encoded = json.dumps(value, sort_keys=True, default=str, ensure_ascii=False).encode()
+    return hashlib.blake2b(encoded, digest_size=8).hexdigest()
+
+class DashboardCache:
+    """그룹별 TTL 캐시 + 섹션 버전 관리"""
+
+    def __init__(self, groups: Dict[str, Tuple[float, Iterable[str], GroupFetcher]]):
+        """
+        Args:
+            groups: {그룹 이름: (TTL 초, 그룹이 만드는 섹션 이름들, 조회 함수)}
+        """
+        self.groups = {name: (ttl, tuple(sections), fetch) for name, (ttl, sections, fetch) in groups.items()}
+        self.section_group = {section: name for name, (_, sections, _) in self.groups.items() for section in sections}
+        self.sections: Dict[str, Any] = {}
+        self.versions: Dict[str, str] = {}
+        self.errors: Dict[str, str] = {}
+        self._fetched_at: Dict[str, float] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    def validate(self, sections: Optional[Iterable[str]]) -> Tuple[str, ...]:
+        """요청한 섹션 이름 확인 (None이면 전체)"""
+        if sections is None:
+            return tuple(self.section_group)
+        sections = tuple(sections)
+        unknown = [s for s in sections if s not in self.section_group]
+        if unknown:
+            raise ValueError(f"알 수 없는 섹션: {', '.join(unknown)} (가능: {', '.join(self.section_group)})")
+        return sections
+
+    async def _refresh_group(self, name: str):
+        _, sections, fetch = self.groups[name]
+        try:
+            values = await fetch()
+        except Exception as e:
+            # 이전 값은 유지하고 오류만 기록, 다음 요청에서 다시 시도
+            print(f"대시보드 {name} 조회 실패: {e}")
+            for section in sections:
+                self.errors[section] = str(e)
+            self._fetched_at[name] = time.monotonic()
+            return
+
+        for section in sections:
+            value = values.get(section)
+            self.sections[section] = value
+            self.versions[section] = section_version(value)
+            self.errors.pop(section, None)
+        self._fetched_at[name] = time.monotonic()
+
+    async def refresh(self, sections: Optional[Iterable[str]] = None, force: bool = False):
+        """요청한 섹션이 속한 그룹 중 TTL이 지난 그룹을 동시에 갱신"""
+        now = time.monotonic()
+        groups = {self.section_group[s] for s in self.validate(sections)}
+        tasks = []
+        for name in groups:
+            ttl = self.groups[name][0]
+            if not force and now - self._fetched_at.get(name, float("-inf")) < ttl:
+                continue
+            task = self._inflight.get(name)
+            if task is None:
+                task = asyncio.ensure_future(self._refresh_group(name))
+                self._inflight[name] = task
+                task.add_done_callback(lambda _, name=name: self._inflight.pop(name, None))
+            tasks.append(task)
+        if tasks:
+            # 한 요청이 끊겨도 공유 중인 조회는 계속되도록 shield
+            await asyncio.gather(*(asyncio.shield(t) for t in tasks))
+
+    async def snapshot(self, sections: Optional[Iterable[str]] = None) -> Dict:
+        """요청한 섹션의 현재 값과 버전"""
+        sections = self.validate(sections)
+        await self.refresh(sections)
+        return {
+            "sections": {s: self.sections.get(s) for s in sections},
+            "versions": {s: self.versions.get(s) for s in sections},
+            "errors": {s: self.errors[s] for s in sections if s in self.errors},
+            "generated_at": int(time.time() * 1000),
+        }
+
+    def changed_since(self, known: Dict[str, str], sections: Optional[Iterable[str]] = None,
+                      known_errors: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        known(섹션별 버전), known_errors(섹션별 오류)와 비교해 바뀐 것만 반환
+
+        Returns:
+            {"sections": 바뀐 섹션 값, "errors": 요청한 섹션의 현재 오류 전체 (known_errors와 같으면 None)}
+        """
+        sections = self.validate(sections)
+        errors = {s: self.errors[s] for s in sections if s in self.errors}
+        return {
+            "sections": {
+                s: self.sections.get(s)
+                for s in sections
+                if s in self.versions and known.get(s) != self.versions[s]
+            },
+            "errors": errors if errors != (known_errors or {}) else None,
+        }
+
+    def etag(self, sections: Iterable[str]) -> str:
+        return '"' + section_version([self.versions.get(s) for s in sections]) + '"'
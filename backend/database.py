@@ -1,9 +1,11 @@
+import os
 import sqlite3
 import pandas as pd
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple, Iterator
 from datetime import datetime
 
-DB_PATH = "../ai_trading.db"
+# 저장소 루트의 ai_trading.db (autotrade.py와 공유, 실행 위치와 무관하게 같은 파일)
+DB_PATH = os.getenv("AI_TRADING_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ai_trading.db"))
 
 def get_db_connection():
     """데이터베이스 연결 생성"""
@@ -11,21 +13,135 @@ def get_db_connection():
     conn.row_factory = sqlite3.Row
     return conn
 
-def get_all_trades(limit: Optional[int] = None) -> List[Dict]:
-    """모든 거래 내역 조회"""
+def table_exists(conn: sqlite3.Connection, table: str) -> bool:
+    """테이블 존재 여부 확인"""
+    row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+    return row is not None
+
+def enable_wal():
+    """WAL 모드 활성화 (여러 API 워커 프로세스가 동시에 읽고 쓸 수 있도록)"""
     conn = get_db_connection()
-    cursor = conn.cursor()
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.close()
 
-    query = "SELECT * FROM trades ORDER BY timestamp DESC"
-    if limit:
-        query += f" LIMIT {limit}"
+# trades 테이블 컬럼 (fields 파라미터로 선택 가능한 컬럼)
+TRADE_COLUMNS = [
+    "id", "timestamp", "decision", "reason", "percentage", "btc_balance",
+    "krw_balance", "btc_avg_buy_price", "btc_krw_price", "reflection",
+    "ret_1h", "ret_4h", "ret_24h", "ret_72h"
+]
 
-    cursor.execute(query)
-    trades = [dict(row) for row in cursor.fetchall()]
+# 목록 화면용 가상 컬럼 (긴 텍스트의 앞부분만)
+PREVIEW_LENGTH = 200
+VIRTUAL_TRADE_COLUMNS = {
+    "reason_preview": f"substr(reason, 1, {PREVIEW_LENGTH}) AS reason_preview",
+}
+
+def initialize_trade_indexes():
+    """거래 내역 조회용 인덱스 생성 (keyset 페이지네이션)"""
+    conn = get_db_connection()
+    # trades 테이블은 autotrade.py / init_db.py가 만들므로 아직 없으면 건너뜀
+    if table_exists(conn, "trades"):
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_trades_timestamp_id ON trades (timestamp, id)")
+        conn.commit()
     conn.close()
 
+def _select_columns(fields: Optional[List[str]]) -> str:
+    """요청한 필드로 SELECT 절 구성 (커서 계산을 위해 id, timestamp는 항상 포함)"""
+    if not fields:
+        return "*"
+
+    invalid = [f for f in fields if f not in TRADE_COLUMNS and f not in VIRTUAL_TRADE_COLUMNS]
+    if invalid:
+        raise ValueError(f"알 수 없는 필드: {', '.join(invalid)}")
+
+    columns = ["id", "timestamp"] + [f for f in fields if f not in ("id", "timestamp")]
+    return ", ".join(VIRTUAL_TRADE_COLUMNS.get(c, c) for c in dict.fromkeys(columns))
+
+def encode_trade_cursor(trade: Dict) -> str:
+    """다음 페이지 커서 (마지막 행의 timestamp와 id)"""
+    return f"{trade['timestamp']}|{trade['id']}"
+
+def decode_trade_cursor(cursor: str) -> Tuple[str, int]:
+    timestamp, _, trade_id = cursor.rpartition("|")
+    if not timestamp:
+        raise ValueError("잘못된 커서입니다.")
+    return timestamp, int(trade_id)
+
+def get_all_trades(limit: Optional[int] = None, cursor: Optional[str] = None,
+                   fields: Optional[List[str]] = None,
+                   conn: Optional[sqlite3.Connection] = None) -> List[Dict]:
+    """
+    거래 내역 조회 (최신순)
+
+    Args:
+        limit: 최대 개수
+        cursor: 이전 페이지 마지막 행의 커서 (encode_trade_cursor), 이 행보다 오래된 거래만 조회
+        fields: 조회할 컬럼 (None이면 전체)
+        conn: 함께 쓸 연결 (None이면 새로 열고 닫음)
+    """
+    own_conn = conn is None
+    conn = conn or get_db_connection()
+    cursor_db = conn.cursor()
+
+    query = f"SELECT {_select_columns(fields)} FROM trades"
+    params: list = []
+
+    if cursor:
+        timestamp, trade_id = decode_trade_cursor(cursor)
+        # row value 비교는 (timestamp, id) 인덱스 범위 탐색으로 처리됨
+        query += " WHERE (timestamp, id) < (?, ?)"
+        params += [timestamp, trade_id]
+
+    query += " ORDER BY timestamp DESC, id DESC"
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+
+    cursor_db.execute(query, params)
+    trades = [dict(row) for row in cursor_db.fetchall()]
+    if own_conn:
+        conn.close()
+
     return trades
 
+def iter_trades_json(fields: Optional[List[str]] = None, batch_size: int = 500) -> Iterator[bytes]:
+    """
+    전체 거래 내역을 JSON 배열 조각으로 생성 (대용량 내보내기 스트리밍용)
+
+    StreamingResponse가 스레드 풀의 여러 스레드에서 이어서 호출하므로 check_same_thread를 끕니다.
+    """
+    from serialization import dumps  # fastapi를 쓰지 않는 autotrade.py 임포트를 가볍게 유지
+
+    select_columns = _select_columns(fields)
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    try:
+        cursor = conn.execute(f"SELECT {select_columns} FROM trades ORDER BY timestamp DESC, id DESC")
+        yield b"["
+        first = True
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            chunk = b",".join(dumps(dict(row)) for row in rows)
+            yield chunk if first else b"," + chunk
+            first = False
+        yield b"]"
+    finally:
+        conn.close()
+
+def get_trade_reflection(trade_id: int) -> Optional[Dict]:
+    """특정 거래의 반성 일기만 조회 (목록에서 제외한 긴 텍스트를 필요할 때 가져옴)"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT id, reason, reflection FROM trades WHERE id = ?", (trade_id,))
+    trade = cursor.fetchone()
+    conn.close()
+
+    return dict(trade) if trade else None
+
 def get_trade_by_id(trade_id: int) -> Optional[Dict]:
     """특정 거래 조회"""
     conn = get_db_connection()
@@ -37,11 +153,28 @@ def get_trade_by_id(trade_id: int) -> Optional[Dict]:
 
     return dict(trade) if trade else None
 
-def get_trade_statistics() -> Dict:
-    """거래 통계 조회"""
+def insert_trade(timestamp: str, decision: str, reason: str, percentage: int, btc_balance: float,
+                 krw_balance: float, btc_avg_buy_price: float, btc_krw_price: float) -> int:
+    """거래 기록 추가 (autotrade.py의 insert_trade와 같은 형식), 새 거래 ID 반환"""
     conn = get_db_connection()
     cursor = conn.cursor()
 
+    cursor.execute('''
+        INSERT INTO trades (timestamp, decision, reason, percentage, btc_balance, krw_balance, btc_avg_buy_price, btc_krw_price, reflection)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (timestamp, decision, reason, percentage, btc_balance, krw_balance, btc_avg_buy_price, btc_krw_price, None))
+    trade_id = cursor.lastrowid
+
+    conn.commit()
+    conn.close()
+    return trade_id
+
+def get_trade_statistics(conn: Optional[sqlite3.Connection] = None) -> Dict:
+    """거래 통계 조회"""
+    own_conn = conn is None
+    conn = conn or get_db_connection()
+    cursor = conn.cursor()
+
     # 총 거래 수
     cursor.execute("SELECT COUNT(*) as total FROM trades")
     total_trades = cursor.fetchone()["total"]
@@ -63,7 +196,8 @@ def get_trade_statistics() -> Dict:
     latest_trade = cursor.fetchone()
     latest_trade_dict = dict(latest_trade) if latest_trade else None
 
-    conn.close()
+    if own_conn:
+        conn.close()
 
     return {
         "total_trades": total_trades,
@@ -129,9 +263,10 @@ def get_portfolio_performance() -> Dict:
         "profit_loss_percentage": profit_loss_pct
     }
 
-def get_recent_reflections(limit: int = 5) -> List[Dict]:
+def get_recent_reflections(limit: int = 5, conn: Optional[sqlite3.Connection] = None) -> List[Dict]:
     """최근 AI 반성 일기 조회"""
-    conn = get_db_connection()
+    own_conn = conn is None
+    conn = conn or get_db_connection()
     cursor = conn.cursor()
 
     cursor.execute("""
@@ -143,6 +278,23 @@ def get_recent_reflections(limit: int = 5) -> List[Dict]:
     """, (limit,))
 
     reflections = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+    if own_conn:
+        conn.close()
 
     return reflections
+
+def get_dashboard_data(trade_limit: int = 20, trade_fields: Optional[List[str]] = None,
+                       reflection_limit: int = 10) -> Dict:
+    """대시보드용 통계, 최근 거래, 반성 일기를 연결 하나와 같은 읽기 시점으로 조회"""
+    conn = get_db_connection()
+    try:
+        if not table_exists(conn, "trades"):
+            return {"statistics": None, "trades": [], "reflections": []}
+        conn.execute("BEGIN")  # 세 조회가 같은 스냅샷을 보도록
+        return {
+            "statistics": get_trade_statistics(conn=conn),
+            "trades": get_all_trades(limit=trade_limit, fields=trade_fields, conn=conn),
+            "reflections": get_recent_reflections(limit=reflection_limit, conn=conn),
+        }
+    finally:
+        conn.close()
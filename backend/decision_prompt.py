@@ -0,0 +1,107 @@
+"""
+AI 매매 판단 프롬프트
+매매 사이클의 입력(잔고, 호가 요약, 캔들+지표, 공포-탐욕 지수, 뉴스, 전략 문서, 과거 경험, 차트 이미지)으로
+OpenAI 메시지를 만듭니다. autotrade.py와 스냅샷 재현(snapshots.py)이 같은 함수를 사용하므로
+저장된 입력으로 당시 프롬프트를 그대로 다시 만들 수 있습니다.
+"""
+import json
+from typing import Any, Dict, List
+
+DECISION_MODEL = "gpt-4o-2024-08-06"
+
+# 입력 이름 (스냅샷에 같은 이름으로 저장)
+TEXT_INPUTS = ("daily_ohlcv", "hourly_ohlcv", "strategy")   # 문자열 그대로 사용
+IMAGE_INPUTS = ("chart_image",)                             # base64 PNG
+JSON_INPUTS = ("balances", "orderbook_features", "fear_greed", "news", "past_reflections",
+               "chart_detail",                              # chart_detail: OpenAI 이미지 detail (low/high)
+               "chart_unchanged_since")                     # 차트가 바뀌지 않아 이미지를 생략한 경우 기준 시각
+
+SYSTEM_PROMPT = """You are an expert in Bitcoin investing. Analyze the provided data including technical indicators, the Fear and Greed Index, and the latest Bitcoin news headlines. Tell me whether to buy, sell, or hold at the moment. Consider the following indicators in your analysis:
+            - Bollinger Bands (bb_mavg, bb_hband, bb_lband)
+            - RSI (rsi)
+            - MACD (macd, macd_signal, macd_diff)
+            - Moving Averages (sma_20, ema_12)
+            - Orderbook features (spread_bps, depth_weighted_mid, bid/ask imbalance by depth, slippage for your full balance, walls)
+            - Fear and Greed Index (value, classification)
+            - Latest Bitcoin News Headlines with publication time
+            - YouTube Transcript Data
+            - Chart Data (Image)
+            - Past Trade Reflections (from past situations most similar to the current market)
+
+            My main objective is to make money from this trade, so please make a buy or sell decision based on this objective.
+            Keep in mind that it is currently overbought due to the US election. The market may be overheated, but Bitcoin is getting a lot of attention.
+            
+            Respond in JSON format with three fields: 'decision', 'reason', and 'percentage'. 
+            The 'percentage' field should be a number between 0 and 100, 
+            representing the percentage of your available KRW to use for a 'buy' decision or the percentage of your BTC to sell for a 'sell' decision."""
+
+RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "BitcoinInvestmentDecision",  # Adding a name to the schema
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "decision": {"type": "string", "enum": ["buy", "sell", "hold"]},
+                "reason": {"type": "string"},
+                "percentage": {"type": "integer"}
+            },
+            "required": ["decision", "reason", "percentage"],
+            "additionalProperties": False
+        }
+    }
+}
+
+def normalize_inputs(inputs: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    JSON 입력을 저장/복원했을 때와 같은 형태로 변환 (튜플 → 리스트 등)
+
+    판단 시점에도 이 값으로 메시지를 만들어야 스냅샷에서 같은 프롬프트가 재현됩니다.
+    """
+    return {
+        name: json.loads(json.dumps(value, ensure_ascii=False)) if name in JSON_INPUTS else value
+        for name, value in inputs.items()
+    }
+
+def build_messages(inputs: Dict[str, Any]) -> List[Dict]:
+    """normalize_inputs를 거친 입력으로 chat.completions 메시지 생성"""
+    chart_image = inputs.get("chart_image")
+    image_url = {"url": f"data:image/png;base64,{chart_image}"}
+    if inputs.get("chart_detail"):
+        # detail이 없던 이전 스냅샷은 그대로 재현되도록 값이 있을 때만 추가
+        image_url["detail"] = inputs["chart_detail"]
+    chart_note = ""
+    if inputs.get("chart_unchanged_since"):
+        chart_note = f"\nChart Data (Image): chart unchanged since {inputs['chart_unchanged_since']}, image not resent"
+
+    return [
+        {
+            "role": "system",
+            "content": SYSTEM_PROMPT
+        },
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "text",
+                    "text": (
+                        f"Current investment status: {json.dumps(inputs['balances'])}\n"
+                        f"Orderbook features: {json.dumps(inputs['orderbook_features'])}\n"
+                        f"Daily OHLCV with indicators (30 days): {inputs['daily_ohlcv']}\n"
+                        f"Hourly OHLCV with indicators (24 hours): {inputs['hourly_ohlcv']}\n"
+                        f"Fear and Greed Index: {inputs['fear_greed']}\n"
+                        f"Latest News Headlines: {inputs['news']}\n"
+                        f"YouTube Transcript: {inputs['strategy']}\n"
+                        f"Past Trade Reflections: {json.dumps(inputs['past_reflections'], ensure_ascii=False)}"
+                        + chart_note
+                    ),
+                },
+            ] + ([
+                {
+                    "type": "image_url",
+                    "image_url": image_url
+                }
+            ] if chart_image else [])
+        }
+    ]
@@ -0,0 +1,549 @@
+"""
+매매 판단 서비스
+autotrade.py의 정기 매매와 대시보드 AI 분석이 같은 프롬프트(decision_prompt.py)와 같은 입력 캐시로 판단하도록
+입력 수집, OpenAI 클라이언트, 외부 API 연결을 한 곳에서 관리합니다.
+
+- 입력별 TTL 캐시: 정기 매매 직후의 대시보드 분석은 몇 초 전에 받은 캔들/호가/공포-탐욕 지수/뉴스를 재사용
+  (같은 입력을 여러 스레드가 동시에 요청하면 한 번만 조회)
+- httpx.Client(연결 재사용)와 OpenAI 클라이언트는 프로세스 수명 동안 하나만 유지
+- 외부 조회는 resilience.py를 거침 (타임아웃, 백오프 재시도, 서킷이 열리면 마지막 정상 값)
+- 잔고와 차트 이미지는 호출한 쪽이 넘김 (주문을 내는 프로세스의 거래소 객체가 기준)
+
+실행:
+    DECISION_SERVICE_SOCKET 미설정          # 호출한 프로세스 안에서 바로 실행 (기본)
+    python decision_service.py              # 판단 서비스 (1개)
+    DECISION_SERVICE_SOCKET=/tmp/ai_trading_decision.sock python autotrade.py
+    DECISION_SERVICE_SOCKET=/tmp/ai_trading_decision.sock uvicorn main:app
+
+요청/응답은 4바이트 길이(big-endian) + JSON 본문: {"method": "decide", "params": {...}} → {"ok": true, "result": {...}}
+(decide 요청에는 base64 차트 이미지가 들어가 수백 KB가 되므로 줄 단위가 아닌 길이 기반으로 읽음)
+서비스에 연결할 수 없으면 DecisionClient가 프로세스 안에서 실행합니다.
+"""
+import os
+import json
+import time
+import socket
+import struct
+import asyncio
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+import resilience
+from decision_prompt import (
+    DECISION_MODEL, RESPONSE_FORMAT, TEXT_INPUTS, IMAGE_INPUTS,
+    normalize_inputs, build_messages
+)
+
+DEFAULT_SOCKET_PATH = "/tmp/ai_trading_decision.sock"
+TICKER = "KRW-BTC"
+
+FEAR_GREED_URL = "https://api.alternative.me/fng/?limit=1"
+NEWS_URL = "https://serpapi.com/search.json"
+STRATEGY_PATH = os.getenv(
+    "STRATEGY_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "strategy.txt"))
+
+# 입력별 캐시 유지 시간 (초)
+INPUT_TTL = {
+    "orderbook": 5,
+    "daily_ohlcv": 300,
+    "hourly_ohlcv": 60,
+    "fear_greed": 600,   # 하루 한 번 바뀌는 지표
+    "news": 600,         # SerpApi 호출 한도 절약
+}
+
+CLIENT_TIMEOUT = 180  # 판단 1회(모델 응답 포함) 최대 대기 (초)
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024  # 요청/응답 한 건의 최대 크기
+
+_LENGTH = struct.Struct(">I")
+
+def encode_message(message: Dict) -> bytes:
+    """길이 접두사 + JSON 본문"""
+    body = json.dumps(message, default=str).encode()
+    if len(body) > MAX_MESSAGE_BYTES:
+        raise ValueError(f"메시지가 너무 큽니다: {len(body):,} bytes")
+    return _LENGTH.pack(len(body)) + body
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    chunks, remaining = [], size
+    while remaining:
+        chunk = sock.recv(min(remaining, 1024 * 1024))
+        if not chunk:
+            raise RuntimeError("decision service가 응답 중에 연결을 끊었습니다.")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+def recv_message(sock: socket.socket) -> Optional[Dict]:
+    """블로킹 소켓에서 메시지 하나 읽기 (응답 없이 끊기면 None)"""
+    header = sock.recv(_LENGTH.size)
+    if not header:
+        return None
+    header += _recv_exactly(sock, _LENGTH.size - len(header))
+    (size,) = _LENGTH.unpack(header)
+    if size > MAX_MESSAGE_BYTES:
+        raise RuntimeError(f"응답이 너무 큽니다: {size:,} bytes")
+    return json.loads(_recv_exactly(sock, size))
+
+async def read_message(reader: asyncio.StreamReader) -> Dict:
+    """스트림에서 메시지 하나 읽기"""
+    (size,) = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+    if size > MAX_MESSAGE_BYTES:
+        raise ValueError(f"요청이 너무 큽니다: {size:,} bytes")
+    return json.loads(await reader.readexactly(size))
+
+def get_service_socket_path() -> Optional[str]:
+    """DECISION_SERVICE_SOCKET 환경 변수가 설정된 경우에만 서비스 프로세스에 요청"""
+    return os.getenv("DECISION_SERVICE_SOCKET") or None
+
+def add_technical_indicators(df):
+    """
+    주어진 데이터프레임에 보조지표 추가 (ta 라이브러리 사용)
+    """
+    import ta
+
+    # NaN 값이 있는 행을 제거
+    df = df.dropna()
+
+    # Bollinger Bands
+    bb_indicator = ta.volatility.BollingerBands(close=df["close"], window=20, window_dev=2)
+    df['bb_mavg'] = bb_indicator.bollinger_mavg()
+    df['bb_hband'] = bb_indicator.bollinger_hband()
+    df['bb_lband'] = bb_indicator.bollinger_lband()
+
+    # RSI
+    df['rsi'] = ta.momentum.RSIIndicator(close=df['close'], window=14).rsi()
+
+    # MACD
+    macd_indicator = ta.trend.MACD(close=df['close'], window_slow=26, window_fast=12, window_sign=9)
+    df['macd'] = macd_indicator.macd()
+    df['macd_signal'] = macd_indicator.macd_signal()
+    df['macd_diff'] = macd_indicator.macd_diff()
+
+    # Simple Moving Average (SMA 20)
+    df['sma_20'] = ta.trend.SMAIndicator(close=df['close'], window=20).sma_indicator()
+
+    # Exponential Moving Average (EMA 12)
+    df['ema_12'] = ta.trend.EMAIndicator(close=df['close'], window=12).ema_indicator()
+
+    return df
+
+def archive_sentiment(fear_greed=None, news=None):
+    """조회한 공포-탐욕 지수/뉴스를 나중에 판단 시점 기준으로 다시 볼 수 있도록 보관"""
+    from sentiment_archive import record_fear_greed, parse_fear_greed, archive_news
+
+    try:
+        if fear_greed is not None:
+            record_fear_greed(parse_fear_greed(fear_greed))
+        if news:
+            archive_news(news)
+    except Exception as e:
+        print(f"Error archiving sentiment: {e}")
+
+class DecisionService:
+    """판단 입력 캐시와 외부 클라이언트를 보관하고 판단을 실행"""
+
+    def __init__(self, ttl: Optional[Dict[str, float]] = None):
+        self.ttl = {**INPUT_TTL, **(ttl or {})}
+        self.http = httpx.Client(timeout=resilience.HTTP_TIMEOUT)
+        self._openai = None
+        self._router = None
+        self._cache: Dict[str, Tuple[Any, float]] = {}
+        self._locks = {name: threading.Lock() for name in self.ttl}
+        self._strategy: Tuple[Optional[float], Optional[str]] = (None, None)  # (mtime, 내용)
+
+    @property
+    def openai(self):
+        if self._openai is None:
+            self._openai = resilience.openai_client()
+        return self._openai
+
+    @property
+    def router(self):
+        """여러 모델로 보내는 라우터 (model_router.py, DECISION_MODELS/DECISION_ROUTING)"""
+        if self._router is None:
+            from model_router import ModelRouter
+            self._router = ModelRouter(self.openai)
+        return self._router
+
+    def close(self):
+        self.http.close()
+
+    def _cached(self, name: str, fetch: Callable) -> Tuple[Any, bool]:
+        """(값, 캐시 사용 여부), TTL이 지났으면 한 스레드만 다시 조회 (None은 캐시하지 않음)"""
+        with self._locks[name]:
+            entry = self._cache.get(name)
+            if entry is not None and time.monotonic() - entry[1] < self.ttl[name]:
+                return entry[0], True
+            value = fetch()
+            if value is not None:
+                self._cache[name] = (value, time.monotonic())
+            return value, False
+
+    # ==================== 입력 조회 ====================
+
+    def _fetch_fear_greed(self) -> Optional[Dict]:
+        def fetch():
+            response = self.http.get(FEAR_GREED_URL)
+            response.raise_for_status()  # HTTP 에러 발생 시 예외 발생
+            data = response.json()
+            archive_sentiment(fear_greed=data)
+            return {
+                'value': data['data'][0]['value'],
+                'classification': data['data'][0]['value_classification']
+            }
+
+        try:
+            # 하루 한 번 바뀌는 지표이므로 장애 중에는 6시간 이내의 마지막 값까지 허용
+            return resilience.call("fear_greed", fetch, timeout=None, max_age=6 * 3600)
+        except (httpx.HTTPError, KeyError, IndexError, ValueError, RuntimeError) as e:
+            print(f"Error fetching Fear and Greed Index: {e}")
+            return None
+
+    def _fetch_news(self) -> Optional[List[tuple]]:
+        """SerpApi 최신 뉴스 헤드라인과 시간 정보 (최대 5개)"""
+        params = {
+            "q": "btc",  # 비트코인 관련 최신 뉴스 검색어
+            "tbm": "nws",  # 뉴스 모드
+            "api_key": os.getenv("SERP_API_KEY"),
+        }
+
+        def fetch():
+            response = self.http.get(NEWS_URL, params=params)
+            response.raise_for_status()
+            headlines_with_time = [
+                (news['title'], news.get('date', 'No date information'))
+                for news in response.json().get('news_results', [])
+            ][:5]
+            archive_sentiment(news=headlines_with_time)
+            return headlines_with_time
+
+        try:
+            return resilience.call("serpapi", fetch, timeout=None, max_age=3600)
+        except httpx.HTTPStatusError as http_err:
+            print(f"HTTP error occurred: {http_err}")
+        except Exception as err:
+            print(f"An error occurred: {err}")
+        return None
+
+    def _fetch_ohlcv(self, interval: str, count: int):
+        try:
+            df = resilience.get_ohlcv(TICKER, interval=interval, count=count)
+        except Exception as e:
+            print(f"Error fetching {interval} OHLCV: {e}")
+            return None
+        return add_technical_indicators(df)
+
+    def _fetch_orderbook(self):
+        from orderbook_analytics import OrderbookSnapshot
+
+        # 판단 입력용 요약 지표이므로 조회 실패 시 마지막 정상 호가도 허용 (주문은 ExecutionEngine이 새로 조회)
+        return OrderbookSnapshot.from_pyupbit(resilience.get_orderbook(TICKER, stale=True))
+
+    def fear_greed(self) -> Optional[Dict]:
+        return self._cached("fear_greed", self._fetch_fear_greed)[0]
+
+    def news(self) -> Optional[List[tuple]]:
+        return self._cached("news", self._fetch_news)[0]
+
+    def strategy(self) -> str:
+        """strategy.txt (파일이 바뀌었을 때만 다시 읽음)"""
+        mtime = os.path.getmtime(STRATEGY_PATH)
+        if self._strategy[0] != mtime:
+            with open(STRATEGY_PATH, "r", encoding="utf-8") as f:
+                self._strategy = (mtime, f.read())
+        return self._strategy[1]
+
+    def past_reflections(self, query: str = "") -> List[str]:
+        """
+        결정 프롬프트에 넣을 과거 경험
+        - 압축된 교훈(lessons) 중 현재 시장 상황(query)과 비슷한 것 + 최신 원문 reflection 몇 개
+        - 아직 교훈이 없으면 현재 상황과 가장 비슷한 원문 reflection (reflection_index.py)
+        """
+        from lessons import build_reflection_memory
+        from reflection_index import fetch_relevant_reflections
+
+        started = time.perf_counter()
+        memory = build_reflection_memory(query)
+        if memory["lessons"]:
+            entries = [f"[Lesson v{l['version']}, {l['source_count']} trades] {l['lesson']}" for l in memory["lessons"]]
+            entries += [f"[{r['timestamp']} {r['decision']} {r['percentage']}%] {r['reflection']}" for r in memory["recent"]]
+        else:
+            entries = [
+                f"[{r['timestamp']} {r['decision']} {r['percentage']}%] {r['reflection']}"
+                for r in fetch_relevant_reflections(query)
+            ]
+        print(f"Past reflections: {len(entries)} entries in {(time.perf_counter() - started) * 1000:.1f} ms")
+        return entries
+
+    def collect_inputs(self, balances: Optional[List[Dict]] = None, chart_image: Optional[str] = None,
+                       chart_detail: Optional[str] = None,
+                       chart_unchanged_since: Optional[str] = None) -> Tuple[Dict[str, Any], List[str]]:
+        """
+        판단 입력 수집
+
+        Returns:
+            (normalize_inputs를 거친 입력, 캐시에서 가져온 입력 이름 목록)
+        """
+        from reflection_index import describe_market
+
+        cached = []
+
+        def take(name, fetch):
+            value, hit = self._cached(name, fetch)
+            if hit:
+                cached.append(name)
+            return value
+
+        # 1. 현재 투자 상태 (BTC, KRW만)
+        balances = [b for b in (balances or []) if b['currency'] in ['BTC', 'KRW']]
+
+        # 2. 오더북(호가 데이터) - 원본 대신 요약 지표만 AI에게 전달
+        orderbook = take("orderbook", self._fetch_orderbook)
+        if balances:
+            krw_available = next((float(b['balance']) for b in balances if b['currency'] == 'KRW'), 0)
+            btc_available = next((float(b['balance']) for b in balances if b['currency'] == 'BTC'), 0)
+            orderbook_features = orderbook.features(order_krw=krw_available * 0.9995, order_btc=btc_available)
+        else:
+            orderbook_features = orderbook.features()
+
+        # 3. 30일 일봉, 24시간 시간봉 + 보조지표
+        df_daily = take("daily_ohlcv", lambda: self._fetch_ohlcv("day", 30))
+        df_hourly = take("hourly_ohlcv", lambda: self._fetch_ohlcv("minute60", 24))
+        if df_daily is None or df_hourly is None:
+            raise RuntimeError("Failed to fetch OHLCV data")
+
+        # 4. 공포 탐욕 지수, 5. 최신 뉴스 헤드라인
+        fear_greed = take("fear_greed", self._fetch_fear_greed)
+        if fear_greed is not None:
+            print(f"Fear and Greed Index: {fear_greed['value']} ({fear_greed['classification']})")
+        latest_news = take("news", self._fetch_news)
+        if latest_news:
+            print("Latest Bitcoin News Headlines:")
+            for i, (headline, date) in enumerate(latest_news, 1):
+                print(f"{i}. {headline} (Published on: {date})")
+
+        # 6. 현재 시장 상황과 비슷했던 과거 매매의 reflection
+        latest = df_hourly.iloc[-1].to_dict()
+        change_24h = (df_hourly['close'].iloc[-1] / df_hourly['close'].iloc[0] - 1) * 100
+        market_query = describe_market(
+            latest,
+            fear_greed=fear_greed,
+            headlines=[headline for headline, _ in (latest_news or [])],
+            change_24h=change_24h,
+            orderbook_features=orderbook_features,
+        )
+
+        # 스냅샷에서 같은 프롬프트를 다시 만들 수 있도록 저장/복원과 같은 형태의 입력으로 변환
+        inputs = normalize_inputs({
+            "balances": balances,
+            "orderbook_features": orderbook_features,
+            "daily_ohlcv": df_daily.to_json(),
+            "hourly_ohlcv": df_hourly.to_json(),
+            "fear_greed": fear_greed,
+            "news": latest_news,
+            "strategy": self.strategy(),
+            "past_reflections": self.past_reflections(market_query),
+            "chart_image": chart_image,
+            "chart_detail": chart_detail,
+            "chart_unchanged_since": chart_unchanged_since,
+        })
+        return inputs, cached
+
+    # ==================== 판단 ====================
+
+    def save_snapshot(self, inputs: Dict, messages: List[Dict], response_text: str,
+                      model: str = DECISION_MODEL) -> Optional[int]:
+        """판단 입력 스냅샷 저장 (실패해도 판단은 계속), 스냅샷 ID 반환"""
+        from snapshots import save_snapshot
+
+        try:
+            saved = save_snapshot(inputs, messages, model, response=response_text,
+                                  text_inputs=TEXT_INPUTS, base64_inputs=IMAGE_INPUTS)
+            print(f"Saved decision snapshot {saved['snapshot_id']} "
+                  f"({saved['new_bytes']} new bytes, {saved['deduplicated']} inputs deduplicated)")
+            return saved["snapshot_id"]
+        except Exception as e:
+            print(f"Error saving decision snapshot: {e}")
+            return None
+
+    def decide(self, balances: Optional[List[Dict]] = None, chart_image: Optional[str] = None,
+               chart_detail: Optional[str] = None, chart_unchanged_since: Optional[str] = None) -> Dict:
+        """
+        AI 매매 판단 1회
+
+        Args:
+            balances: upbit.get_balances() 결과 (None이면 잔고 없이 분석만)
+            chart_image: 전송용으로 변환한 차트 이미지 base64 (chart_image.py)
+            chart_unchanged_since: 차트가 바뀌지 않아 이미지를 생략했으면 기준 이미지를 보낸 시각
+
+        Returns:
+            {
+                'decision': 'buy' | 'sell' | 'hold',
+                'reason': 판단 근거,
+                'percentage': 0-100,
+                'current_price': 현재가,
+                'timestamp': 판단 시각,
+                'model': 판단에 쓰인 모델 (앙상블이면 +로 연결),
+                'model_calls': 모델별 상태/지연 시간/판단,
+                'snapshot_id': 입력 스냅샷 ID,
+                'cached_inputs': 캐시에서 가져온 입력 이름 목록
+            }
+        """
+        inputs, cached = self.collect_inputs(balances, chart_image, chart_detail, chart_unchanged_since)
+        if cached:
+            print(f"Reused cached inputs: {', '.join(cached)}")
+        messages = build_messages(inputs)
+
+        # 지연 예산 안에서 모델 대체/앙상블 (예산 안에 응답이 없으면 RuntimeError)
+        result = self.router.route(messages, RESPONSE_FORMAT)
+        for call in result["calls"]:
+            print(f"Model {call['model']}: {call['status']} in {call['latency_ms']:.0f} ms"
+                  + (f" -> {call['decision']} {call['percentage']}%" if call['decision'] else ""))
+        snapshot_id = self.save_snapshot(inputs, messages, result["content"], model=result["model"])
+
+        return {
+            'decision': result['decision'],
+            'reason': result['reason'],
+            'percentage': result['percentage'],
+            'current_price': resilience.get_current_price(TICKER),
+            'timestamp': datetime.now().isoformat(),
+            'model': result['model'],
+            'model_calls': result['calls'],
+            'snapshot_id': snapshot_id,
+            'cached_inputs': cached,
+        }
+
+    def status(self) -> Dict:
+        """입력별 캐시 경과 시간 (초)"""
+        now = time.monotonic()
+        return {
+            "models": self.router.models,
+            "routing": self.router.routing,
+            "inputs": {name: round(now - ts, 1) for name, (_, ts) in self._cache.items()},
+            "ttl": self.ttl,
+            "breakers": resilience.breaker_states(),
+        }
+
+_service: Optional[DecisionService] = None
+_service_lock = threading.Lock()
+
+def get_decision_service() -> DecisionService:
+    """프로세스 공용 DecisionService"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = DecisionService()
+        return _service
+
+# ==================== 클라이언트 ====================
+
+class DecisionClient:
+    """판단 서비스 프로세스에 요청 (소켓이 없거나 연결할 수 없으면 프로세스 안에서 실행)"""
+
+    def __init__(self, socket_path: Optional[str] = None, timeout: float = CLIENT_TIMEOUT):
+        self.socket_path = socket_path if socket_path is not None else get_service_socket_path()
+        self.timeout = timeout
+
+    def _local(self, method: str, params: Dict) -> Any:
+        service = get_decision_service()
+        if method == "decide":
+            return service.decide(**params)
+        if method == "status":
+            return service.status()
+        raise ValueError(f"Unknown method: {method}")
+
+    def call(self, method: str, **params) -> Any:
+        if not self.socket_path:
+            return self._local(method, params)
+
+        request = encode_message({"method": method, "params": params})
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            try:
+                sock.connect(self.socket_path)
+            except (FileNotFoundError, ConnectionRefusedError) as e:
+                # 연결 전 실패만 대체 실행 (요청을 보낸 뒤에는 중복 판단이 되지 않도록 그대로 실패)
+                print(f"decision service 연결 실패, 프로세스 안에서 실행합니다: {e}")
+                return self._local(method, params)
+            sock.sendall(request)
+            response = recv_message(sock)
+        finally:
+            sock.close()
+
+        if response is None:
+            raise RuntimeError("decision service가 응답 없이 연결을 끊었습니다.")
+        if not response["ok"]:
+            raise RuntimeError(response["error"])
+        return response["result"]
+
+    def decide(self, balances: Optional[List[Dict]] = None, chart_image: Optional[str] = None,
+               chart_detail: Optional[str] = None, chart_unchanged_since: Optional[str] = None) -> Dict:
+        return self.call("decide", balances=balances, chart_image=chart_image, chart_detail=chart_detail,
+                         chart_unchanged_since=chart_unchanged_since)
+
+    def status(self) -> Dict:
+        return self.call("status")
+
+def request_decision(balances: Optional[List[Dict]] = None, chart_image: Optional[str] = None,
+                     chart_detail: Optional[str] = None, chart_unchanged_since: Optional[str] = None) -> Dict:
+    """DecisionService.decide (DECISION_SERVICE_SOCKET이 설정되어 있으면 서비스 프로세스에서)"""
+    return DecisionClient().decide(balances, chart_image, chart_detail, chart_unchanged_since)
+
+# ==================== 서버 ====================
+
+async def _handle_request(service: DecisionService, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    from async_utils import run_ai
+
+    try:
+        request = await read_message(reader)
+        method, params = request.get("method"), request.get("params") or {}
+        if method == "decide":
+            result = await run_ai(service.decide, **params)
+        elif method == "status":
+            result = service.status()
+        else:
+            raise ValueError(f"Unknown method: {method}")
+        response = {"ok": True, "result": result}
+    except Exception as e:
+        print(f"decision 요청 실패: {e}")
+        response = {"ok": False, "error": str(e)}
+
+    try:
+        writer.write(encode_message(response))
+        await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+async def start_server(service: DecisionService, socket_path: str) -> asyncio.AbstractServer:
+    """판단 서비스 소켓 서버 시작 (기존 소켓 파일은 삭제)"""
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    return await asyncio.start_unix_server(
+        lambda reader, writer: _handle_request(service, reader, writer), path=socket_path)
+
+async def run_server(socket_path: str):
+    service = get_decision_service()
+    server = await start_server(service, socket_path)
+    print(f"🧠 decision service 시작: {socket_path}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    try:
+        asyncio.run(run_server(get_service_socket_path() or DEFAULT_SOCKET_PATH))
+    except KeyboardInterrupt:
+        print("decision service 종료")
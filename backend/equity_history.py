@@ -0,0 +1,204 @@
+"""
+포트폴리오 평가액 시계열
+일정 주기로 총 자산(KRW + BTC 평가액)을 기록하고 1분/1시간/1일 단위로 묶어 저장합니다.
+
+- 표본 하나가 들어올 때 세 해상도의 버킷을 함께 갱신 (open/high/low/close) → 별도 집계 작업 없음
+- 해상도별 보존 기간이 지난 행은 주기적으로 삭제 (1일 단위는 영구 보존)
+- 조회 시 반환 점 수가 MAX_POINTS 이하가 되는 가장 세밀한 해상도를 자동 선택
+"""
+import os
+import time
+import asyncio
+from typing import Dict, Optional
+
+from async_utils import run_blocking
+from database import get_db_connection
+from ledger import has_fills, get_ledger_state
+from market_data import fetch_current_price
+from paper_exchange import get_exchange
+
+MINUTE_MS = 60 * 1000
+HOUR_MS = 60 * MINUTE_MS
+DAY_MS = 24 * HOUR_MS
+KST_OFFSET_MS = 9 * HOUR_MS
+
+RESOLUTIONS = ["1m", "1h", "1d"]
+BUCKET_MS = {"1m": MINUTE_MS, "1h": HOUR_MS, "1d": DAY_MS}
+
+# 해상도별 보존 기간 (None: 영구)
+RETENTION_MS = {
+    "1m": int(os.getenv("EQUITY_RETENTION_1M_DAYS", "7")) * DAY_MS,
+    "1h": int(os.getenv("EQUITY_RETENTION_1H_DAYS", "400")) * DAY_MS,
+    "1d": None,
+}
+
+# 한 번에 반환하는 최대 점 수
+MAX_POINTS = 1000
+
+SAMPLE_SECONDS = int(os.getenv("EQUITY_SAMPLE_SECONDS", "60"))
+PRUNE_SECONDS = 3600
+
+def initialize_equity_tables():
+    """equity_1m / equity_1h / equity_1d 테이블 생성"""
+    conn = get_db_connection()
+    for resolution in RESOLUTIONS:
+        conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS equity_{resolution} (
+                ts INTEGER PRIMARY KEY,
+                open REAL NOT NULL,
+                high REAL NOT NULL,
+                low REAL NOT NULL,
+                close REAL NOT NULL,
+                krw REAL NOT NULL,
+                btc REAL NOT NULL,
+                price REAL NOT NULL,
+                samples INTEGER NOT NULL
+            ) WITHOUT ROWID
+        ''')
+    conn.commit()
+    conn.close()
+
+def bucket_start(ts: int, resolution: str) -> int:
+    """ts(epoch 밀리초)가 속한 버킷의 시작 시각 (1일 단위는 KST 자정 기준)"""
+    size = BUCKET_MS[resolution]
+    if resolution == "1d":
+        return (ts + KST_OFFSET_MS) // size * size - KST_OFFSET_MS
+    return ts // size * size
+
+def record_sample(krw: float, btc: float, price: float, ts: Optional[int] = None):
+    """평가액 표본 하나를 세 해상도 버킷에 반영"""
+    ts = ts if ts is not None else int(time.time() * 1000)
+    equity = krw + btc * price
+
+    conn = get_db_connection()
+    for resolution in RESOLUTIONS:
+        conn.execute(f'''
+            INSERT INTO equity_{resolution} (ts, open, high, low, close, krw, btc, price, samples)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1)
+            ON CONFLICT(ts) DO UPDATE SET
+                high = MAX(high, excluded.high),
+                low = MIN(low, excluded.low),
+                close = excluded.close,
+                krw = excluded.krw,
+                btc = excluded.btc,
+                price = excluded.price,
+                samples = samples + 1
+        ''', (bucket_start(ts, resolution), equity, equity, equity, equity, krw, btc, price))
+    conn.commit()
+    conn.close()
+
+def prune_history(now: Optional[int] = None) -> Dict[str, int]:
+    """보존 기간이 지난 행 삭제"""
+    now = now if now is not None else int(time.time() * 1000)
+    deleted = {}
+    conn = get_db_connection()
+    for resolution, retention in RETENTION_MS.items():
+        if retention is None:
+            continue
+        cursor = conn.execute(f"DELETE FROM equity_{resolution} WHERE ts < ?", (now - retention,))
+        deleted[resolution] = cursor.rowcount
+    conn.commit()
+    conn.close()
+    return deleted
+
+def choose_resolution(start: int, end: int, now: Optional[int] = None) -> str:
+    """기간을 MAX_POINTS 이하로 표현하면서 보존 기간 안에 있는 가장 세밀한 해상도"""
+    now = now if now is not None else int(time.time() * 1000)
+    for resolution in RESOLUTIONS:
+        retention = RETENTION_MS[resolution]
+        if retention is not None and start < now - retention:
+            continue
+        if (end - start) / BUCKET_MS[resolution] <= MAX_POINTS:
+            return resolution
+    return RESOLUTIONS[-1]
+
+def get_equity_history(start: int, end: int, resolution: str = "auto") -> Dict:
+    """
+    평가액 시계열 조회
+
+    Args:
+        start, end: 조회 구간 (epoch 밀리초, start 이상 end 미만)
+        resolution: 1m | 1h | 1d | auto
+    """
+    if resolution == "auto":
+        resolution = choose_resolution(start, end)
+    elif resolution not in RESOLUTIONS:
+        raise ValueError(f"지원하지 않는 resolution: {resolution} (1m, 1h, 1d, auto)")
+
+    conn = get_db_connection()
+    rows = conn.execute(f'''
+        SELECT ts, open, high, low, close, krw, btc, price
+        FROM equity_{resolution}
+        WHERE ts >= ? AND ts < ?
+        ORDER BY ts DESC
+        LIMIT ?
+    ''', (bucket_start(start, resolution), end, MAX_POINTS)).fetchall()
+    conn.close()
+
+    return {
+        "resolution": resolution,
+        "start": start,
+        "end": end,
+        "count": len(rows),
+        "truncated": len(rows) == MAX_POINTS,  # 최신 MAX_POINTS개만 반환됨
+        "data": [dict(row) for row in reversed(rows)],
+    }
+
+class EquitySampler:
+    """백그라운드에서 평가액을 주기적으로 기록"""
+
+    def __init__(self, fetch_snapshot, interval: float = SAMPLE_SECONDS):
+        """
+        Args:
+            fetch_snapshot: (krw, btc, price) 또는 None을 반환하는 async 함수
+            interval: 기록 주기 (초)
+        """
+        self.fetch_snapshot = fetch_snapshot
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        last_prune = 0.0
+        while True:
+            started = time.monotonic()
+            try:
+                snapshot = await self.fetch_snapshot()
+                if snapshot is not None:
+                    await run_blocking(record_sample, *snapshot)
+                if started - last_prune >= PRUNE_SECONDS:
+                    await run_blocking(prune_history)
+                    last_prune = started
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"평가액 기록 실패: {e}")
+            await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+async def fetch_equity_snapshot():
+    """
+    거래소 잔고 + 현재가로 평가액 표본 생성 (거래소를 쓸 수 없으면 원장 기준)
+    시세 장애 중에는 표본을 건너뜀 (마지막 정상 가격으로 만든 표본이 실제 값처럼 남지 않도록)
+    """
+    exchange = get_exchange()
+    if exchange is not None:
+        balances = await run_blocking(exchange.get_balances)
+        if balances:
+            krw = sum(float(b['balance']) + float(b.get('locked') or 0) for b in balances if b['currency'] == 'KRW')
+            btc = sum(float(b['balance']) + float(b.get('locked') or 0) for b in balances if b['currency'] == 'BTC')
+            return krw, btc, await fetch_current_price(stale=False)
+
+    if await run_blocking(has_fills):
+        state = await run_blocking(get_ledger_state)
+        return state.cash, state.position, await fetch_current_price(stale=False)
+
+    return None
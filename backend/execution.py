@@ -0,0 +1,277 @@
+"""
+슬리피지를 고려한 주문 실행 엔진
+
+현재 호가로 시장 충격을 추정해 실행 방식을 고릅니다.
+- limit: 최우선 호가 잔량 안에서 끝나는 주문은 최우선 호가 지정가 (미체결 잔량은 취소 후 시장가)
+- market: 여러 호가를 먹더라도 예상 슬리피지가 허용치 이하이면 시장가 한 번
+- twap: 그 외에는 여러 조각으로 나눠 일정 간격으로 시장가 실행 (호가가 회복될 시간을 둠)
+
+주문 후에는 get_order로 체결 상태를 폴링해 실제 체결가를 집계하고,
+예상 체결가와 실현 체결가를 executions 테이블에, 주문/체결 내역을 원장(ledger.py)에 기록합니다.
+거래소 객체는 pyupbit.Upbit과 같은 인터페이스(buy_market_order, get_order 등)면 무엇이든 사용할 수 있습니다.
+"""
+import json
+import math
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+
+from database import get_db_connection
+from ledger import record_opening_balance, record_order
+from orderbook_analytics import OrderbookSnapshot
+from resilience import get_orderbook
+
+TICKER = "KRW-BTC"
+MIN_ORDER_KRW = 5000
+
+STRATEGY_MARKET = "market"
+STRATEGY_LIMIT = "limit"
+STRATEGY_TWAP = "twap"
+
+def initialize_execution_table():
+    """executions 테이블 생성"""
+    conn = get_db_connection()
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS executions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at TEXT NOT NULL,
+            side TEXT NOT NULL,
+            strategy TEXT NOT NULL,
+            requested_amount REAL NOT NULL,
+            touch_price REAL,
+            expected_price REAL,
+            expected_slippage_bps REAL,
+            realized_price REAL,
+            realized_slippage_bps REAL,
+            executed_volume REAL,
+            executed_krw REAL,
+            paid_fee REAL,
+            order_uuids TEXT,
+            status TEXT NOT NULL,
+            trade_id INTEGER
+        )
+    ''')
+    conn.commit()
+    conn.close()
+
+class ExecutionPlan:
+    """실행 계획 (side가 buy면 amount는 KRW, sell이면 BTC)"""
+
+    def __init__(self, side: str, amount: float, strategy: str, touch_price: float,
+                 expected_price: float, expected_slippage_bps: float, slices: List[float],
+                 limit_price: Optional[float] = None):
+        self.side = side
+        self.amount = amount
+        self.strategy = strategy
+        self.touch_price = touch_price
+        self.expected_price = expected_price
+        self.expected_slippage_bps = expected_slippage_bps
+        self.slices = slices
+        self.limit_price = limit_price
+
+    def to_dict(self) -> Dict:
+        return dict(self.__dict__)
+
+class ExecutionEngine:
+    """주문 계획 수립, 실행, 체결 추적"""
+
+    def __init__(self, exchange, ticker: str = TICKER, max_market_slippage_bps: float = 5.0,
+                 touch_fraction: float = 0.8, max_slices: int = 6, slice_interval: float = 20.0,
+                 order_timeout: float = 30.0, poll_interval: float = 1.0,
+                 orderbook_fetcher: Callable = None, sleep: Callable[[float], None] = time.sleep):
+        """
+        Args:
+            exchange: pyupbit.Upbit 호환 객체
+            max_market_slippage_bps: 시장가 한 번으로 처리할 최대 예상 슬리피지
+            touch_fraction: 최우선 호가 잔량의 이 비율 이하 주문은 지정가로 처리
+            max_slices: TWAP 최대 분할 수
+            slice_interval: TWAP 조각 사이 간격 (초)
+            order_timeout: 주문 체결 대기 최대 시간 (초)
+            orderbook_fetcher: 호가 조회 함수 (기본: 거래소의 orderbook_source 또는 resilience.get_orderbook)
+            sleep: 대기 함수 (시뮬레이션에서는 가짜 시계로 교체)
+        """
+        self.exchange = exchange
+        self.ticker = ticker
+        self.max_market_slippage_bps = max_market_slippage_bps
+        self.touch_fraction = touch_fraction
+        self.max_slices = max_slices
+        self.slice_interval = slice_interval
+        self.order_timeout = order_timeout
+        self.poll_interval = poll_interval
+        # 모의 거래소는 자신이 체결에 쓰는 호가 소스로 계획도 세움
+        self.orderbook_fetcher = orderbook_fetcher or getattr(exchange, "orderbook_source", get_orderbook)
+        self.sleep = sleep
+
+    def fetch_orderbook(self) -> OrderbookSnapshot:
+        return OrderbookSnapshot.from_pyupbit(self.orderbook_fetcher(self.ticker))
+
+    # ==================== 계획 ====================
+
+    def plan(self, side: str, amount: float, orderbook: OrderbookSnapshot) -> ExecutionPlan:
+        """호가 기반 실행 계획 수립"""
+        if side == "buy":
+            estimate = orderbook.estimate_buy(amount)
+            touch_price, touch_size = orderbook.best_ask, orderbook.ask_sizes[0]
+            amount_krw = amount
+            fits_touch = amount / touch_price <= touch_size * self.touch_fraction
+        elif side == "sell":
+            estimate = orderbook.estimate_sell(amount)
+            touch_price, touch_size = orderbook.best_bid, orderbook.bid_sizes[0]
+            amount_krw = amount * touch_price
+            fits_touch = amount <= touch_size * self.touch_fraction
+        else:
+            raise ValueError(f"알 수 없는 주문 방향: {side}")
+
+        slippage = estimate["slippage_bps"]
+        common = dict(side=side, amount=amount, touch_price=touch_price,
+                      expected_price=estimate["avg_price"], expected_slippage_bps=slippage)
+
+        if fits_touch:
+            # 최우선 호가 잔량으로 충분하면 그 가격의 지정가 (호가가 그 사이 밀려도 더 나쁜 가격에 체결되지 않음)
+            return ExecutionPlan(strategy=STRATEGY_LIMIT, slices=[amount], limit_price=touch_price, **common)
+
+        if slippage <= self.max_market_slippage_bps and estimate["fully_filled"]:
+            return ExecutionPlan(strategy=STRATEGY_MARKET, slices=[amount], **common)
+
+        # 조각당 슬리피지가 허용치 근처가 되도록 분할 (최소 주문 금액 이상 유지)
+        n = math.ceil(slippage / max(self.max_market_slippage_bps, 0.1)) if estimate["fully_filled"] else self.max_slices
+        n = max(2, min(n, self.max_slices, int(amount_krw // MIN_ORDER_KRW)))
+        if n < 2:
+            return ExecutionPlan(strategy=STRATEGY_MARKET, slices=[amount], **common)
+
+        return ExecutionPlan(strategy=STRATEGY_TWAP, slices=[amount / n] * n, **common)
+
+    # ==================== 실행 ====================
+
+    def execute(self, side: str, amount: float, orderbook: Optional[OrderbookSnapshot] = None,
+                trade_id: Optional[int] = None) -> Dict:
+        """
+        주문 실행 후 체결 결과 반환 및 기록
+
+        Returns:
+            plan, 주문 uuid 목록, 실현 체결가/수량/금액/수수료, 실현 슬리피지
+        """
+        orderbook = orderbook or self.fetch_orderbook()
+        plan = self.plan(side, amount, orderbook)
+        orders: List[Dict] = []
+
+        # 원장의 첫 주문이면 주문 전 잔고를 기준점으로 기록
+        record_opening_balance(self.exchange, orderbook.mid)
+
+        if plan.strategy == STRATEGY_LIMIT:
+            orders.extend(self._execute_limit(plan))
+        else:
+            for i, child in enumerate(plan.slices):
+                if i > 0:
+                    self.sleep(self.slice_interval)
+                orders.append(self._track(self._submit_market(side, child)))
+
+        report = self._summarize(plan, orders)
+        report["execution_id"] = record_execution(report, trade_id=trade_id)
+        return report
+
+    def _submit_market(self, side: str, amount: float) -> Dict:
+        if side == "buy":
+            return self.exchange.buy_market_order(self.ticker, amount)
+        return self.exchange.sell_market_order(self.ticker, round_volume(amount))
+
+    def _execute_limit(self, plan: ExecutionPlan) -> List[Dict]:
+        """최우선 호가 지정가 주문, 시간 내 미체결 잔량은 취소 후 시장가로 처리"""
+        price = plan.limit_price
+        volume = round_volume(plan.amount / price if plan.side == "buy" else plan.amount)
+        if plan.side == "buy":
+            order = self.exchange.buy_limit_order(self.ticker, price, volume)
+        else:
+            order = self.exchange.sell_limit_order(self.ticker, price, volume)
+
+        tracked = self._track(order)
+        orders = [tracked]
+
+        remaining = float(tracked.get("remaining_volume") or 0)
+        if tracked.get("state") == "wait" and remaining > 0:
+            self.exchange.cancel_order(tracked["uuid"])
+            tracked = self._track(tracked, wait_states=("wait",))
+            orders[0] = tracked
+            remaining = float(tracked.get("remaining_volume") or 0)
+            if remaining * price >= MIN_ORDER_KRW:
+                rest = remaining * price if plan.side == "buy" else remaining
+                orders.append(self._track(self._submit_market(plan.side, rest)))
+
+        return orders
+
+    def _track(self, order: Optional[Dict], wait_states=("wait", "watch")) -> Dict:
+        """체결 완료(done/cancel) 또는 타임아웃까지 주문 상태 폴링"""
+        if not order or "uuid" not in order:
+            return {"state": "error", "error": order}
+
+        record_order(order)
+        deadline = time.monotonic() + self.order_timeout
+        status = order
+        while True:
+            latest = self.exchange.get_order(order["uuid"])
+            if latest and "uuid" in latest:
+                status = latest
+            if status.get("state") not in wait_states or time.monotonic() >= deadline:
+                record_order(status)
+                return status
+            self.sleep(self.poll_interval)
+
+    def _summarize(self, plan: ExecutionPlan, orders: List[Dict]) -> Dict:
+        volume = krw = fee = 0.0
+        for order in orders:
+            for trade in order.get("trades") or []:
+                volume += float(trade["volume"])
+                krw += float(trade["funds"])
+            fee += float(order.get("paid_fee") or 0)
+
+        realized_price = krw / volume if volume > 0 else None
+        realized_slippage = (abs(realized_price - plan.touch_price) / plan.touch_price * 10000
+                             if realized_price else None)
+        errors = [o for o in orders if o.get("state") == "error"]
+
+        return {
+            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "plan": plan.to_dict(),
+            "order_uuids": [o["uuid"] for o in orders if "uuid" in o],
+            "orders": orders,
+            "realized_price": realized_price,
+            "realized_slippage_bps": realized_slippage,
+            "executed_volume": volume,
+            "executed_krw": krw,
+            "paid_fee": fee,
+            "status": "failed" if errors and volume == 0 else ("partial" if errors else "done"),
+        }
+
+def round_volume(volume: float) -> float:
+    """Upbit 수량 정밀도(소수점 8자리)로 내림"""
+    return math.floor(volume * 1e8) / 1e8
+
+def record_execution(report: Dict, trade_id: Optional[int] = None) -> int:
+    """실행 결과를 executions 테이블에 기록"""
+    plan = report["plan"]
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT INTO executions (created_at, side, strategy, requested_amount, touch_price,
+                                expected_price, expected_slippage_bps, realized_price,
+                                realized_slippage_bps, executed_volume, executed_krw,
+                                paid_fee, order_uuids, status, trade_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (
+        report["created_at"], plan["side"], plan["strategy"], plan["amount"], plan["touch_price"],
+        plan["expected_price"], plan["expected_slippage_bps"], report["realized_price"],
+        report["realized_slippage_bps"], report["executed_volume"], report["executed_krw"],
+        report["paid_fee"], json.dumps(report["order_uuids"]), report["status"], trade_id
+    ))
+    execution_id = cursor.lastrowid
+    conn.commit()
+    conn.close()
+    return execution_id
+
+def link_execution_to_trade(execution_id: int, trade_id: int):
+    """거래 기록(trades) 생성 후 실행 결과와 연결"""
+    conn = get_db_connection()
+    conn.execute("UPDATE executions SET trade_id = ? WHERE id = ?", (trade_id, execution_id))
+    conn.commit()
+    conn.close()
@@ -6,7 +6,7 @@ import sqlite3
 import os
 from datetime import datetime
 
-DB_PATH = "../ai_trading.db"
+from database import DB_PATH  # autotrade.py, API 서버와 같은 파일
 
 def initialize_database():
     """데이터베이스 초기화"""
@@ -0,0 +1,280 @@
+"""
+AI 분석/거래 작업 큐
+SQLite 기반 영속 큐에 작업을 저장하고 백그라운드 워커가 순서대로 처리합니다.
+
+실행 중인 작업에는 맡은 워커(WORKER_ID)와 하트비트 시각을 기록합니다.
+여러 워커 프로세스가 같은 큐를 쓰므로, 하트비트가 JOB_STALE_SECONDS 넘게 끊긴 작업만
+중단된 것으로 보고 실패 처리합니다 (다른 워커가 실행 중인 작업은 건드리지 않음).
+"""
+import os
+import json
+import uuid
+import socket
+import asyncio
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional, Tuple
+
+from database import get_db_connection
+from async_utils import run_blocking, run_ai
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+# 이 프로세스의 워커 식별자
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "10"))
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "60"))
+
+def initialize_job_table():
+    """jobs 테이블 생성 및 중단된 작업 정리"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            params TEXT NOT NULL,
+            dedupe_key TEXT NOT NULL,
+            status TEXT NOT NULL,
+            result TEXT,
+            error TEXT,
+            created_at TEXT NOT NULL,
+            started_at TEXT,
+            finished_at TEXT,
+            worker_id TEXT,
+            heartbeat_at TEXT
+        )
+    ''')
+    existing = {row["name"] for row in cursor.execute("PRAGMA table_info(jobs)")}
+    for column in ("worker_id", "heartbeat_at"):
+        if column not in existing:
+            cursor.execute(f"ALTER TABLE jobs ADD COLUMN {column} TEXT")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_dedupe ON jobs (dedupe_key, status)")
+
+    conn.commit()
+    conn.close()
+    fail_stale_jobs()
+
+def fail_stale_jobs(stale_seconds: float = JOB_STALE_SECONDS) -> int:
+    """
+    하트비트가 끊긴 실행 중 작업을 실패 처리, 처리한 작업 수 반환
+    (워커가 죽은 작업, 실제 거래가 중복 실행되지 않도록 재시도하지 않음)
+    """
+    cutoff = (datetime.now() - timedelta(seconds=stale_seconds)).isoformat()
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute('''
+            UPDATE jobs SET status = ?, error = ?, finished_at = ?
+            WHERE status = ? AND COALESCE(heartbeat_at, started_at, created_at) < ?
+        ''', (JOB_FAILED, "작업을 실행하던 워커가 중단되었습니다.", datetime.now().isoformat(), JOB_RUNNING, cutoff))
+        conn.commit()
+        if cursor.rowcount:
+            print(f"중단된 작업 {cursor.rowcount}건을 실패 처리했습니다.")
+        return cursor.rowcount
+    finally:
+        conn.close()
+
+def heartbeat_jobs(worker_id: str = WORKER_ID) -> int:
+    """이 워커가 실행 중인 작업의 하트비트 갱신"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute(
+            "UPDATE jobs SET heartbeat_at = ? WHERE status = ? AND worker_id = ?",
+            (datetime.now().isoformat(), JOB_RUNNING, worker_id)
+        )
+        conn.commit()
+        return cursor.rowcount
+    finally:
+        conn.close()
+
+def _row_to_job(row) -> Dict:
+    job = dict(row)
+    job["params"] = json.loads(job["params"])
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    job.pop("dedupe_key", None)
+    job.pop("heartbeat_at", None)
+    return job
+
+def enqueue_job(kind: str, params: Dict) -> Tuple[Dict, bool]:
+    """
+    작업 등록
+
+    같은 종류/파라미터의 작업이 대기 중이거나 실행 중이면 새로 만들지 않고 기존 작업을 반환합니다.
+
+    Returns:
+        (작업 정보, 새로 생성되었는지 여부)
+    """
+    dedupe_key = f"{kind}:{json.dumps(params, sort_keys=True)}"
+
+    conn = get_db_connection()
+    conn.isolation_level = None
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute(
+            "SELECT * FROM jobs WHERE dedupe_key = ? AND status IN (?, ?) ORDER BY created_at LIMIT 1",
+            (dedupe_key, JOB_PENDING, JOB_RUNNING)
+        )
+        existing = cursor.fetchone()
+        if existing:
+            cursor.execute("COMMIT")
+            return _row_to_job(existing), False
+
+        job_id = uuid.uuid4().hex
+        cursor.execute('''
+            INSERT INTO jobs (id, kind, params, dedupe_key, status, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (job_id, kind, json.dumps(params), dedupe_key, JOB_PENDING, datetime.now().isoformat()))
+        cursor.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        job = cursor.fetchone()
+        cursor.execute("COMMIT")
+        return _row_to_job(job), True
+    except Exception:
+        cursor.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+def get_job(job_id: str) -> Optional[Dict]:
+    """작업 상태 조회"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+    job = cursor.fetchone()
+    conn.close()
+
+    return _row_to_job(job) if job else None
+
+def claim_next_job(worker_id: str = WORKER_ID) -> Optional[Dict]:
+    """가장 오래된 대기 작업을 실행 중 상태로 바꾸고 반환"""
+    conn = get_db_connection()
+    conn.isolation_level = None
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute(
+            "SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+            (JOB_PENDING,)
+        )
+        job = cursor.fetchone()
+        if not job:
+            cursor.execute("COMMIT")
+            return None
+
+        now = datetime.now().isoformat()
+        cursor.execute(
+            "UPDATE jobs SET status = ?, started_at = ?, worker_id = ?, heartbeat_at = ? WHERE id = ?",
+            (JOB_RUNNING, now, worker_id, now, job["id"])
+        )
+        cursor.execute("COMMIT")
+        return _row_to_job(job)
+    except Exception:
+        cursor.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+def finish_job(job_id: str, result: Optional[Dict] = None, error: Optional[str] = None,
+               worker_id: str = WORKER_ID) -> bool:
+    """
+    작업 완료/실패 기록, 기록했는지 반환
+
+    이 워커가 실행 중인 작업일 때만 기록합니다. 하트비트가 끊겨 이미 실패 처리된 작업의 결과가
+    뒤늦게 덮어쓰지 않도록 합니다.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    cursor.execute('''
+        UPDATE jobs
+        SET status = ?, result = ?, error = ?, finished_at = ?
+        WHERE id = ? AND status = ? AND worker_id = ?
+    ''', (
+        JOB_FAILED if error else JOB_DONE,
+        json.dumps(result, default=str) if result is not None else None,
+        error,
+        datetime.now().isoformat(),
+        job_id,
+        JOB_RUNNING,
+        worker_id
+    ))
+    updated = cursor.rowcount > 0
+
+    conn.commit()
+    conn.close()
+    if not updated:
+        print(f"작업 {job_id}은(는) 이 워커({worker_id})가 실행 중인 작업이 아니어서 결과를 기록하지 않았습니다.")
+    return updated
+
+class JobWorker:
+    """큐에서 작업을 꺼내 등록된 핸들러로 실행하는 백그라운드 워커"""
+
+    def __init__(self, concurrency: int = 1, poll_interval: float = 5.0):
+        self.handlers: Dict[str, Callable[..., Dict]] = {}
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self._wakeup = asyncio.Event()
+        self._tasks = []
+
+    def register(self, kind: str, handler: Callable[..., Dict]):
+        """작업 종류별 핸들러 등록 (params가 키워드 인자로 전달됨)"""
+        self.handlers[kind] = handler
+
+    async def submit(self, kind: str, params: Dict) -> Tuple[Dict, bool]:
+        """작업 등록 후 워커를 깨움"""
+        job, created = await run_blocking(enqueue_job, kind, params)
+        if created:
+            self._wakeup.set()
+        return job, created
+
+    async def start(self):
+        for _ in range(self.concurrency):
+            self._tasks.append(asyncio.create_task(self._run()))
+        self._tasks.append(asyncio.create_task(self._heartbeat()))
+
+    async def _heartbeat(self):
+        """실행 중인 작업의 하트비트를 갱신하고, 다른 워커가 죽어 남은 작업을 정리"""
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+            try:
+                await run_blocking(heartbeat_jobs)
+                await run_blocking(fail_stale_jobs)
+            except Exception as e:
+                print(f"작업 하트비트 실패: {e}")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            job = await run_blocking(claim_next_job)
+            if job is None:
+                # 새 작업이 등록되거나 다른 프로세스가 넣은 작업을 확인할 때까지 대기
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            handler = self.handlers.get(job["kind"])
+            if handler is None:
+                await run_blocking(finish_job, job["id"], error=f"알 수 없는 작업 종류: {job['kind']}")
+                continue
+
+            try:
+                result = await run_ai(handler, **job["params"])
+                await run_blocking(finish_job, job["id"], result=result)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"작업 실패 ({job['kind']} {job['id']}): {e}")
+                await run_blocking(finish_job, job["id"], error=str(e))
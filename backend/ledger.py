@@ -0,0 +1,316 @@
+"""
+주문/체결 원장
+주문(uuid)과 체결 내역을 추가 전용(append-only)으로 기록하고, 여기서 포지션·평균 단가·실현 손익·
+수수료·시간가중수익률(TWR)을 증분 계산합니다.
+
+- orders: 주문 생성 정보 (한 번만 기록)
+- order_states: 주문 상태가 바뀔 때마다 한 줄씩 추가 (wait → done/cancel)
+- fills: 체결 한 건당 한 줄 (같은 주문을 여러 번 조회해도 (order_uuid, seq)로 중복 방지)
+- ledger_opening: 원장 시작 시점의 잔고 (그 전에 보유하던 BTC의 평균 단가 기준점)
+"""
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from database import get_db_connection, table_exists, get_portfolio_performance as get_snapshot_performance
+
+def initialize_ledger_tables():
+    """원장 테이블 생성"""
+    conn = get_db_connection()
+    conn.executescript('''
+        CREATE TABLE IF NOT EXISTS orders (
+            uuid TEXT PRIMARY KEY,
+            created_at TEXT NOT NULL,
+            market TEXT NOT NULL,
+            side TEXT NOT NULL,
+            ord_type TEXT NOT NULL,
+            price REAL,
+            volume REAL
+        );
+
+        CREATE TABLE IF NOT EXISTS order_states (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_uuid TEXT NOT NULL,
+            observed_at TEXT NOT NULL,
+            state TEXT NOT NULL,
+            executed_volume REAL NOT NULL,
+            paid_fee REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_order_states_uuid ON order_states(order_uuid, id);
+
+        CREATE TABLE IF NOT EXISTS fills (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_uuid TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            filled_at TEXT NOT NULL,
+            side TEXT NOT NULL,
+            price REAL NOT NULL,
+            volume REAL NOT NULL,
+            funds REAL NOT NULL,
+            fee REAL NOT NULL,
+            UNIQUE (order_uuid, seq)
+        );
+
+        CREATE TABLE IF NOT EXISTS ledger_opening (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            opened_at TEXT NOT NULL,
+            krw_balance REAL NOT NULL,
+            btc_balance REAL NOT NULL,
+            btc_avg_buy_price REAL NOT NULL,
+            btc_krw_price REAL
+        );
+    ''')
+    conn.commit()
+    conn.close()
+
+def _now() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+# ==================== 기록 ====================
+
+def record_opening_balance(exchange, btc_krw_price: Optional[float] = None) -> bool:
+    """원장 시작 잔고 기록 (이미 있으면 그대로 두고 False)"""
+    conn = get_db_connection()
+    exists = conn.execute("SELECT 1 FROM ledger_opening WHERE id = 1").fetchone()
+    conn.close()
+    if exists:
+        return False
+
+    balances = exchange.get_balances() or []
+    krw = next((float(b['balance']) + float(b.get('locked') or 0) for b in balances if b['currency'] == 'KRW'), 0.0)
+    btc = next((float(b['balance']) + float(b.get('locked') or 0) for b in balances if b['currency'] == 'BTC'), 0.0)
+    avg = next((float(b['avg_buy_price']) for b in balances if b['currency'] == 'BTC'), 0.0)
+
+    conn = get_db_connection()
+    conn.execute('''
+        INSERT OR IGNORE INTO ledger_opening (id, opened_at, krw_balance, btc_balance, btc_avg_buy_price, btc_krw_price)
+        VALUES (1, ?, ?, ?, ?, ?)
+    ''', (_now(), krw, btc, avg, btc_krw_price or avg or None))
+    conn.commit()
+    conn.close()
+    return True
+
+def record_order(order: Dict):
+    """
+    주문 조회 결과(pyupbit get_order / 주문 응답)를 원장에 반영
+
+    - 처음 보는 주문이면 orders에 추가
+    - 마지막으로 기록한 상태와 다르면 order_states에 추가
+    - 아직 기록하지 않은 체결(trades)만 fills에 추가
+    """
+    if not order or "uuid" not in order:
+        return
+
+    now = _now()
+    trades = order.get("trades") or []
+    executed_volume = float(order.get("executed_volume") or 0)
+    paid_fee = float(order.get("paid_fee") or 0)
+    total_funds = sum(float(t["funds"]) for t in trades)
+    # Upbit은 주문 단위 수수료만 주므로 체결 금액 비율로 배분
+    fee_rate = paid_fee / total_funds if total_funds > 0 else 0.0
+
+    conn = get_db_connection()
+    try:
+        conn.execute('''
+            INSERT OR IGNORE INTO orders (uuid, created_at, market, side, ord_type, price, volume)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (order["uuid"], order.get("created_at") or now, order.get("market", "KRW-BTC"),
+              order["side"], order.get("ord_type", ""),
+              float(order["price"]) if order.get("price") else None,
+              float(order["volume"]) if order.get("volume") else None))
+
+        last = conn.execute('''
+            SELECT state, executed_volume FROM order_states
+            WHERE order_uuid = ? ORDER BY id DESC LIMIT 1
+        ''', (order["uuid"],)).fetchone()
+        if last is None or last["state"] != order.get("state") or last["executed_volume"] != executed_volume:
+            conn.execute('''
+                INSERT INTO order_states (order_uuid, observed_at, state, executed_volume, paid_fee)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (order["uuid"], now, order.get("state", "unknown"), executed_volume, paid_fee))
+
+        conn.executemany('''
+            INSERT OR IGNORE INTO fills (order_uuid, seq, filled_at, side, price, volume, funds, fee)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [
+            (order["uuid"], seq, trade.get("created_at") or now, order["side"],
+             float(trade["price"]), float(trade["volume"]), float(trade["funds"]),
+             float(trade["funds"]) * fee_rate)
+            for seq, trade in enumerate(trades)
+        ])
+        conn.commit()
+    finally:
+        conn.close()
+
+def get_open_order_uuids() -> List[str]:
+    """마지막 상태가 wait/watch인 주문"""
+    conn = get_db_connection()
+    rows = conn.execute('''
+        SELECT s.order_uuid FROM order_states s
+        WHERE s.id = (SELECT MAX(id) FROM order_states WHERE order_uuid = s.order_uuid)
+          AND s.state IN ('wait', 'watch')
+    ''').fetchall()
+    conn.close()
+    return [row["order_uuid"] for row in rows]
+
+def sync_open_orders(exchange) -> int:
+    """미체결로 남은 주문의 상태를 거래소에서 다시 조회해 반영 (재시작 후 복구용)"""
+    synced = 0
+    for order_uuid in get_open_order_uuids():
+        try:
+            order = exchange.get_order(order_uuid)
+        except Exception as e:
+            print(f"주문 조회 실패 ({order_uuid}): {e}")
+            continue
+        if order and "uuid" in order:
+            record_order(order)
+            synced += 1
+    return synced
+
+# ==================== 증분 계산 ====================
+
+class LedgerState:
+    """체결을 순서대로 적용해 포지션과 손익을 계산 (평균 단가 방식)"""
+
+    def __init__(self, krw: float = 0.0, btc: float = 0.0, avg_price: float = 0.0,
+                 price: Optional[float] = None, initial_value: Optional[float] = None):
+        self.cash = krw
+        self.position = btc
+        self.cost_basis = btc * avg_price
+        self.realized_pnl = 0.0
+        self.fees = 0.0
+        self.buy_volume = 0.0
+        self.sell_volume = 0.0
+        self.last_fill_id = 0
+        self.last_price = price
+        self.initial_value = initial_value if initial_value is not None else krw + btc * (price or avg_price)
+        # 체결 시점마다 끊어 곱한 BTC 보유분의 수익률 (매수/매도는 외부 현금 흐름으로 취급)
+        self._twr_factor = 1.0
+
+    @property
+    def avg_price(self) -> float:
+        return self.cost_basis / self.position if self.position > 1e-12 else 0.0
+
+    def apply(self, fill: Dict):
+        price, volume, funds, fee = fill["price"], fill["volume"], fill["funds"], fill["fee"]
+
+        if self.last_price and self.position > 1e-12:
+            held_value = self.position * self.last_price
+            self._twr_factor *= (self.position * price - fee) / held_value
+
+        if fill["side"] == "bid":
+            # Upbit 평균 매입가와 맞추기 위해 매수 수수료는 단가에 넣지 않고 바로 실현 손익에서 차감
+            self.cash -= funds + fee
+            self.cost_basis += funds
+            self.realized_pnl -= fee
+            self.position += volume
+            self.buy_volume += funds
+        else:
+            released = self.avg_price * volume
+            self.realized_pnl += funds - fee - released
+            self.cash += funds - fee
+            self.cost_basis -= released
+            self.position -= volume
+            self.sell_volume += funds
+            if self.position <= 1e-12:
+                self.position = 0.0
+                self.cost_basis = 0.0
+
+        self.fees += fee
+        self.last_price = price
+        self.last_fill_id = fill["id"]
+
+    def unrealized_pnl(self, price: float) -> float:
+        return self.position * price - self.cost_basis
+
+    def time_weighted_return(self, price: Optional[float] = None) -> float:
+        factor = self._twr_factor
+        if price and self.last_price and self.position > 1e-12:
+            factor *= price / self.last_price
+        return factor - 1
+
+    def summary(self, price: Optional[float] = None) -> Dict:
+        price = price or self.last_price or 0.0
+        total_value = self.cash + self.position * price
+        profit_loss = total_value - self.initial_value
+        return {
+            "current_btc_balance": self.position,
+            "current_krw_balance": self.cash,
+            "btc_avg_buy_price": self.avg_price,
+            "current_btc_price": price,
+            "total_value_krw": total_value,
+            "initial_value_krw": self.initial_value,
+            "profit_loss": profit_loss,
+            "profit_loss_percentage": profit_loss / self.initial_value * 100 if self.initial_value > 0 else 0,
+            "realized_pnl": self.realized_pnl,
+            "unrealized_pnl": self.unrealized_pnl(price),
+            "total_fees": self.fees,
+            "time_weighted_return": self.time_weighted_return(price) * 100,
+            "source": "ledger",
+        }
+
+_state: Optional[LedgerState] = None
+_state_lock = threading.Lock()
+
+def _load_opening(conn) -> Optional[Dict]:
+    row = conn.execute("SELECT * FROM ledger_opening WHERE id = 1").fetchone()
+    return dict(row) if row else None
+
+def get_ledger_state() -> LedgerState:
+    """원장 상태 (이전 호출 이후 새로 추가된 체결만 읽어 적용)"""
+    global _state
+
+    with _state_lock:
+        conn = get_db_connection()
+        try:
+            if _state is None:
+                opening = _load_opening(conn)
+                if opening:
+                    _state = LedgerState(opening["krw_balance"], opening["btc_balance"],
+                                         opening["btc_avg_buy_price"], opening["btc_krw_price"])
+                else:
+                    _state = LedgerState()
+
+            rows = conn.execute(
+                "SELECT id, side, price, volume, funds, fee FROM fills WHERE id > ? ORDER BY id",
+                (_state.last_fill_id,)
+            ).fetchall()
+        finally:
+            conn.close()
+
+        for row in rows:
+            _state.apply(dict(row))
+        return _state
+
+def reset_ledger_state():
+    """캐시된 원장 상태 폐기 (DB를 바꿨을 때)"""
+    global _state
+    with _state_lock:
+        _state = None
+
+def has_fills() -> bool:
+    conn = get_db_connection()
+    row = conn.execute("SELECT 1 FROM fills LIMIT 1").fetchone() if table_exists(conn, "fills") else None
+    conn.close()
+    return row is not None
+
+def get_portfolio_performance() -> Dict:
+    """
+    포트폴리오 성과 (원장 우선)
+
+    체결 기록이 있으면 원장에서 계산하고, 평가 가격은 가장 최근 거래 기록의 BTC 가격을 사용합니다.
+    원장이 비어 있으면 기존 잔고 스냅샷 방식으로 계산합니다.
+    """
+    if not has_fills():
+        return dict(get_snapshot_performance(), source="snapshots")
+
+    state = get_ledger_state()
+
+    conn = get_db_connection()
+    row = None
+    if table_exists(conn, "trades"):
+        row = conn.execute("SELECT btc_krw_price FROM trades ORDER BY timestamp DESC LIMIT 1").fetchone()
+    conn.close()
+    price = row["btc_krw_price"] if row and row["btc_krw_price"] else state.last_price
+
+    return state.summary(price)
@@ -0,0 +1,274 @@
+"""
+반성 일기 압축 (lessons)
+쌓여 가는 반성 일기를 비슷한 것끼리 묶어 짧은 교훈(lesson)으로 요약하고 버전별로 보관합니다.
+
+- 압축은 아직 압축되지 않은 일기만 대상으로 증분 실행 (압축된 일기는 lesson_sources에 기록)
+  반성 일기는 거래 후 나중에, 최신 거래부터 채워지므로 trade id 워터마크 대신 일기별로 추적
+- 최신 RAW_RECENT개의 일기는 원문 그대로 프롬프트에 쓰이므로 압축 대상에서 제외
+- 새 일기는 가장 비슷한 기존 교훈에 합쳐지거나(유사도 CLUSTER_THRESHOLD 이상) 새 교훈이 됨
+- 묶음이 크면 DISTILL_BATCH개씩 나눠 교훈을 이어서 갱신 (처음 실행 시 밀린 일기 처리)
+- 교훈이 갱신될 때마다 새 버전 행을 추가하고 이전 버전은 비활성화 (이력 보존)
+
+결정 프롬프트에는 현재 상황과 비슷한 교훈(토큰 예산 안) + 최신 원문 일기만 들어가므로
+거래 이력이 늘어나도 프롬프트 크기가 일정합니다.
+"""
+import os
+import json
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from database import get_db_connection, table_exists
+from reflection_index import vectorize, estimate_tokens
+
+RAW_RECENT = int(os.getenv("LESSON_RAW_RECENT", "2"))
+MIN_BATCH = int(os.getenv("LESSON_MIN_BATCH", "5"))
+MAX_LESSONS = int(os.getenv("LESSON_MAX_ACTIVE", "12"))
+CLUSTER_THRESHOLD = 0.3
+DISTILL_BATCH = 10  # 요약 호출 한 번에 넘기는 최대 일기 수
+LESSON_TOKEN_BUDGET = 800
+DISTILL_MODEL = "gpt-4o-mini"
+
+def initialize_lesson_tables():
+    """lessons / lesson_sources / lesson_compaction 테이블 생성"""
+    conn = get_db_connection()
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS lessons (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            lesson_key INTEGER NOT NULL,
+            version INTEGER NOT NULL,
+            lesson TEXT NOT NULL,
+            source_count INTEGER NOT NULL,
+            source_trade_ids TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            active INTEGER NOT NULL DEFAULT 1,
+            UNIQUE(lesson_key, version)
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_lessons_active ON lessons(active, lesson_key)')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS lesson_sources (
+            trade_id INTEGER PRIMARY KEY,
+            lesson_key INTEGER NOT NULL,
+            compacted_at TEXT NOT NULL
+        )
+    ''')
+    # 이전 버전 DB: 현재 교훈의 근거 일기를 압축된 것으로 기록
+    if conn.execute("SELECT COUNT(*) FROM lesson_sources").fetchone()[0] == 0:
+        for row in conn.execute("SELECT lesson_key, source_trade_ids, created_at FROM lessons WHERE active = 1").fetchall():
+            conn.executemany(
+                "INSERT OR IGNORE INTO lesson_sources (trade_id, lesson_key, compacted_at) VALUES (?, ?, ?)",
+                [(trade_id, row["lesson_key"], row["created_at"]) for trade_id in json.loads(row["source_trade_ids"])]
+            )
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS lesson_compaction (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            last_trade_id INTEGER NOT NULL,
+            last_run_at TEXT NOT NULL,
+            runs INTEGER NOT NULL
+        )
+    ''')
+    conn.commit()
+    conn.close()
+
+def get_active_lessons() -> List[Dict]:
+    """현재 버전의 교훈 목록 (근거 일기가 많은 순)"""
+    conn = get_db_connection()
+    try:
+        if not table_exists(conn, "lessons"):
+            return []
+        rows = conn.execute('''
+            SELECT lesson_key, version, lesson, source_count, source_trade_ids, created_at
+            FROM lessons WHERE active = 1
+            ORDER BY source_count DESC, lesson_key
+        ''').fetchall()
+    finally:
+        conn.close()
+    return [{**dict(row), "source_trade_ids": json.loads(row["source_trade_ids"])} for row in rows]
+
+def get_recent_raw_reflections(limit: int = RAW_RECENT) -> List[Dict]:
+    """가장 최근 원문 반성 일기"""
+    conn = get_db_connection()
+    try:
+        if not table_exists(conn, "trades"):
+            return []
+        rows = conn.execute('''
+            SELECT id, timestamp, decision, percentage, reflection FROM trades
+            WHERE reflection IS NOT NULL AND reflection != ''
+            ORDER BY id DESC LIMIT ?
+        ''', (limit,)).fetchall()
+    finally:
+        conn.close()
+    return [dict(row) for row in rows]
+
+# ==================== 압축 ====================
+
+def openai_distill(existing: Optional[str], reflections: List[str]) -> str:
+    """기존 교훈과 새 반성 일기를 합쳐 짧은 교훈으로 요약 (OpenAI)"""
+    from resilience import openai_client
+
+    client = openai_client(api_key=os.getenv("OPENAI_API_KEY"))
+    joined = "\n---\n".join(reflections)
+    prompt = (
+        "You maintain a short list of trading lessons distilled from past Bitcoin trade reflections.\n"
+        f"Current lesson: {existing or '(none)'}\n\n"
+        f"New reflections on similar situations:\n{joined}\n\n"
+        "Rewrite the lesson so it also covers the new reflections. "
+        "State the market situation it applies to and the concrete rule to follow, in at most 3 sentences."
+    )
+    response = client.chat.completions.create(
+        model=DISTILL_MODEL,
+        messages=[{"role": "user", "content": prompt}],
+    )
+    return response.choices[0].message.content.strip()
+
+def _unit_rows(texts: List[str]) -> np.ndarray:
+    """TF-IDF 정규화 행렬 (교훈 + 새 일기를 한 묶음으로 IDF 계산)"""
+    matrix = np.vstack([vectorize(t) for t in texts])
+    doc_freq = (matrix > 0).sum(axis=0)
+    matrix *= np.log((1 + len(texts)) / (1 + doc_freq)) + 1
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return matrix / norms
+
+def assign_clusters(lesson_texts: List[str], reflection_texts: List[str]) -> List[int]:
+    """
+    새 일기마다 합칠 교훈 번호 반환
+
+    0..len(lesson_texts)-1 은 기존 교훈, 그 이상은 새로 만들 교훈 (greedy leader 방식).
+    교훈 수가 MAX_LESSONS에 도달하면 임계값과 관계없이 가장 비슷한 교훈에 합침
+    """
+    rows = _unit_rows(lesson_texts + reflection_texts)
+    leaders = list(rows[:len(lesson_texts)])
+    assignment = []
+    for vec in rows[len(lesson_texts):]:
+        if leaders:
+            scores = np.asarray(leaders) @ vec
+            best = int(np.argmax(scores))
+            if scores[best] >= CLUSTER_THRESHOLD or len(leaders) >= MAX_LESSONS:
+                assignment.append(best)
+                continue
+        leaders.append(vec)
+        assignment.append(len(leaders) - 1)
+    return assignment
+
+def compact_reflections(distill: Callable[[Optional[str], List[str]], str] = openai_distill,
+                        force: bool = False) -> Dict:
+    """
+    아직 압축되지 않은 반성 일기를 교훈으로 압축
+
+    Args:
+        distill: (기존 교훈 또는 None, 새 일기 목록) -> 새 교훈
+        force: MIN_BATCH보다 적어도 실행
+
+    Returns:
+        {"processed": 처리한 일기 수, "updated": 갱신/생성된 교훈 수, "last_trade_id": 압축된 가장 최근 거래 id}
+    """
+    conn = get_db_connection()
+    try:
+        state = conn.execute("SELECT last_trade_id, runs FROM lesson_compaction WHERE id = 1").fetchone()
+        last_trade_id = state["last_trade_id"] if state else 0
+        runs = state["runs"] if state else 0
+
+        # 최신 RAW_RECENT개(get_recent_raw_reflections와 같은 일기)는 원문으로 쓰이므로 제외
+        rows = conn.execute('''
+            SELECT t.id, t.reflection FROM trades t
+            LEFT JOIN lesson_sources s ON s.trade_id = t.id
+            WHERE s.trade_id IS NULL AND t.reflection IS NOT NULL AND t.reflection != ''
+              AND t.id NOT IN (
+                  SELECT id FROM trades WHERE reflection IS NOT NULL AND reflection != ''
+                  ORDER BY id DESC LIMIT ?
+              )
+            ORDER BY t.id
+        ''', (RAW_RECENT,)).fetchall()
+        if not rows or (len(rows) < MIN_BATCH and not force):
+            return {"processed": 0, "updated": 0, "last_trade_id": last_trade_id}
+
+        lessons = [dict(row) for row in conn.execute('''
+            SELECT lesson_key, version, lesson, source_count, source_trade_ids
+            FROM lessons WHERE active = 1 ORDER BY lesson_key
+        ''')]
+    finally:
+        conn.close()
+
+    assignment = assign_clusters([l["lesson"] for l in lessons], [row["reflection"] for row in rows])
+
+    groups: Dict[int, List] = {}
+    for cluster, row in zip(assignment, rows):
+        groups.setdefault(cluster, []).append(row)
+
+    # OpenAI 호출은 DB 연결 밖에서
+    next_key = max((l["lesson_key"] for l in lessons), default=0) + 1
+    updates = []
+    sources = []
+    for cluster, members in sorted(groups.items()):
+        existing = lessons[cluster] if cluster < len(lessons) else None
+        text = existing["lesson"] if existing else None
+        for start in range(0, len(members), DISTILL_BATCH):
+            text = distill(text, [m["reflection"] for m in members[start:start + DISTILL_BATCH]])
+        member_ids = [m["id"] for m in members]
+        if existing:
+            key = existing["lesson_key"]
+            updates.append((key, existing["version"] + 1, text,
+                            existing["source_count"] + len(members),
+                            json.loads(existing["source_trade_ids"]) + member_ids))
+        else:
+            key = next_key
+            updates.append((key, 1, text, len(members), member_ids))
+            next_key += 1
+        sources.extend((trade_id, key) for trade_id in member_ids)
+
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    new_last_id = max(last_trade_id, rows[-1]["id"])
+    conn = get_db_connection()
+    try:
+        for key, version, text, count, ids in updates:
+            conn.execute("UPDATE lessons SET active = 0 WHERE lesson_key = ? AND active = 1", (key,))
+            conn.execute('''
+                INSERT INTO lessons (lesson_key, version, lesson, source_count, source_trade_ids, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (key, version, text, count, json.dumps(ids), now))
+        conn.executemany(
+            "INSERT OR IGNORE INTO lesson_sources (trade_id, lesson_key, compacted_at) VALUES (?, ?, ?)",
+            [(trade_id, key, now) for trade_id, key in sources]
+        )
+        conn.execute('''
+            INSERT INTO lesson_compaction (id, last_trade_id, last_run_at, runs) VALUES (1, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                last_trade_id = excluded.last_trade_id,
+                last_run_at = excluded.last_run_at,
+                runs = excluded.runs
+        ''', (new_last_id, now, runs + 1))
+        conn.commit()
+    finally:
+        conn.close()
+
+    return {"processed": len(rows), "updated": len(updates), "last_trade_id": new_last_id}
+
+# ==================== 프롬프트용 메모리 ====================
+
+def build_reflection_memory(query: str = "", token_budget: int = LESSON_TOKEN_BUDGET,
+                            raw_recent: int = RAW_RECENT) -> Dict[str, List[Dict]]:
+    """
+    결정 프롬프트에 넣을 과거 경험
+
+    Returns:
+        {"lessons": 현재 상황(query)과 비슷한 순으로 token_budget 안의 교훈,
+         "recent": 최신 원문 반성 일기 raw_recent개}
+    """
+    lessons = get_active_lessons()
+    if lessons and query:
+        rows = _unit_rows([l["lesson"] for l in lessons] + [query])
+        scores = rows[:-1] @ rows[-1]
+        lessons = [lessons[i] for i in np.argsort(-scores, kind="stable")]
+
+    selected, used = [], 0
+    for lesson in lessons:
+        tokens = estimate_tokens(lesson["lesson"])
+        if used + tokens > token_budget:
+            continue
+        selected.append(lesson)
+        used += tokens
+
+    return {"lessons": selected, "recent": get_recent_raw_reflections(raw_recent)}
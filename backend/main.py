@@ -1,10 +1,9 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from typing import List, Dict, Optional
 import asyncio
-import pyupbit
-import pandas as pd
-import requests
+import os
 from datetime import datetime
 import json
 
@@ -14,11 +13,49 @@ from models import (
 )
 from database import (
     get_all_trades, get_trade_by_id, get_trade_statistics,
-    get_portfolio_performance, get_recent_reflections
+    get_recent_reflections, enable_wal,
+    get_trade_reflection, iter_trades_json, encode_trade_cursor,
+    initialize_trade_indexes, insert_trade, get_dashboard_data
 )
 from ai_trading_utils import get_ai_trading_decision, execute_trade
+from async_utils import run_blocking, shutdown as shutdown_async_utils
+from job_queue import JobWorker, initialize_job_table, get_job
+from market_data import (
+    fetch_current_price, fetch_market_data,
+    fetch_technical_indicators, fetch_fear_greed
+)
+from candle_cache import (
+    get_candles, initialize_candle_table, ts_to_kst_string,
+    VALID_INTERVALS, MAX_PAGE_SIZE, CANDLE_COLUMNS
+)
+from execution import initialize_execution_table, link_execution_to_trade
+from snapshots import initialize_snapshot_tables, link_snapshot_to_trade
+from sentiment_archive import initialize_sentiment_tables
+from model_router import initialize_model_call_table, get_model_stats
+from risk import initialize_risk_tables, get_risk_engine, get_risk_rejections, set_kill_switch
+from resilience import breaker_states
+from decision_service import DecisionClient, get_service_socket_path
+from ledger import initialize_ledger_tables, sync_open_orders, get_portfolio_performance
+from analytics import get_analytics
+from lessons import initialize_lesson_tables, get_active_lessons
+from trade_labels import initialize_label_columns, label_trades
+from equity_history import (
+    EquitySampler, initialize_equity_tables, fetch_equity_snapshot,
+    get_equity_history, DAY_MS
+)
+from paper_exchange import get_exchange, is_paper_mode
+from dashboard import DashboardCache
+from serialization import (
+    FastJSONResponse, CompressionMiddleware, msgpack,
+    ws_encoding_available, send_ws_message
+)
+from market_feed import (
+    FeedSubscriber, get_feed_socket_path,
+    TOPIC_PRICE, TOPIC_MARKET, TOPIC_INDICATORS, TOPIC_FEAR_GREED,
+    TOPIC_STATISTICS, TOPIC_PORTFOLIO
+)
 
-app = FastAPI(title="AI Bitcoin Trading Dashboard API")
+app = FastAPI(title="AI Bitcoin Trading Dashboard API", default_response_class=FastJSONResponse)
 
 # CORS 설정
 app.add_middleware(
@@ -27,8 +64,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+# 큰 응답(차트, 거래 내역)은 Accept-Encoding에 따라 br/gzip 압축
+app.add_middleware(CompressionMiddleware)
+
 # WebSocket 연결 관리
 class ConnectionManager:
     def __init__(self):
@@ -50,6 +91,81 @@ class ConnectionManager:
 
 manager = ConnectionManager()
 
+# AI 작업 큐 워커
+job_worker = JobWorker(concurrency=int(os.getenv("JOB_WORKERS", "2")))
+
+# 멀티 프로세스 배포 시 market_feed 프로듀서 구독 (MARKET_FEED_SOCKET 미설정 시 직접 조회)
+feed_socket_path = get_feed_socket_path()
+feed = FeedSubscriber(feed_socket_path) if feed_socket_path else None
+
+# 피드 값을 사용할 최대 경과 시간 (초), 더 오래되면 직접 조회
+FEED_MAX_AGE = {
+    TOPIC_PRICE: 5,
+    TOPIC_MARKET: 30,
+    TOPIC_INDICATORS: 300,
+    TOPIC_FEAR_GREED: 900,
+    TOPIC_STATISTICS: 15,
+    TOPIC_PORTFOLIO: 60,
+}
+
+# 평가액 기록 (피드 프로듀서가 있으면 프로듀서 한 곳에서만 기록)
+equity_sampler = EquitySampler(fetch_equity_snapshot) if feed is None else None
+
+async def get_cached(topic: str, fetch):
+    """피드에 최신 값이 있으면 사용하고, 없으면 fetch로 직접 조회"""
+    if feed is not None:
+        cached = feed.get(topic, max_age=FEED_MAX_AGE[topic])
+        if cached is not None:
+            return cached
+    return await fetch()
+
+def sync_ledger_on_startup():
+    """이전 실행에서 미체결로 남은 주문의 체결 내역을 원장에 반영"""
+    exchange = get_exchange()
+    if exchange is None:
+        return
+    try:
+        synced = sync_open_orders(exchange)
+        if synced:
+            print(f"미체결 주문 {synced}건 동기화")
+    except Exception as e:
+        print(f"원장 동기화 실패: {e}")
+
+@app.on_event("startup")
+async def on_startup():
+    """작업 큐 초기화 및 워커/피드 구독 시작"""
+    await run_blocking(enable_wal)
+    await run_blocking(initialize_job_table)
+    await run_blocking(initialize_candle_table)
+    await run_blocking(initialize_trade_indexes)
+    await run_blocking(initialize_execution_table)
+    await run_blocking(initialize_ledger_tables)
+    await run_blocking(sync_ledger_on_startup)
+    await run_blocking(initialize_equity_tables)
+    await run_blocking(initialize_lesson_tables)
+    await run_blocking(initialize_label_columns)
+    await run_blocking(label_trades)
+    # AI 분석도 판단 입력 스냅샷과 심리 지표를 저장 (decision_service.py)
+    await run_blocking(initialize_sentiment_tables)
+    await run_blocking(initialize_snapshot_tables)
+    await run_blocking(initialize_model_call_table)
+    await run_blocking(initialize_risk_tables)
+    await job_worker.start()
+    if feed is not None:
+        await feed.start()
+    if equity_sampler is not None:
+        equity_sampler.start()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    """종료 시 워커, 피드 구독, 스레드 풀, HTTP 클라이언트 정리"""
+    await job_worker.stop()
+    if feed is not None:
+        await feed.stop()
+    if equity_sampler is not None:
+        await equity_sampler.stop()
+    await shutdown_async_utils()
+
 # ==================== REST API 엔드포인트 ====================
 
 @app.get("/")
@@ -61,27 +177,79 @@ async def root():
         "endpoints": {
             "trades": "/api/trades",
             "statistics": "/api/statistics",
+            "analytics": "/api/analytics",
             "portfolio": "/api/portfolio",
+            "portfolio-history": "/api/portfolio/history",
             "market": "/api/market",
             "indicators": "/api/indicators",
             "fear-greed": "/api/fear-greed",
-            "reflections": "/api/reflections"
+            "reflections": "/api/reflections",
+            "lessons": "/api/lessons",
+            "model-stats": "/api/model-stats",
+            "risk": "/api/risk",
+            "kill-switch": "/api/risk/kill-switch",
+            "metrics": "/api/metrics",
+            "dashboard": "/api/dashboard",
+            "jobs": "/api/jobs/{job_id}"
         }
     }
 
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """쉼표로 구분된 fields 파라미터 파싱"""
+    if not fields:
+        return None
+    return [f.strip() for f in fields.split(",") if f.strip()]
+
 @app.get("/api/trades", response_model=List[Dict])
-async def get_trades(limit: int = 100):
-    """거래 내역 조회"""
+async def get_trades(limit: int = 100, cursor: Optional[str] = None, fields: Optional[str] = None):
+    """
+    거래 내역 조회 (최신순, keyset 페이지네이션)
+
+    Args:
+        limit: 페이지 크기 (최대 500)
+        cursor: 이전 응답의 X-Next-Cursor 헤더 값
+        fields: 쉼표로 구분된 컬럼 목록 (예: id,timestamp,decision,reason_preview)
+                목록 화면에서는 reason/reflection 같은 긴 텍스트를 빼고 요청하세요.
+    """
     try:
-        trades = get_all_trades(limit=limit)
-        return trades
+        limit = max(1, min(limit, 500))
+        trades = await run_blocking(get_all_trades, limit=limit, cursor=cursor, fields=parse_fields(fields))
+        headers = {"X-Next-Cursor": encode_trade_cursor(trades[-1])} if len(trades) == limit else None
+        # 큰 목록은 응답 모델 검증/변환을 건너뛰고 바로 직렬화
+        return FastJSONResponse(trades, headers=headers)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/trades/export")
+async def export_trades(fields: Optional[str] = None):
+    """전체 거래 내역 JSON 내보내기 (스트리밍)"""
+    try:
+        field_list = parse_fields(fields)
+        # 잘못된 필드는 스트리밍 시작 전에 400으로 응답
+        await run_blocking(get_all_trades, limit=1, fields=field_list)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return StreamingResponse(
+        iter_trades_json(fields=field_list),
+        media_type="application/json",
+        headers={"Content-Disposition": "attachment; filename=trades.json"}
+    )
+
 @app.get("/api/trades/{trade_id}", response_model=Dict)
 async def get_trade(trade_id: int):
     """특정 거래 조회"""
-    trade = get_trade_by_id(trade_id)
+    trade = await run_blocking(get_trade_by_id, trade_id)
+    if not trade:
+        raise HTTPException(status_code=404, detail="Trade not found")
+    return trade
+
+@app.get("/api/trades/{trade_id}/reflection", response_model=Dict)
+async def get_trade_reflection_text(trade_id: int):
+    """특정 거래의 판단 근거와 반성 일기 전문 조회"""
+    trade = await run_blocking(get_trade_reflection, trade_id)
     if not trade:
         raise HTTPException(status_code=404, detail="Trade not found")
     return trade
@@ -90,76 +258,117 @@ async def get_trade(trade_id: int):
 async def get_statistics():
     """거래 통계 조회"""
     try:
-        stats = get_trade_statistics()
+        stats = await get_cached(TOPIC_STATISTICS, lambda: run_blocking(get_trade_statistics))
         return stats
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/analytics")
+async def get_trade_analytics():
+    """
+    거래 성과 분석
+
+    결정별/비중 구간별 이후 수익률과 적중률, 최대 낙폭, 샤프/소르티노, 노출 비율, 회전율.
+    새 거래·체결·1시간 캔들이 없으면 캐시된 결과를 반환합니다.
+    """
+    try:
+        return await run_blocking(get_analytics)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/api/portfolio", response_model=PortfolioPerformance)
 async def get_portfolio():
     """포트폴리오 성과 조회 (DB 기반)"""
     try:
-        performance = get_portfolio_performance()
+        performance = await get_cached(TOPIC_PORTFOLIO, lambda: run_blocking(get_portfolio_performance))
         return performance
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/portfolio/history")
+async def get_portfolio_history(
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+    resolution: str = "auto"
+):
+    """
+    평가액 시계열 조회
+
+    Args:
+        start: 시작 시각 (epoch 밀리초, 기본: end 30일 전)
+        end: 끝 시각 (epoch 밀리초, 기본: 현재)
+        resolution: 1m | 1h | 1d | auto (기간에 맞게 최대 1000개 점)
+    """
+    end = end if end is not None else int(datetime.now().timestamp() * 1000)
+    start = start if start is not None else end - 30 * DAY_MS
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start는 end보다 이전이어야 합니다.")
+
+    try:
+        return FastJSONResponse(await run_blocking(get_equity_history, start, end, resolution))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def build_live_portfolio() -> Dict:
+    """거래소 잔고 + 현재가로 실시간 포트폴리오 계산 (API 키가 없으면 400)"""
+    upbit = get_exchange()
+
+    if upbit is None:
+        raise HTTPException(status_code=400, detail="Upbit API 키가 설정되지 않았습니다. .env 파일을 확인하세요.")
+
+    balances = await run_blocking(upbit.get_balances)
+
+    if balances is None:
+        raise HTTPException(status_code=500, detail="잔고 조회에 실패했습니다. API 키를 확인하세요.")
+
+    # BTC, KRW 잔고 추출
+    btc_balance = 0
+    krw_balance = 0
+    btc_avg_buy_price = 0
+
+    for b in balances:
+        if b['currency'] == 'BTC':
+            btc_balance = float(b['balance'])
+            btc_avg_buy_price = float(b['avg_buy_price'])
+        elif b['currency'] == 'KRW':
+            krw_balance = float(b['balance'])
+
+    # 현재 BTC 가격
+    current_btc_price = await get_cached(TOPIC_PRICE, fetch_current_price)
+
+    # 총 자산 (KRW 기준)
+    total_value = krw_balance + (btc_balance * current_btc_price)
+
+    # 손익 계산 (평균 매입가 기준)
+    if btc_balance > 0 and btc_avg_buy_price > 0:
+        btc_value_at_buy = btc_balance * btc_avg_buy_price
+        btc_value_now = btc_balance * current_btc_price
+        btc_profit_loss = btc_value_now - btc_value_at_buy
+        btc_profit_loss_pct = (btc_profit_loss / btc_value_at_buy * 100) if btc_value_at_buy > 0 else 0
+    else:
+        btc_profit_loss = 0
+        btc_profit_loss_pct = 0
+
+    return {
+        "current_btc_balance": btc_balance,
+        "current_krw_balance": krw_balance,
+        "btc_avg_buy_price": btc_avg_buy_price,
+        "current_btc_price": current_btc_price,
+        "total_value_krw": total_value,
+        "initial_value_krw": krw_balance + (btc_balance * btc_avg_buy_price),
+        "profit_loss": btc_profit_loss,
+        "profit_loss_percentage": btc_profit_loss_pct,
+        "is_live": True,  # 실시간 데이터 표시
+        "is_paper": is_paper_mode()
+    }
+
 @app.get("/api/portfolio/live")
 async def get_live_portfolio():
     """실시간 포트폴리오 조회 (Upbit API 직접 호출)"""
     try:
-        import os
-        access = os.getenv("UPBIT_ACCESS_KEY")
-        secret = os.getenv("UPBIT_SECRET_KEY")
-
-        if not access or not secret:
-            raise HTTPException(status_code=400, detail="Upbit API 키가 설정되지 않았습니다. .env 파일을 확인하세요.")
-
-        upbit = pyupbit.Upbit(access, secret)
-        balances = upbit.get_balances()
-
-        if balances is None:
-            raise HTTPException(status_code=500, detail="잔고 조회에 실패했습니다. API 키를 확인하세요.")
-
-        # BTC, KRW 잔고 추출
-        btc_balance = 0
-        krw_balance = 0
-        btc_avg_buy_price = 0
-
-        for b in balances:
-            if b['currency'] == 'BTC':
-                btc_balance = float(b['balance'])
-                btc_avg_buy_price = float(b['avg_buy_price'])
-            elif b['currency'] == 'KRW':
-                krw_balance = float(b['balance'])
-
-        # 현재 BTC 가격
-        current_btc_price = pyupbit.get_current_price("KRW-BTC")
-
-        # 총 자산 (KRW 기준)
-        total_value = krw_balance + (btc_balance * current_btc_price)
-
-        # 손익 계산 (평균 매입가 기준)
-        if btc_balance > 0 and btc_avg_buy_price > 0:
-            btc_value_at_buy = btc_balance * btc_avg_buy_price
-            btc_value_now = btc_balance * current_btc_price
-            btc_profit_loss = btc_value_now - btc_value_at_buy
-            btc_profit_loss_pct = (btc_profit_loss / btc_value_at_buy * 100) if btc_value_at_buy > 0 else 0
-        else:
-            btc_profit_loss = 0
-            btc_profit_loss_pct = 0
-
-        return {
-            "current_btc_balance": btc_balance,
-            "current_krw_balance": krw_balance,
-            "btc_avg_buy_price": btc_avg_buy_price,
-            "current_btc_price": current_btc_price,
-            "total_value_krw": total_value,
-            "initial_value_krw": krw_balance + (btc_balance * btc_avg_buy_price),
-            "profit_loss": btc_profit_loss,
-            "profit_loss_percentage": btc_profit_loss_pct,
-            "is_live": True  # 실시간 데이터 표시
-        }
+        return await build_live_portfolio()
     except HTTPException:
         raise
     except Exception as e:
@@ -169,28 +378,8 @@ async def get_live_portfolio():
 async def get_market_data():
     """실시간 시장 데이터 조회"""
     try:
-        current_price = pyupbit.get_current_price("KRW-BTC")
-
-        # 24시간 변화율 계산
-        df = pyupbit.get_ohlcv("KRW-BTC", interval="day", count=2)
-        if df is not None and len(df) >= 2:
-            yesterday_close = df.iloc[-2]['close']
-            change_24h = ((current_price - yesterday_close) / yesterday_close) * 100
-        else:
-            change_24h = None
-
-        # 24시간 거래량
-        if df is not None and len(df) >= 1:
-            volume_24h = df.iloc[-1]['volume']
-        else:
-            volume_24h = None
-
-        return MarketData(
-            current_price=current_price,
-            timestamp=datetime.now().isoformat(),
-            change_24h=change_24h,
-            volume_24h=volume_24h
-        )
+        market = await get_cached(TOPIC_MARKET, fetch_market_data)
+        return MarketData(**market)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -198,48 +387,8 @@ async def get_market_data():
 async def get_technical_indicators():
     """기술적 지표 조회 (간단한 계산)"""
     try:
-        # 일봉 데이터로 기술적 지표 계산
-        df = pyupbit.get_ohlcv("KRW-BTC", interval="day", count=30)
-
-        if df is None or len(df) == 0:
-            raise HTTPException(status_code=500, detail="Failed to fetch market data")
-
-        # 간단한 이동평균 계산
-        df['sma_20'] = df['close'].rolling(window=20).mean()
-        df['ema_12'] = df['close'].ewm(span=12, adjust=False).mean()
-
-        # 볼린저 밴드 (간단한 계산)
-        df['bb_mavg'] = df['close'].rolling(window=20).mean()
-        df['bb_std'] = df['close'].rolling(window=20).std()
-        df['bb_hband'] = df['bb_mavg'] + (df['bb_std'] * 2)
-        df['bb_lband'] = df['bb_mavg'] - (df['bb_std'] * 2)
-
-        # RSI 계산 (간단한 버전)
-        delta = df['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs = gain / loss
-        df['rsi'] = 100 - (100 / (1 + rs))
-
-        # MACD 계산 (간단한 버전)
-        ema_12 = df['close'].ewm(span=12, adjust=False).mean()
-        ema_26 = df['close'].ewm(span=26, adjust=False).mean()
-        df['macd'] = ema_12 - ema_26
-        df['macd_signal'] = df['macd'].ewm(span=9, adjust=False).mean()
-
-        # 최신 값 추출
-        latest = df.iloc[-1]
-
-        return TechnicalIndicators(
-            rsi=float(latest['rsi']) if pd.notna(latest['rsi']) else None,
-            macd=float(latest['macd']) if pd.notna(latest['macd']) else None,
-            macd_signal=float(latest['macd_signal']) if pd.notna(latest['macd_signal']) else None,
-            bb_upper=float(latest['bb_hband']) if pd.notna(latest['bb_hband']) else None,
-            bb_middle=float(latest['bb_mavg']) if pd.notna(latest['bb_mavg']) else None,
-            bb_lower=float(latest['bb_lband']) if pd.notna(latest['bb_lband']) else None,
-            sma_20=float(latest['sma_20']) if pd.notna(latest['sma_20']) else None,
-            ema_12=float(latest['ema_12']) if pd.notna(latest['ema_12']) else None
-        )
+        indicators = await get_cached(TOPIC_INDICATORS, fetch_technical_indicators)
+        return TechnicalIndicators(**indicators)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -247,19 +396,8 @@ async def get_technical_indicators():
 async def get_fear_greed():
     """공포-탐욕 지수 조회"""
     try:
-        url = "https://api.alternative.me/fng/?limit=1"
-        response = requests.get(url, timeout=10)
-        data = response.json()
-
-        if 'data' in data and len(data['data']) > 0:
-            fng_data = data['data'][0]
-            return FearGreedIndex(
-                value=int(fng_data['value']),
-                classification=fng_data['value_classification'],
-                timestamp=fng_data['timestamp']
-            )
-        else:
-            raise HTTPException(status_code=500, detail="Failed to fetch Fear & Greed Index")
+        fear_greed = await get_cached(TOPIC_FEAR_GREED, fetch_fear_greed)
+        return FearGreedIndex(**fear_greed)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -267,59 +405,225 @@ async def get_fear_greed():
 async def get_reflections(limit: int = 5):
     """최근 AI 반성 일기 조회"""
     try:
-        reflections = get_recent_reflections(limit=limit)
+        reflections = await run_blocking(get_recent_reflections, limit=limit)
         return reflections
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/chart/ohlcv")
-async def get_ohlcv_data(interval: str = "day", count: int = 30):
-    """OHLCV 차트 데이터 조회"""
+@app.get("/api/lessons")
+async def get_lessons():
+    """반성 일기를 압축한 현재 버전의 교훈 목록"""
+    try:
+        return await run_blocking(get_active_lessons)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/model-stats")
+async def get_model_call_stats(days: int = 30):
+    """판단 모델별 지연 시간, 성공률, 최종 판단과의 일치율 (model_router.py)"""
+    try:
+        if days <= 0:
+            raise ValueError("days는 1 이상이어야 합니다.")
+        return await run_blocking(get_model_stats, days=days)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _risk_status(limit: int) -> Dict:
+    return dict(get_risk_engine().status(), rejections=get_risk_rejections(limit))
+
+@app.get("/api/risk")
+async def get_risk(limit: int = 50):
+    """리스크 한도, 엔진 상태, 최근 축소/거부된 주문 (risk.py)"""
+    try:
+        if limit <= 0:
+            raise ValueError("limit는 1 이상이어야 합니다.")
+        return await run_blocking(_risk_status, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/risk/kill-switch")
+async def update_kill_switch(enabled: bool = True):
+    """킬 스위치 켜기/끄기 (모든 프로세스의 다음 주문 검사부터 적용)"""
+    try:
+        await run_blocking(set_kill_switch, enabled)
+        return {"kill_switch": enabled}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _decision_service_breakers() -> Dict:
+    try:
+        return DecisionClient(timeout=5).status()["breakers"]
+    except Exception as e:
+        return {"error": str(e)}
+
+@app.get("/api/metrics")
+async def get_metrics():
+    """외부 의존성별 서킷 브레이커 상태 (resilience.py), 판단 서비스를 따로 띄웠으면 그 프로세스의 상태도 포함"""
+    metrics = {"breakers": breaker_states()}
+    if get_service_socket_path():
+        metrics["decision_service_breakers"] = await run_blocking(_decision_service_breakers)
+    return metrics
+
+# ==================== 대시보드 스냅샷 ====================
+
+# 거래 내역 위젯용 필드 (frontend TRADE_LIST_FIELDS와 같음)
+DASHBOARD_TRADE_FIELDS = [
+    "id", "timestamp", "decision", "reason_preview", "percentage",
+    "btc_balance", "krw_balance", "btc_avg_buy_price", "btc_krw_price",
+]
+DASHBOARD_PUSH_SECONDS = 2
+
+async def fetch_dashboard_db() -> Dict:
+    return await run_blocking(get_dashboard_data, trade_limit=20, trade_fields=DASHBOARD_TRADE_FIELDS,
+                              reflection_limit=10)
+
+async def fetch_dashboard_portfolio() -> Dict:
+    """실시간 포트폴리오, API 키가 없으면 DB 기반 성과"""
     try:
-        valid_intervals = ["minute1", "minute3", "minute5", "minute10", "minute15",
-                          "minute30", "minute60", "minute240", "day", "week", "month"]
+        return {"portfolio": await build_live_portfolio()}
+    except HTTPException:
+        performance = await get_cached(TOPIC_PORTFOLIO, lambda: run_blocking(get_portfolio_performance))
+        return {"portfolio": {**performance, "is_live": False, "is_paper": is_paper_mode()}}
+
+async def fetch_dashboard_market() -> Dict:
+    return {"market": await get_cached(TOPIC_MARKET, fetch_market_data)}
+
+async def fetch_dashboard_indicators() -> Dict:
+    return {"indicators": await get_cached(TOPIC_INDICATORS, fetch_technical_indicators)}
+
+async def fetch_dashboard_fear_greed() -> Dict:
+    return {"fear_greed": await get_cached(TOPIC_FEAR_GREED, fetch_fear_greed)}
+
+async def fetch_dashboard_analytics() -> Dict:
+    return {"analytics": await run_blocking(get_analytics)}
+
+# {그룹: (TTL 초, 섹션, 조회 함수)} - 모든 HTTP/WebSocket 클라이언트가 공유
+dashboard_cache = DashboardCache({
+    "db": (10, ["statistics", "trades", "reflections"], fetch_dashboard_db),
+    "market": (5, ["market"], fetch_dashboard_market),
+    "portfolio": (30, ["portfolio"], fetch_dashboard_portfolio),
+    "indicators": (60, ["indicators"], fetch_dashboard_indicators),
+    "fear_greed": (900, ["fear_greed"], fetch_dashboard_fear_greed),
+    "analytics": (60, ["analytics"], fetch_dashboard_analytics),
+})
+
+@app.get("/api/dashboard")
+async def get_dashboard(request: Request, sections: Optional[str] = None):
+    """
+    대시보드 위젯 데이터를 한 번에 조회
+
+    Args:
+        sections: 쉼표로 구분된 섹션 (기본: 전체)
+                  statistics, trades, reflections, market, portfolio, indicators, fear_greed, analytics
+
+    응답의 ETag를 If-None-Match로 보내면 바뀐 섹션이 없을 때 304를 반환합니다.
+    """
+    try:
+        section_list = dashboard_cache.validate(parse_fields(sections))
+        snapshot = await dashboard_cache.snapshot(section_list)
+        etag = dashboard_cache.etag(section_list)
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        return FastJSONResponse(snapshot, headers={"ETag": etag})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/chart/ohlcv")
+async def get_ohlcv_data(request: Request, interval: str = "day", count: int = 30,
+                         since: Optional[int] = None, until: Optional[int] = None,
+                         format: str = "records"):
+    """
+    OHLCV 차트 데이터 조회 (로컬 캔들 캐시 기반)
 
-        if interval not in valid_intervals:
-            raise HTTPException(status_code=400, detail=f"Invalid interval. Must be one of {valid_intervals}")
+    Args:
+        interval: 캔들 단위
+        count: 최대 캔들 수 (페이지당 최대 200개)
+        since: 이 시각(epoch ms)부터 시간순으로 반환 - 마지막으로 받은 캔들의 ts를 넘기면 새 캔들만 받음,
+               응답의 next_cursor를 since로 넘기면 다음(더 최근) 페이지
+               (캐시에 없는 과거는 요청당 한 페이지씩만 거래소에서 채우므로 첫 캔들이 since보다 늦을 수 있음)
+        until: 이 시각(epoch ms) 이전 캔들만 반환 - 응답의 next_cursor를 넘기면 이전 페이지
+        format: 'records' (행 단위) | 'columnar' (컬럼별 배열)
+
+    Accept: application/x-msgpack 헤더를 보내면 msgpack으로 응답합니다.
+    """
+    try:
+        if interval not in VALID_INTERVALS:
+            raise HTTPException(status_code=400, detail=f"Invalid interval. Must be one of {VALID_INTERVALS}")
+        if format not in ("records", "columnar"):
+            raise HTTPException(status_code=400, detail="format은 'records' 또는 'columnar'여야 합니다.")
 
-        df = pyupbit.get_ohlcv("KRW-BTC", interval=interval, count=count)
+        candles = await run_blocking(get_candles, interval, count=count, since=since, until=until)
 
-        if df is None or len(df) == 0:
+        if not candles and since is None:
             raise HTTPException(status_code=500, detail="Failed to fetch OHLCV data")
 
-        # DataFrame을 JSON으로 변환
-        df_reset = df.reset_index()
-        df_reset['index'] = df_reset['index'].astype(str)
+        # 페이지가 가득 찼으면 다음 페이지가 있을 수 있음
+        # (since: 마지막 캔들 다음부터 더 최근 방향, 그 외: 첫 캔들 이전 방향)
+        next_cursor = None
+        if len(candles) == max(1, min(count, MAX_PAGE_SIZE)):
+            next_cursor = candles[-1]["ts"] + 1 if since is not None else candles[0]["ts"]
 
-        return {
+        payload = {
             "interval": interval,
-            "count": len(df),
-            "data": df_reset.to_dict(orient='records')
+            "count": len(candles),
+            "latest": candles[-1]["ts"] if candles else since,
+            "next_cursor": next_cursor,
         }
+
+        if format == "columnar":
+            payload["columns"] = {column: [candle[column] for candle in candles] for column in CANDLE_COLUMNS}
+        else:
+            for candle in candles:
+                candle["index"] = ts_to_kst_string(candle["ts"])
+            payload["data"] = candles
+
+        if msgpack is not None and "application/x-msgpack" in request.headers.get("accept", ""):
+            return Response(content=msgpack.packb(payload), media_type="application/x-msgpack")
+
+        return FastJSONResponse(payload)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # ==================== WebSocket 엔드포인트 ====================
 
 @app.websocket("/ws/market")
-async def websocket_market(websocket: WebSocket):
-    """실시간 시장 데이터 스트림"""
+async def websocket_market(websocket: WebSocket, encoding: str = "json"):
+    """
+    실시간 시장 데이터 스트림
+
+    encoding=msgpack 이면 바이너리 프레임으로 보내고 시각은 ISO 문자열 대신 epoch 밀리초(ts)
+    """
+    if not ws_encoding_available(encoding):
+        await websocket.close(code=1003)
+        return
     await manager.connect(websocket)
     try:
         while True:
-            # 실시간 가격 데이터
-            current_price = pyupbit.get_current_price("KRW-BTC")
+            # 실시간 가격 데이터 (피드 모드에서는 프로듀서가 발행한 가격을 기다림)
+            current_price = None
+            if feed is not None and feed.connected:
+                current_price = await feed.wait_for_update(TOPIC_PRICE, timeout=2,
+                                                           max_age=FEED_MAX_AGE[TOPIC_PRICE])
+            if current_price is None:
+                # 피드가 없거나 프로듀서가 가격을 발행하지 못하고 있으면 직접 조회
+                current_price = await fetch_current_price()
+                await asyncio.sleep(1)  # 1초마다 업데이트
 
             # 데이터 전송
-            await websocket.send_json({
-                "type": "market_update",
-                "data": {
-                    "price": current_price,
-                    "timestamp": datetime.now().isoformat()
-                }
-            })
-
-            await asyncio.sleep(1)  # 1초마다 업데이트
+            now = datetime.now()
+            if encoding == "msgpack":
+                data = {"price": current_price, "ts": int(now.timestamp() * 1000)}
+            else:
+                data = {"price": current_price, "timestamp": now.isoformat()}
+            await send_ws_message(websocket, {"type": "market_update", "data": data}, encoding)
 
     except WebSocketDisconnect:
         manager.disconnect(websocket)
@@ -328,25 +632,28 @@ async def websocket_market(websocket: WebSocket):
         manager.disconnect(websocket)
 
 @app.websocket("/ws/trades")
-async def websocket_trades(websocket: WebSocket):
-    """실시간 거래 내역 스트림"""
+async def websocket_trades(websocket: WebSocket, encoding: str = "json"):
+    """실시간 거래 내역 스트림 (encoding=json | msgpack)"""
+    if not ws_encoding_available(encoding):
+        await websocket.close(code=1003)
+        return
     await manager.connect(websocket)
     try:
         last_trade_id = None
 
         while True:
             # 최신 거래 확인
-            stats = get_trade_statistics()
+            stats = await get_cached(TOPIC_STATISTICS, lambda: run_blocking(get_trade_statistics))
             latest_trade = stats.get('latest_trade')
 
             if latest_trade and latest_trade.get('id') != last_trade_id:
                 last_trade_id = latest_trade.get('id')
 
                 # 새로운 거래 전송
-                await websocket.send_json({
+                await send_ws_message(websocket, {
                     "type": "new_trade",
                     "data": latest_trade
-                })
+                }, encoding)
 
             await asyncio.sleep(5)  # 5초마다 체크
 
@@ -356,28 +663,159 @@ async def websocket_trades(websocket: WebSocket):
         print(f"WebSocket error: {e}")
         manager.disconnect(websocket)
 
+@app.websocket("/ws/dashboard")
+async def websocket_dashboard(websocket: WebSocket, sections: Optional[str] = None, encoding: str = "json"):
+    """
+    대시보드 스트림
+
+    연결 직후 전체 스냅샷({"type": "snapshot"})을 보내고, 이후에는 바뀐 섹션만
+    {"type": "patch", "sections": {...}, "versions": {...}, "errors": {...}} 형태로 보냅니다.
+    errors는 요청한 섹션의 현재 조회 오류 전체입니다 (오류가 풀리면 빠짐). (encoding=json | msgpack)
+    """
+    if not ws_encoding_available(encoding):
+        await websocket.close(code=1003)
+        return
+    await manager.connect(websocket)
+    try:
+        section_list = dashboard_cache.validate(parse_fields(sections))
+        snapshot = await dashboard_cache.snapshot(section_list)
+        await send_ws_message(websocket, {"type": "snapshot", **snapshot}, encoding)
+        known = dict(snapshot["versions"])
+        known_errors = snapshot["errors"]
+
+        while True:
+            await asyncio.sleep(DASHBOARD_PUSH_SECONDS)
+            await dashboard_cache.refresh(section_list)
+            changed = dashboard_cache.changed_since(known, section_list, known_errors)
+            if not changed["sections"] and changed["errors"] is None:
+                continue
+            versions = {name: dashboard_cache.versions[name] for name in changed["sections"]}
+            known.update(versions)
+            if changed["errors"] is not None:
+                known_errors = changed["errors"]
+            await send_ws_message(websocket, {
+                "type": "patch",
+                "sections": changed["sections"],
+                "versions": versions,
+                "errors": known_errors,
+                "generated_at": int(datetime.now().timestamp() * 1000),
+            }, encoding)
+
+    except WebSocketDisconnect:
+        manager.disconnect(websocket)
+    except Exception as e:
+        print(f"WebSocket error: {e}")
+        manager.disconnect(websocket)
+
 # ==================== AI 분석 & 수동 거래 엔드포인트 ====================
 
-@app.post("/api/ai-analysis")
+def run_ai_analysis_job(include_balance: bool = False) -> Dict:
+    """AI 분석 작업 (워커 스레드에서 실행)"""
+    result = get_ai_trading_decision(include_balance=include_balance)
+    return {
+        "success": not result.get('error'),
+        "data": result
+    }
+
+def run_ai_trade_job() -> Dict:
+    """AI 분석 + 거래 작업 (워커 스레드에서 실행)"""
+    # 1. AI 분석
+    analysis = get_ai_trading_decision(include_balance=True)
+    if analysis.get('error'):
+        # 분석 실패로 만든 hold는 실제 판단이 아니므로 거래도, trades 기록(통계/라벨/반성 대상)도 하지 않음
+        return {
+            "success": False,
+            "trade_id": None,
+            "ai_analysis": analysis,
+            "trade_result": {'success': False, 'message': analysis['reason'], 'order_info': None}
+        }
+
+    # 2. 거래 실행
+    trade_result = execute_trade(analysis['decision'], analysis['percentage'])
+
+    # 3. DB에 기록 (autotrade.py와 같이 거래 후 잔고 스냅샷, 체결 내역은 원장에 이미 기록됨)
+    trade_id = None
+    if trade_result['success']:
+        trade_id = record_trade(analysis, trade_result)
+
+    return {
+        "success": trade_result['success'],
+        "trade_id": trade_id,
+        "ai_analysis": analysis,
+        "trade_result": trade_result
+    }
+
+def record_trade(analysis: Dict, trade_result: Dict) -> Optional[int]:
+    """AI 거래 결과를 trades 테이블에 저장하고 실행 기록과 연결"""
+    if analysis.get('error'):
+        return None
+    exchange = get_exchange()
+    balances = exchange.get_balances() if exchange is not None else None
+    if not balances:
+        print("거래 기록 실패: 잔고 조회 실패")
+        return None
+
+    btc_balance = next((float(b['balance']) for b in balances if b['currency'] == 'BTC'), 0)
+    krw_balance = next((float(b['balance']) for b in balances if b['currency'] == 'KRW'), 0)
+    btc_avg_buy_price = next((float(b['avg_buy_price']) for b in balances if b['currency'] == 'BTC'), 0)
+
+    trade_id = insert_trade(
+        datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        analysis['decision'], analysis['reason'], analysis['percentage'],
+        btc_balance, krw_balance, btc_avg_buy_price,
+        trade_result.get('realized_price') or analysis['current_price']
+    )
+    if trade_result.get('execution_id'):
+        link_execution_to_trade(trade_result['execution_id'], trade_id)
+    if analysis.get('snapshot_id'):
+        link_snapshot_to_trade(analysis['snapshot_id'], trade_id)
+    return trade_id
+
+job_worker.register("ai_analysis", run_ai_analysis_job)
+job_worker.register("ai_trade", run_ai_trade_job)
+
+def job_accepted_response(job: Dict, created: bool) -> Dict:
+    return {
+        "success": True,
+        "job_id": job["id"],
+        "status": job["status"],
+        "deduplicated": not created
+    }
+
+@app.post("/api/ai-analysis", status_code=202)
 async def request_ai_analysis(include_balance: bool = False):
     """
     AI 실시간 분석 요청 (거래 실행하지 않음)
 
+    분석은 백그라운드 작업으로 실행되며, 결과는 /api/jobs/{job_id}로 조회합니다.
+    같은 요청이 이미 진행 중이면 기존 작업 ID를 반환합니다.
+
     Args:
         include_balance: 실제 잔고 정보 포함 여부
 
     Returns:
-        AI의 의사결정 분석 결과
+        작업 ID와 상태
     """
     try:
-        result = get_ai_trading_decision(include_balance=include_balance)
-        return {
-            "success": True,
-            "data": result
-        }
+        job, created = await job_worker.submit("ai_analysis", {"include_balance": include_balance})
+        return job_accepted_response(job, created)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """
+    작업 상태 조회
+
+    Returns:
+        status: 'pending' | 'running' | 'done' | 'failed'
+        result: 완료 시 작업 결과
+    """
+    job = await run_blocking(get_job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 @app.post("/api/manual-trade")
 async def manual_trade(decision: str, percentage: int):
     """
@@ -399,7 +837,7 @@ async def manual_trade(decision: str, percentage: int):
             raise HTTPException(status_code=400, detail="percentage는 0-100 사이의 값이어야 합니다.")
 
         # 거래 실행
-        result = execute_trade(decision, percentage)
+        result = await run_blocking(execute_trade, decision, percentage)
 
         return {
             "success": result['success'],
@@ -411,32 +849,22 @@ async def manual_trade(decision: str, percentage: int):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/ai-trade")
+@app.post("/api/ai-trade", status_code=202)
 async def ai_auto_trade():
     """
     AI 분석 + 자동 거래 실행
     AI의 추천에 따라 자동으로 거래를 실행합니다.
+    백그라운드 작업으로 실행되며, 결과는 /api/jobs/{job_id}로 조회합니다.
 
     ⚠️ 주의: 실제 거래가 발생합니다!
     """
     try:
-        # 1. AI 분석
-        analysis = get_ai_trading_decision(include_balance=True)
-
-        # 2. 거래 실행
-        trade_result = execute_trade(analysis['decision'], analysis['percentage'])
-
-        # 3. DB에 기록 (선택적)
-        # 여기에 insert_trade() 함수를 호출하여 DB에 저장할 수 있습니다
-
-        return {
-            "success": trade_result['success'],
-            "ai_analysis": analysis,
-            "trade_result": trade_result
-        }
+        job, created = await job_worker.submit("ai_trade", {})
+        return job_accepted_response(job, created)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # WebSocket permessage-deflate는 클라이언트가 요청하면 적용 (브라우저는 기본으로 요청)
+    uvicorn.run(app, host="0.0.0.0", port=8000, ws_per_message_deflate=True)
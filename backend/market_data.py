@@ -0,0 +1,74 @@
+"""
+시장 데이터 조회 함수
+API 워커와 market_feed 프로듀서가 같은 로직으로 시세/지표/공포-탐욕 지수를 만들도록 공유합니다.
+외부 조회는 resilience.py를 거칩니다 (현재가는 헤지 요청, 장애 중에는 마지막 정상 값).
+"""
+import asyncio
+from datetime import datetime
+from typing import Dict, Optional
+
+import resilience
+from async_utils import run_blocking, get_http_client
+from ai_trading_utils import calculate_technical_indicators
+
+FEAR_GREED_URL = "https://api.alternative.me/fng/?limit=1"
+
+async def fetch_current_price(stale: bool = True) -> Optional[float]:
+    """현재 BTC 가격 조회 (stale=False면 장애 중에도 마지막 정상 값을 쓰지 않음)"""
+    return await run_blocking(resilience.get_current_price, "KRW-BTC", stale=stale)
+
+async def fetch_market_data() -> Dict:
+    """현재가, 24시간 변화율, 24시간 거래량 조회"""
+    # 현재가와 일봉을 동시에 조회
+    current_price, df = await asyncio.gather(
+        fetch_current_price(),
+        run_blocking(resilience.get_ohlcv, "KRW-BTC", interval="day", count=2)
+    )
+
+    # 24시간 변화율 계산
+    if df is not None and len(df) >= 2:
+        yesterday_close = df.iloc[-2]['close']
+        change_24h = float((current_price - yesterday_close) / yesterday_close * 100)
+    else:
+        change_24h = None
+
+    # 24시간 거래량
+    if df is not None and len(df) >= 1:
+        volume_24h = float(df.iloc[-1]['volume'])
+    else:
+        volume_24h = None
+
+    return {
+        "current_price": current_price,
+        "timestamp": datetime.now().isoformat(),
+        "change_24h": change_24h,
+        "volume_24h": volume_24h
+    }
+
+async def fetch_technical_indicators() -> Dict:
+    """일봉 30개로 기술적 지표 계산"""
+    df = await run_blocking(resilience.get_ohlcv, "KRW-BTC", interval="day", count=30)
+
+    if df is None or len(df) == 0:
+        raise RuntimeError("Failed to fetch market data")
+
+    return calculate_technical_indicators(df)
+
+async def fetch_fear_greed() -> Dict:
+    """공포-탐욕 지수 조회"""
+    async def fetch():
+        response = await get_http_client().get(FEAR_GREED_URL)
+        response.raise_for_status()
+        data = response.json()
+
+        if 'data' in data and len(data['data']) > 0:
+            fng_data = data['data'][0]
+            return {
+                "value": int(fng_data['value']),
+                "classification": fng_data['value_classification'],
+                "timestamp": fng_data['timestamp']
+            }
+
+        raise RuntimeError("Failed to fetch Fear & Greed Index")
+
+    return await resilience.call_async("fear_greed", fetch, max_age=6 * 3600)
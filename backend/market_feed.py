@@ -0,0 +1,222 @@
+"""
+멀티 프로세스 배포용 시장 데이터 피드
+
+프로듀서 프로세스 하나가 Upbit/DB를 주기적으로 조회해 Unix 도메인 소켓으로 발행하고,
+여러 API 워커 프로세스가 구독해 같은 캐시를 공유합니다.
+
+실행:
+    python market_feed.py                                   # 프로듀서 (1개)
+    MARKET_FEED_SOCKET=/tmp/ai_trading_feed.sock \
+        uvicorn main:app --workers 4                        # API 워커 (N개)
+
+메시지 형식은 한 줄당 JSON 하나: {"topic": ..., "data": ..., "ts": ...}
+새 구독자에게는 토픽별 마지막 메시지를 먼저 보내므로 연결 직후부터 캐시를 사용할 수 있습니다.
+"""
+import os
+import json
+import time
+import asyncio
+from typing import Any, Callable, Dict, Optional, Tuple
+
+DEFAULT_SOCKET_PATH = "/tmp/ai_trading_feed.sock"
+
+# 토픽 이름
+TOPIC_PRICE = "market_price"
+TOPIC_MARKET = "market"
+TOPIC_INDICATORS = "indicators"
+TOPIC_FEAR_GREED = "fear_greed"
+TOPIC_STATISTICS = "statistics"
+TOPIC_PORTFOLIO = "portfolio"
+
+def get_feed_socket_path() -> Optional[str]:
+    """MARKET_FEED_SOCKET 환경 변수가 설정된 경우에만 피드 모드 사용"""
+    return os.getenv("MARKET_FEED_SOCKET") or None
+
+def _encode(topic: str, data: Any, ts: float) -> bytes:
+    return (json.dumps({"topic": topic, "data": data, "ts": ts}, default=str) + "\n").encode()
+
+class FeedBroker:
+    """Unix 도메인 소켓 pub/sub 서버 (프로듀서 프로세스에서 실행)"""
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH):
+        self.socket_path = socket_path
+        self.retained: Dict[str, bytes] = {}
+        self.subscribers = set()
+        self._server = None
+
+    async def start(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._server = await asyncio.start_unix_server(self._handle_subscriber, path=self.socket_path)
+        print(f"📡 market feed 발행 시작: {self.socket_path}")
+
+    async def stop(self):
+        for writer in list(self.subscribers):
+            writer.close()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    async def _handle_subscriber(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # 마지막 값부터 전송
+        for message in self.retained.values():
+            writer.write(message)
+        self.subscribers.add(writer)
+        try:
+            await writer.drain()
+            # 구독자는 데이터를 보내지 않으므로 연결 종료만 감지
+            await reader.read()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.subscribers.discard(writer)
+            writer.close()
+
+    async def publish(self, topic: str, data: Any):
+        message = _encode(topic, data, time.time())
+        self.retained[topic] = message
+
+        for writer in list(self.subscribers):
+            # 읽지 않는 구독자 때문에 메모리가 쌓이지 않도록 버퍼가 크면 연결을 끊음
+            if writer.transport.get_write_buffer_size() > 1024 * 1024:
+                self.subscribers.discard(writer)
+                writer.close()
+                continue
+            writer.write(message)
+
+class FeedSubscriber:
+    """API 워커에서 피드를 구독하고 토픽별 마지막 값을 보관"""
+
+    def __init__(self, socket_path: str, reconnect_delay: float = 1.0):
+        self.socket_path = socket_path
+        self.reconnect_delay = reconnect_delay
+        self.latest: Dict[str, Tuple[Any, float]] = {}
+        self.connected = False
+        self._warned = False
+        self._updated = asyncio.Condition()
+        self._task = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def get(self, topic: str, max_age: Optional[float] = None) -> Optional[Any]:
+        """토픽의 마지막 값 (max_age초보다 오래된 값은 None)"""
+        entry = self.latest.get(topic)
+        if entry is None:
+            return None
+        data, ts = entry
+        if max_age is not None and time.time() - ts > max_age:
+            return None
+        return data
+
+    async def wait_for_update(self, topic: str, timeout: float, max_age: Optional[float] = None) -> Optional[Any]:
+        """토픽에 새 값이 들어올 때까지 대기 후 반환 (시간 초과 시 현재 값, max_age초보다 오래됐으면 None)"""
+        previous = self.latest.get(topic)
+        try:
+            async with self._updated:
+                await asyncio.wait_for(
+                    self._updated.wait_for(lambda: self.latest.get(topic) is not previous),
+                    timeout=timeout
+                )
+        except asyncio.TimeoutError:
+            pass
+        return self.get(topic, max_age=max_age)
+
+    async def _run(self):
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.socket_path)
+                self.connected = True
+                self._warned = False
+                try:
+                    while True:
+                        line = await reader.readline()
+                        if not line:
+                            break
+                        message = json.loads(line)
+                        async with self._updated:
+                            self.latest[message["topic"]] = (message["data"], message["ts"])
+                            self._updated.notify_all()
+                finally:
+                    self.connected = False
+                    writer.close()
+            except asyncio.CancelledError:
+                raise
+            except (OSError, ValueError) as e:
+                # 프로듀서가 내려가 있는 동안 같은 로그가 매초 쌓이지 않도록 처음 한 번만 출력
+                if not self._warned:
+                    print(f"market feed 연결 실패, 재시도합니다: {e}")
+                    self._warned = True
+                await asyncio.sleep(self.reconnect_delay)
+                continue
+            await asyncio.sleep(self.reconnect_delay)
+
+# ==================== 프로듀서 ====================
+
+async def _poll(broker: FeedBroker, topic: str, fetch: Callable, interval: float):
+    """fetch 결과를 interval초마다 발행 (실패해도 다음 주기에 재시도)"""
+    while True:
+        started = time.monotonic()
+        try:
+            await broker.publish(topic, await fetch())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"{topic} 조회 실패: {e}")
+        await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+async def run_producer(socket_path: str):
+    # 프로듀서에서만 필요한 모듈은 여기서 import
+    from async_utils import run_blocking, shutdown as shutdown_async_utils
+    from database import get_trade_statistics
+    from ledger import get_portfolio_performance
+    from equity_history import EquitySampler, initialize_equity_tables, fetch_equity_snapshot
+    from market_data import (
+        fetch_current_price, fetch_market_data,
+        fetch_technical_indicators, fetch_fear_greed
+    )
+
+    async def fetch_statistics():
+        return await run_blocking(get_trade_statistics)
+
+    async def fetch_portfolio():
+        return await run_blocking(get_portfolio_performance)
+
+    broker = FeedBroker(socket_path)
+    await broker.start()
+
+    # 워커가 여러 개여도 평가액은 프로듀서에서 한 번만 기록
+    await run_blocking(initialize_equity_tables)
+    equity_sampler = EquitySampler(fetch_equity_snapshot)
+    equity_sampler.start()
+
+    tasks = [
+        asyncio.create_task(_poll(broker, TOPIC_PRICE, fetch_current_price, 1)),
+        asyncio.create_task(_poll(broker, TOPIC_MARKET, fetch_market_data, 10)),
+        asyncio.create_task(_poll(broker, TOPIC_INDICATORS, fetch_technical_indicators, 60)),
+        asyncio.create_task(_poll(broker, TOPIC_FEAR_GREED, fetch_fear_greed, 300)),
+        asyncio.create_task(_poll(broker, TOPIC_STATISTICS, fetch_statistics, 5)),
+        asyncio.create_task(_poll(broker, TOPIC_PORTFOLIO, fetch_portfolio, 30)),
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await equity_sampler.stop()
+        await broker.stop()
+        await shutdown_async_utils()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(run_producer(get_feed_socket_path() or DEFAULT_SOCKET_PATH))
+    except KeyboardInterrupt:
+        print("market feed 종료")
@@ -0,0 +1,328 @@
+"""
+매매 판단 모델 라우터
+판단 1회를 여러 모델에 보내고, 사이클당 지연 예산(DECISION_BUDGET_SECONDS) 안에 받은 응답으로 결정합니다.
+
+- fallback (기본): DECISION_MODELS 순서대로 시도, 시간 초과/오류/잘못된 응답이면 다음(더 저렴한) 모델
+  (마지막 모델 전까지는 시도당 DECISION_ATTEMPT_TIMEOUT초)
+- ensemble: 모든 모델에 동시에 요청하고 예산 안에 도착한 응답을 결합
+  - vote: 다수결 (동률이면 hold), 비중은 이긴 쪽 응답의 중앙값
+  - confidence: decision 토큰의 logprob 확률로 가중 합산, 비중은 가중 평균
+- 호출마다 모델, 지연 시간, 결과, 최종 판단과의 일치 여부를 model_calls 테이블에 기록 (get_model_stats)
+- 모델별 서킷 브레이커(resilience.py "openai:<모델>"): 연속으로 실패한 모델은 한동안 건너뛰어 예산을 쓰지 않음,
+  fallback에서 모든 모델이 실패하면 예산이 남은 동안 백오프 후 다시 시도 (RESILIENCE_ATTEMPTS회까지)
+
+OPENAI_BASE_URL을 stub_openai.py 주소로 지정하면 실제 API 없이 시험할 수 있습니다.
+"""
+import os
+import json
+import math
+import time
+import uuid
+import statistics
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from database import get_db_connection, table_exists
+from resilience import RESILIENCE_ATTEMPTS, get_breaker, backoff_delay, is_retryable
+from decision_prompt import DECISION_MODEL
+
+DECISIONS = ("buy", "sell", "hold")
+
+DECISION_MODELS = [m.strip() for m in os.getenv("DECISION_MODELS", f"{DECISION_MODEL},gpt-4o-mini").split(",") if m.strip()]
+DECISION_ROUTING = os.getenv("DECISION_ROUTING", "fallback")   # fallback | ensemble
+DECISION_COMBINE = os.getenv("DECISION_COMBINE", "vote")       # vote | confidence
+DECISION_BUDGET_SECONDS = float(os.getenv("DECISION_BUDGET_SECONDS", "90"))
+DECISION_ATTEMPT_TIMEOUT = float(os.getenv("DECISION_ATTEMPT_TIMEOUT", "45"))
+
+STATUS_OK = "ok"
+STATUS_TIMEOUT = "timeout"
+STATUS_ERROR = "error"
+STATUS_INVALID = "invalid"
+STATUS_CIRCUIT_OPEN = "circuit_open"  # 브레이커가 열려 호출하지 않음 (model_calls에 기록하지 않음)
+
+def initialize_model_call_table():
+    """model_calls 테이블 생성"""
+    conn = get_db_connection()
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS model_calls (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at TEXT NOT NULL,
+            cycle_id TEXT NOT NULL,
+            routing TEXT NOT NULL,
+            model TEXT NOT NULL,
+            status TEXT NOT NULL,
+            latency_ms REAL,
+            decision TEXT,
+            percentage INTEGER,
+            confidence REAL,
+            agreed INTEGER,
+            selected INTEGER NOT NULL DEFAULT 0,
+            error TEXT
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_model_calls_model ON model_calls(model, created_at)')
+    conn.commit()
+    conn.close()
+
+# ==================== 응답 해석 ====================
+
+def parse_decision(content: str) -> Dict:
+    """모델 응답 JSON 검증 (decision은 buy/sell/hold, percentage는 0-100 정수)"""
+    result = json.loads(content)
+    decision = str(result["decision"]).lower()
+    if decision not in DECISIONS:
+        raise ValueError(f"Invalid decision: {result['decision']}")
+    return {
+        "decision": decision,
+        "reason": str(result["reason"]),
+        "percentage": max(0, min(100, int(result["percentage"]))),
+    }
+
+def decision_confidence(choice) -> Optional[float]:
+    """응답 logprobs에서 decision 값 토큰의 확률 (logprobs가 없으면 None)"""
+    logprobs = getattr(choice, "logprobs", None)
+    for token in (getattr(logprobs, "content", None) or []):
+        if token.token.strip().strip('"') in DECISIONS:
+            # 스키마상 decision이 첫 필드이므로 처음 나오는 buy/sell/hold 토큰이 결정 값
+            return math.exp(token.logprob)
+    return None
+
+def combine_decisions(answers: List[Dict], combine: str = "vote") -> Dict:
+    """
+    여러 모델의 판단 결합
+
+    Args:
+        answers: [{"model", "decision", "reason", "percentage", "confidence"}] (우선순위 순)
+        combine: vote | confidence
+    """
+    weights = {decision: 0.0 for decision in DECISIONS}
+    for answer in answers:
+        weight = answer.get("confidence") if combine == "confidence" else None
+        weights[answer["decision"]] += weight if weight is not None else 1.0
+
+    best = max(weights.values())
+    leaders = [d for d in DECISIONS if weights[d] == best]
+    if len(leaders) > 1:
+        # 의견이 갈리면 거래하지 않음
+        models = ", ".join(f"{a['model']}={a['decision']}" for a in answers)
+        return {"decision": "hold", "reason": f"Models disagreed ({models}); holding.", "percentage": 0,
+                "model": "+".join(a["model"] for a in answers)}
+
+    decision = leaders[0]
+    winners = [a for a in answers if a["decision"] == decision]
+    if combine == "confidence":
+        total = sum(a.get("confidence") or 1.0 for a in winners)
+        percentage = round(sum(a["percentage"] * (a.get("confidence") or 1.0) for a in winners) / total)
+        representative = max(winners, key=lambda a: a.get("confidence") or 0.0)
+    else:
+        percentage = round(statistics.median(a["percentage"] for a in winners))
+        representative = winners[0]
+    return {"decision": decision, "reason": representative["reason"], "percentage": percentage,
+            "model": "+".join(a["model"] for a in winners)}
+
+# ==================== 라우터 ====================
+
+class ModelRouter:
+    """판단 요청을 여러 모델로 라우팅"""
+
+    def __init__(self, client, models: Optional[List[str]] = None, routing: str = DECISION_ROUTING,
+                 combine: str = DECISION_COMBINE, budget: float = DECISION_BUDGET_SECONDS,
+                 attempt_timeout: float = DECISION_ATTEMPT_TIMEOUT, record: bool = True):
+        if routing not in ("fallback", "ensemble"):
+            raise ValueError(f"Unknown routing: {routing}")
+        if combine not in ("vote", "confidence"):
+            raise ValueError(f"Unknown combine: {combine}")
+        self.client = client
+        self.models = models or DECISION_MODELS
+        self.routing = routing
+        self.combine = combine
+        self.budget = budget
+        self.attempt_timeout = attempt_timeout
+        self.record = record
+        self._executor = ThreadPoolExecutor(max_workers=max(2, len(self.models)), thread_name_prefix="model-call")
+
+    def _call(self, model: str, messages: List[Dict], response_format: Dict, timeout: float) -> Dict:
+        """모델 1회 호출 (재시도 없이 timeout초 안에), 결과와 상태 반환"""
+        breaker = get_breaker(f"openai:{model}")
+        if not breaker.allow():
+            return {"model": model, "status": STATUS_CIRCUIT_OPEN, "error": "circuit open", "latency_ms": 0.0,
+                    "retryable": False}
+        started = time.perf_counter()
+        call = {"model": model, "status": STATUS_OK, "error": None, "retryable": False}
+        try:
+            kwargs = {"logprobs": True} if self.combine == "confidence" else {}
+            response = self.client.with_options(timeout=timeout, max_retries=0).chat.completions.create(
+                model=model, messages=messages, response_format=response_format, **kwargs)
+            choice = response.choices[0]
+            call["content"] = choice.message.content
+            call.update(parse_decision(choice.message.content))
+            call["confidence"] = decision_confidence(choice)
+            breaker.record_success()
+        except (ValueError, KeyError, TypeError) as e:
+            # 모델은 응답했으므로 브레이커에는 성공으로 기록
+            breaker.record_success()
+            call.update(status=STATUS_INVALID, error=str(e), retryable=True)
+        except Exception as e:
+            breaker.record_failure(e)
+            timed_out = "timeout" in type(e).__name__.lower() or "timed out" in str(e).lower()
+            call.update(status=STATUS_TIMEOUT if timed_out else STATUS_ERROR, error=f"{type(e).__name__}: {e}",
+                        retryable=is_retryable(e))
+        call["latency_ms"] = (time.perf_counter() - started) * 1000
+        return call
+
+    def _fallback(self, messages, response_format, deadline: float) -> List[Dict]:
+        calls = []
+        for attempt in range(RESILIENCE_ATTEMPTS):
+            round_calls = []
+            for i, model in enumerate(self.models):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                last = i == len(self.models) - 1
+                timeout = remaining if last else min(self.attempt_timeout, remaining)
+                call = self._call(model, messages, response_format, timeout)
+                round_calls.append(call)
+                if call["status"] == STATUS_OK:
+                    break
+                print(f"Model {model} {call['status']} after {call['latency_ms']:.0f} ms: {call['error']}")
+            calls += round_calls
+            if any(c["status"] == STATUS_OK for c in round_calls) or not any(c["retryable"] for c in round_calls):
+                break
+            # 모든 모델이 실패: 예산이 남아 있으면 백오프 후 처음 모델부터 다시
+            delay = backoff_delay(attempt)
+            if time.monotonic() + delay >= deadline:
+                break
+            time.sleep(delay)
+        return calls
+
+    def _ensemble(self, messages, response_format, deadline: float) -> List[Dict]:
+        timeout = max(0.0, deadline - time.monotonic())
+        futures = {self._executor.submit(self._call, model, messages, response_format, timeout): model
+                   for model in self.models}
+        pending = set(futures)
+        while pending and time.monotonic() < deadline:
+            _, pending = wait(pending, timeout=deadline - time.monotonic(), return_when=FIRST_COMPLETED)
+        calls = [f.result() for f in futures if f.done()]
+        # 예산 안에 끝나지 않은 호출 (스레드는 자체 timeout으로 곧 종료)
+        calls += [{"model": futures[f], "status": STATUS_TIMEOUT, "error": "latency budget exceeded",
+                   "latency_ms": self.budget * 1000} for f in pending]
+        order = {model: i for i, model in enumerate(self.models)}
+        return sorted(calls, key=lambda c: order[c["model"]])
+
+    def route(self, messages: List[Dict], response_format: Dict) -> Dict:
+        """
+        판단 요청
+
+        Returns:
+            {"decision", "reason", "percentage", "model": 결정에 쓰인 모델(+로 연결),
+             "content": 스냅샷에 저장할 응답 JSON, "calls": 모델별 상태/지연/판단}
+
+        Raises:
+            RuntimeError: 예산 안에 유효한 응답이 하나도 없을 때
+        """
+        cycle_id = uuid.uuid4().hex
+        deadline = time.monotonic() + self.budget
+        if self.routing == "ensemble":
+            calls = self._ensemble(messages, response_format, deadline)
+        else:
+            calls = self._fallback(messages, response_format, deadline)
+
+        answers = [c for c in calls if c["status"] == STATUS_OK]
+        result = None
+        if answers:
+            result = combine_decisions(answers, self.combine) if len(answers) > 1 else {
+                key: answers[0][key] for key in ("decision", "reason", "percentage", "model")}
+            selected = set(result["model"].split("+"))
+            for call in calls:
+                call["selected"] = call["model"] in selected
+                call["agreed"] = call.get("decision") == result["decision"] if call["status"] == STATUS_OK else None
+
+        if self.record:
+            try:
+                record_model_calls(cycle_id, self.routing,
+                                   [c for c in calls if c["status"] != STATUS_CIRCUIT_OPEN])
+            except Exception as e:
+                print(f"Error recording model calls: {e}")
+
+        if result is None:
+            summary = ", ".join(f"{c['model']}={c['status']}" for c in calls) or "no attempt"
+            raise RuntimeError(f"No model answered within {self.budget:.0f}s ({summary})")
+
+        result["content"] = json.dumps(
+            {key: result[key] for key in ("decision", "reason", "percentage")}, ensure_ascii=False
+        ) if len(answers) > 1 else answers[0]["content"]
+        result["calls"] = [
+            {key: call.get(key) for key in ("model", "status", "latency_ms", "decision", "percentage", "confidence")}
+            for call in calls
+        ]
+        return result
+
+# ==================== 통계 ====================
+
+def record_model_calls(cycle_id: str, routing: str, calls: List[Dict]):
+    conn = get_db_connection()
+    try:
+        created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        conn.executemany('''
+            INSERT INTO model_calls (created_at, cycle_id, routing, model, status, latency_ms,
+                                     decision, percentage, confidence, agreed, selected, error)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [
+            (created_at, cycle_id, routing, c["model"], c["status"], c.get("latency_ms"),
+             c.get("decision"), c.get("percentage"), c.get("confidence"),
+             None if c.get("agreed") is None else int(c["agreed"]), int(bool(c.get("selected"))), c.get("error"))
+            for c in calls
+        ])
+        conn.commit()
+    finally:
+        conn.close()
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+def get_model_stats(days: int = 30) -> List[Dict]:
+    """
+    모델별 호출 통계 (최근 days일)
+
+    Returns:
+        [{"model", "calls", "ok", "timeouts", "errors", "invalid", "success_rate",
+          "latency_p50_ms", "latency_p95_ms", "selected", "agreement_rate"}]
+    """
+    since = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+    conn = get_db_connection()
+    try:
+        if not table_exists(conn, "model_calls"):
+            return []
+        rows = conn.execute('''
+            SELECT model, status, latency_ms, agreed, selected FROM model_calls WHERE created_at >= ?
+        ''', (since,)).fetchall()
+    finally:
+        conn.close()
+
+    by_model: Dict[str, List] = {}
+    for row in rows:
+        by_model.setdefault(row["model"], []).append(row)
+
+    stats = []
+    for model, model_rows in by_model.items():
+        ok = [r for r in model_rows if r["status"] == STATUS_OK]
+        latencies = [r["latency_ms"] for r in ok if r["latency_ms"] is not None]
+        agreed = [r["agreed"] for r in ok if r["agreed"] is not None]
+        stats.append({
+            "model": model,
+            "calls": len(model_rows),
+            "ok": len(ok),
+            "timeouts": sum(r["status"] == STATUS_TIMEOUT for r in model_rows),
+            "errors": sum(r["status"] == STATUS_ERROR for r in model_rows),
+            "invalid": sum(r["status"] == STATUS_INVALID for r in model_rows),
+            "success_rate": len(ok) / len(model_rows),
+            "latency_p50_ms": _percentile(latencies, 0.5),
+            "latency_p95_ms": _percentile(latencies, 0.95),
+            "selected": sum(r["selected"] for r in model_rows),
+            "agreement_rate": sum(agreed) / len(agreed) if agreed else None,
+        })
+    return sorted(stats, key=lambda s: -s["calls"])
@@ -14,6 +14,11 @@ class Trade(BaseModel):
     btc_avg_buy_price: float
     btc_krw_price: float
     reflection: Optional[str] = None
+    # 거래 후 구간별 수익률 (trade_labels.py, 구간이 지나기 전에는 None)
+    ret_1h: Optional[float] = None
+    ret_4h: Optional[float] = None
+    ret_24h: Optional[float] = None
+    ret_72h: Optional[float] = None
 
 class TradeStatistics(BaseModel):
     """거래 통계 모델"""
@@ -33,6 +38,11 @@ class PortfolioPerformance(BaseModel):
     initial_value_krw: float
     profit_loss: float
     profit_loss_percentage: float
+    realized_pnl: Optional[float] = None
+    unrealized_pnl: Optional[float] = None
+    total_fees: Optional[float] = None
+    time_weighted_return: Optional[float] = None
+    source: Optional[str] = None  # ledger | snapshots
 
 class MarketData(BaseModel):
     """실시간 시장 데이터"""
@@ -0,0 +1,169 @@
+"""
+오더북(호가) 분석
+pyupbit 호가 스냅샷 하나를 NumPy 배열로 바꿔 스프레드, 잔량 불균형, 슬리피지, 매물벽 등을 계산합니다.
+AI 프롬프트에는 원본 호가 JSON 대신 features()의 요약 값을 넣고, 주문 크기 계산에도 같은 스냅샷을 재사용합니다.
+"""
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+class OrderbookSnapshot:
+    """호가 스냅샷 (ask는 가격 오름차순, bid는 가격 내림차순)"""
+
+    def __init__(self, ask_prices, ask_sizes, bid_prices, bid_sizes, timestamp: Optional[int] = None):
+        self.ask_prices = np.asarray(ask_prices, dtype=np.float64)
+        self.ask_sizes = np.asarray(ask_sizes, dtype=np.float64)
+        self.bid_prices = np.asarray(bid_prices, dtype=np.float64)
+        self.bid_sizes = np.asarray(bid_sizes, dtype=np.float64)
+        self.timestamp = timestamp
+
+        if len(self.ask_prices) == 0 or len(self.bid_prices) == 0:
+            raise ValueError("호가 데이터가 비어 있습니다.")
+
+    @classmethod
+    def from_pyupbit(cls, orderbook) -> "OrderbookSnapshot":
+        """pyupbit.get_orderbook() 결과로 생성 (단일 티커 dict 또는 길이 1 list)"""
+        if isinstance(orderbook, list):
+            orderbook = orderbook[0]
+        units = orderbook["orderbook_units"]
+        return cls(
+            ask_prices=[u["ask_price"] for u in units],
+            ask_sizes=[u["ask_size"] for u in units],
+            bid_prices=[u["bid_price"] for u in units],
+            bid_sizes=[u["bid_size"] for u in units],
+            timestamp=orderbook.get("timestamp"),
+        )
+
+    # ==================== 기본 지표 ====================
+
+    @property
+    def best_ask(self) -> float:
+        return float(self.ask_prices[0])
+
+    @property
+    def best_bid(self) -> float:
+        return float(self.bid_prices[0])
+
+    @property
+    def mid(self) -> float:
+        return (self.best_ask + self.best_bid) / 2
+
+    @property
+    def spread(self) -> float:
+        return self.best_ask - self.best_bid
+
+    @property
+    def spread_bps(self) -> float:
+        return self.spread / self.mid * 10000
+
+    def depth_weighted_mid(self, levels: int = 5) -> float:
+        """상위 levels 호가의 매수/매도 VWAP 평균 (최우선 호가만 쓰는 중간가보다 얇은 호가에 덜 흔들림)"""
+        ask_volume = self.ask_sizes[:levels].sum()
+        bid_volume = self.bid_sizes[:levels].sum()
+        ask_vwap = float(self.ask_prices[:levels] @ self.ask_sizes[:levels] / ask_volume) if ask_volume > 0 else self.best_ask
+        bid_vwap = float(self.bid_prices[:levels] @ self.bid_sizes[:levels] / bid_volume) if bid_volume > 0 else self.best_bid
+        return (ask_vwap + bid_vwap) / 2
+
+    def imbalance(self, levels: int) -> float:
+        """상위 levels 호가의 잔량 불균형 (-1: 매도 우위 ~ +1: 매수 우위)"""
+        bid_volume = self.bid_sizes[:levels].sum()
+        ask_volume = self.ask_sizes[:levels].sum()
+        total = bid_volume + ask_volume
+        return float((bid_volume - ask_volume) / total) if total > 0 else 0.0
+
+    # ==================== 슬리피지 ====================
+
+    def estimate_buy(self, krw_amount: float) -> Dict:
+        """krw_amount 원어치 시장가 매수 시 예상 체결 결과"""
+        notional = self.ask_prices * self.ask_sizes
+        cumulative = np.cumsum(notional)
+        k = int(np.searchsorted(cumulative, krw_amount))
+
+        if k >= len(notional):
+            # 호가창 전체로도 부족한 경우 보이는 잔량까지만 계산
+            volume = float(self.ask_sizes.sum())
+            filled_krw = float(cumulative[-1])
+        else:
+            spent_before = float(cumulative[k - 1]) if k > 0 else 0.0
+            volume = float(self.ask_sizes[:k].sum() + (krw_amount - spent_before) / self.ask_prices[k])
+            filled_krw = float(krw_amount)
+
+        return self._estimate(filled_krw, volume, self.best_ask, min(k, len(notional) - 1), filled_krw >= krw_amount)
+
+    def estimate_sell(self, btc_volume: float) -> Dict:
+        """btc_volume BTC 시장가 매도 시 예상 체결 결과"""
+        cumulative = np.cumsum(self.bid_sizes)
+        k = int(np.searchsorted(cumulative, btc_volume))
+
+        if k >= len(cumulative):
+            volume = float(cumulative[-1])
+            proceeds = float(self.bid_prices @ self.bid_sizes)
+        else:
+            sold_before = float(cumulative[k - 1]) if k > 0 else 0.0
+            volume = float(btc_volume)
+            proceeds = float(self.bid_prices[:k] @ self.bid_sizes[:k] + (btc_volume - sold_before) * self.bid_prices[k])
+
+        return self._estimate(proceeds, volume, self.best_bid, min(k, len(cumulative) - 1), volume >= btc_volume)
+
+    @staticmethod
+    def _estimate(krw: float, volume: float, touch_price: float, level_index: int, fully_filled: bool) -> Dict:
+        avg_price = krw / volume if volume > 0 else touch_price
+        return {
+            "avg_price": avg_price,
+            "volume": volume,
+            "krw": krw,
+            "slippage_bps": abs(avg_price - touch_price) / touch_price * 10000,
+            "levels_used": level_index + 1,
+            "fully_filled": fully_filled,
+        }
+
+    # ==================== 매물벽 ====================
+
+    def detect_walls(self, factor: float = 5.0) -> List[Dict]:
+        """잔량이 해당 방향 중앙값의 factor배 이상인 호가 (가격, 잔량, 중간가 대비 거리)"""
+        walls = []
+        for side, prices, sizes in (("ask", self.ask_prices, self.ask_sizes),
+                                    ("bid", self.bid_prices, self.bid_sizes)):
+            median = np.median(sizes)
+            if median <= 0:
+                continue
+            for i in np.flatnonzero(sizes >= median * factor):
+                walls.append({
+                    "side": side,
+                    "price": float(prices[i]),
+                    "size": float(sizes[i]),
+                    "distance_bps": round(abs(prices[i] - self.mid) / self.mid * 10000, 1),
+                })
+        return walls
+
+    # ==================== 요약 ====================
+
+    def features(self, depths: Sequence[int] = (1, 5, 15), order_krw: Optional[float] = None,
+                 order_btc: Optional[float] = None) -> Dict:
+        """
+        AI 프롬프트용 요약 지표
+
+        Args:
+            depths: 잔량 불균형을 계산할 호가 단계
+            order_krw: 매수 슬리피지를 추정할 주문 금액 (KRW)
+            order_btc: 매도 슬리피지를 추정할 주문 수량 (BTC)
+        """
+        features = {
+            "best_bid": self.best_bid,
+            "best_ask": self.best_ask,
+            "spread_bps": round(self.spread_bps, 2),
+            "depth_weighted_mid": round(self.depth_weighted_mid(), 1),
+            "imbalance": {str(d): round(self.imbalance(d), 3) for d in depths},
+            "bid_depth_btc": round(float(self.bid_sizes.sum()), 4),
+            "ask_depth_btc": round(float(self.ask_sizes.sum()), 4),
+            "walls": self.detect_walls(),
+        }
+        if order_krw:
+            buy = self.estimate_buy(order_krw)
+            features["buy_slippage"] = {"krw": round(order_krw), "slippage_bps": round(buy["slippage_bps"], 2),
+                                        "fully_filled": buy["fully_filled"]}
+        if order_btc:
+            sell = self.estimate_sell(order_btc)
+            features["sell_slippage"] = {"btc": order_btc, "slippage_bps": round(sell["slippage_bps"], 2),
+                                         "fully_filled": sell["fully_filled"]}
+        return features
@@ -0,0 +1,408 @@
+"""
+모의 거래소 (페이퍼 트레이딩)
+프로젝트에서 사용하는 pyupbit.Upbit 메서드만 흉내 내어 실제 계좌 없이 매매 흐름 전체를 실행합니다.
+
+- 잔고/평균 매입가, 수수료(0.05%), 최소 주문 금액(5,000원) 시뮬레이션
+- 실시간 호가, 기록된 호가(JSONL) 또는 합성 호가에 대해 체결
+- TRADING_MODE=paper 이면 get_exchange()가 실제 Upbit 대신 이 객체를 반환
+
+사용법 (호가 기록):
+    python paper_exchange.py record orderbooks.jsonl 600    # 1초 간격 600개
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pyupbit
+
+from resilience import get_orderbook
+
+TICKER = "KRW-BTC"
+FEE_RATE = 0.0005
+MIN_ORDER_KRW = 5000
+
+# ==================== 호가 소스 ====================
+
+class SyntheticOrderbook:
+    """무작위 보행하는 중간가 주위로 일정한 잔량의 호가를 만드는 합성 호가"""
+
+    def __init__(self, mid: float = 100_000_000, tick: float = 1000, levels: int = 15,
+                 size: float = 0.5, volatility_bps: float = 5.0, seed: Optional[int] = None):
+        self.mid = mid
+        self.tick = tick
+        self.levels = levels
+        self.size = size
+        self.volatility_bps = volatility_bps
+        self.rng = np.random.default_rng(seed)
+        self._steps = np.arange(levels) * tick
+
+    def __call__(self, ticker: str = TICKER) -> Dict:
+        self.mid *= 1 + self.rng.normal(0, self.volatility_bps / 10000)
+        best_bid = np.floor(self.mid / self.tick) * self.tick
+        ask_prices = best_bid + self.tick + self._steps
+        bid_prices = best_bid - self._steps
+        sizes = self.size * self.rng.uniform(0.5, 1.5, size=(2, self.levels))
+        return {
+            "market": ticker,
+            "timestamp": int(time.time() * 1000),
+            "orderbook_units": [
+                {"ask_price": float(a), "bid_price": float(b), "ask_size": float(sa), "bid_size": float(sb)}
+                for a, b, sa, sb in zip(ask_prices, bid_prices, sizes[0], sizes[1])
+            ],
+        }
+
+class RecordedOrderbook:
+    """record_orderbooks()로 저장한 JSONL 호가를 순서대로 재생 (끝나면 처음부터 반복)"""
+
+    def __init__(self, path: str):
+        with open(path, encoding="utf-8") as f:
+            self.snapshots = [json.loads(line) for line in f if line.strip()]
+        if not self.snapshots:
+            raise ValueError(f"기록된 호가가 없습니다: {path}")
+        self.position = 0
+
+    def __call__(self, ticker: str = TICKER) -> Dict:
+        snapshot = self.snapshots[self.position % len(self.snapshots)]
+        self.position += 1
+        return snapshot
+
+def record_orderbooks(path: str, count: int, interval: float = 1.0, ticker: str = TICKER):
+    """실시간 호가를 JSONL 파일로 기록"""
+    with open(path, "a", encoding="utf-8") as f:
+        for _ in range(count):
+            orderbook = pyupbit.get_orderbook(ticker)
+            if isinstance(orderbook, list):
+                orderbook = orderbook[0]
+            if orderbook:
+                f.write(json.dumps(orderbook) + "\n")
+                f.flush()
+            time.sleep(interval)
+
+# ==================== 모의 거래소 ====================
+
+def _error(name: str, message: str) -> Dict:
+    """Upbit 오류 응답과 같은 형식"""
+    return {"error": {"name": name, "message": message}}
+
+class PaperUpbit:
+    """pyupbit.Upbit 호환 모의 거래소 (KRW-BTC 단일 마켓)"""
+
+    def __init__(self, krw: float = 10_000_000, btc: float = 0.0,
+                 orderbook_source: Optional[Callable[[str], Dict]] = None,
+                 fee_rate: float = FEE_RATE, state_path: Optional[str] = None):
+        """
+        Args:
+            krw, btc: 초기 잔고 (state_path에 저장된 상태가 있으면 그 값을 사용)
+            orderbook_source: ticker를 받아 pyupbit 형식 호가를 반환하는 함수 (기본: 실시간 호가)
+            fee_rate: 체결 금액 대비 수수료율
+            state_path: 잔고를 저장할 JSON 파일 (프로세스 간 공유, 재시작 후 유지)
+        """
+        self.orderbook_source = orderbook_source or get_orderbook
+        self.fee_rate = fee_rate
+        self.state_path = state_path
+        self.balances = {"KRW": float(krw), "BTC": float(btc)}
+        self.locked = {"KRW": 0.0, "BTC": 0.0}
+        self.avg_buy_price = 0.0
+        self.orders: Dict[str, Dict] = {}
+        self._lock = threading.RLock()
+        self._state_mtime = None
+        self._load_state()
+
+    # ---------- 상태 저장 ----------
+
+    def _load_state(self):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        mtime = os.path.getmtime(self.state_path)
+        if mtime == self._state_mtime:
+            return
+        with open(self.state_path, encoding="utf-8") as f:
+            state = json.load(f)
+        self.balances = state["balances"]
+        self.locked = state["locked"]
+        self.avg_buy_price = state["avg_buy_price"]
+        self.orders = state.get("open_orders", {})
+        self._state_mtime = mtime
+
+    def _save_state(self):
+        if not self.state_path:
+            return
+        open_orders = {u: o for u, o in self.orders.items() if o["state"] == "wait"}
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"balances": self.balances, "locked": self.locked,
+                       "avg_buy_price": self.avg_buy_price, "open_orders": open_orders}, f)
+        os.replace(tmp, self.state_path)
+        self._state_mtime = os.path.getmtime(self.state_path)
+
+    # ---------- 조회 ----------
+
+    def get_balances(self) -> List[Dict]:
+        with self._lock:
+            self._load_state()
+            return [
+                {"currency": "KRW", "balance": str(self.balances["KRW"]), "locked": str(self.locked["KRW"]),
+                 "avg_buy_price": "0", "avg_buy_price_modified": False, "unit_currency": "KRW"},
+                {"currency": "BTC", "balance": str(self.balances["BTC"]), "locked": str(self.locked["BTC"]),
+                 "avg_buy_price": str(self.avg_buy_price), "avg_buy_price_modified": False, "unit_currency": "KRW"},
+            ]
+
+    def get_balance(self, ticker: str = "KRW") -> float:
+        """주문 가능 잔고 (pyupbit와 같이 'KRW-BTC'와 'BTC' 모두 허용)"""
+        currency = ticker.split("-")[-1]
+        with self._lock:
+            self._load_state()
+            return self.balances.get(currency, 0.0)
+
+    def get_order(self, ticker_or_uuid: str, state: str = "wait") -> Dict:
+        """uuid로 주문 조회 (미체결 지정가 주문은 조회 시점의 호가로 다시 체결 시도)"""
+        with self._lock:
+            order = self.orders.get(ticker_or_uuid)
+            if order is None:
+                return _error("order_not_found", "주문을 찾지 못했습니다.")
+            if order["state"] == "wait":
+                self._match_limit(order)
+                self._save_state()
+            return dict(order, trades=list(order["trades"]))
+
+    # ---------- 주문 ----------
+
+    def buy_market_order(self, ticker: str, price: float, contain_req: bool = False) -> Dict:
+        """price원어치 시장가 매수 (수수료는 별도로 KRW 잔고에서 차감)"""
+        with self._lock:
+            self._load_state()
+            if price < MIN_ORDER_KRW:
+                return _error("under_min_total_bid", f"최소주문금액 이상으로 주문해주세요. ({MIN_ORDER_KRW}원)")
+            if price * (1 + self.fee_rate) > self.balances["KRW"]:
+                return _error("insufficient_funds_bid", "주문가능한 금액(KRW)이 부족합니다.")
+
+            order = self._new_order("bid", "price", ticker, price=price, volume=None)
+            book = self._book(ticker)
+            self._fill(order, book["ask_prices"], book["ask_sizes"], krw_limit=price)
+            self._finish_market(order)
+            return self._public(order)
+
+    def sell_market_order(self, ticker: str, volume: float, contain_req: bool = False) -> Dict:
+        with self._lock:
+            self._load_state()
+            if volume > self.balances["BTC"] + 1e-12:
+                return _error("insufficient_funds_ask", "주문가능한 금액(BTC)이 부족합니다.")
+            book = self._book(ticker)
+            if volume * book["bid_prices"][0] < MIN_ORDER_KRW:
+                return _error("under_min_total_ask", f"최소주문금액 이상으로 주문해주세요. ({MIN_ORDER_KRW}원)")
+
+            order = self._new_order("ask", "market", ticker, price=None, volume=volume)
+            self._fill(order, book["bid_prices"], book["bid_sizes"], volume_limit=volume)
+            self._finish_market(order)
+            return self._public(order)
+
+    def buy_limit_order(self, ticker: str, price: float, volume: float, contain_req: bool = False) -> Dict:
+        with self._lock:
+            self._load_state()
+            total = price * volume
+            if total < MIN_ORDER_KRW:
+                return _error("under_min_total_bid", f"최소주문금액 이상으로 주문해주세요. ({MIN_ORDER_KRW}원)")
+            reserve = total * (1 + self.fee_rate)
+            if reserve > self.balances["KRW"]:
+                return _error("insufficient_funds_bid", "주문가능한 금액(KRW)이 부족합니다.")
+
+            self.balances["KRW"] -= reserve
+            self.locked["KRW"] += reserve
+            order = self._new_order("bid", "limit", ticker, price=price, volume=volume)
+            self._match_limit(order)
+            self._save_state()
+            return self._public(order)
+
+    def sell_limit_order(self, ticker: str, price: float, volume: float, contain_req: bool = False) -> Dict:
+        with self._lock:
+            self._load_state()
+            if price * volume < MIN_ORDER_KRW:
+                return _error("under_min_total_ask", f"최소주문금액 이상으로 주문해주세요. ({MIN_ORDER_KRW}원)")
+            if volume > self.balances["BTC"] + 1e-12:
+                return _error("insufficient_funds_ask", "주문가능한 금액(BTC)이 부족합니다.")
+
+            self.balances["BTC"] -= volume
+            self.locked["BTC"] += volume
+            order = self._new_order("ask", "limit", ticker, price=price, volume=volume)
+            self._match_limit(order)
+            self._save_state()
+            return self._public(order)
+
+    def cancel_order(self, uuid_: str, contain_req: bool = False) -> Dict:
+        """미체결 잔량 취소 및 묶인 잔고 반환"""
+        with self._lock:
+            order = self.orders.get(uuid_)
+            if order is None or order["state"] != "wait":
+                return _error("order_not_found", "취소할 수 있는 주문이 없습니다.")
+
+            remaining = order["remaining_volume"]
+            if order["side"] == "bid":
+                refund = remaining * order["price"] * (1 + self.fee_rate)
+                self.locked["KRW"] -= refund
+                self.balances["KRW"] += refund
+            else:
+                self.locked["BTC"] -= remaining
+                self.balances["BTC"] += remaining
+            order["state"] = "cancel"
+            self._save_state()
+            return self._public(order)
+
+    # ---------- 체결 ----------
+
+    def _book(self, ticker: str) -> Dict:
+        orderbook = self.orderbook_source(ticker)
+        if isinstance(orderbook, list):
+            orderbook = orderbook[0]
+        units = orderbook["orderbook_units"]
+        return {
+            "ask_prices": np.array([u["ask_price"] for u in units]),
+            "ask_sizes": np.array([u["ask_size"] for u in units]),
+            "bid_prices": np.array([u["bid_price"] for u in units]),
+            "bid_sizes": np.array([u["bid_size"] for u in units]),
+        }
+
+    def _new_order(self, side: str, ord_type: str, ticker: str, price: Optional[float],
+                   volume: Optional[float]) -> Dict:
+        order = {
+            "uuid": str(uuid.uuid4()),
+            "side": side,
+            "ord_type": ord_type,
+            "price": price,
+            "state": "wait",
+            "market": ticker,
+            "created_at": datetime.now().astimezone().isoformat(timespec="seconds"),
+            "volume": volume,
+            "remaining_volume": volume if volume is not None else 0.0,
+            "executed_volume": 0.0,
+            "paid_fee": 0.0,
+            "trades_count": 0,
+            "trades": [],
+        }
+        self.orders[order["uuid"]] = order
+        return order
+
+    def _fill(self, order: Dict, prices: np.ndarray, sizes: np.ndarray,
+              krw_limit: Optional[float] = None, volume_limit: Optional[float] = None,
+              price_limit: Optional[float] = None):
+        """호가를 따라 체결 (krw_limit: 사용할 금액, volume_limit: 수량, price_limit: 지정가)"""
+        if price_limit is not None:
+            crossing = prices <= price_limit if order["side"] == "bid" else prices >= price_limit
+            prices, sizes = prices[crossing], sizes[crossing]
+
+        for price, size in zip(prices, sizes):
+            if krw_limit is not None:
+                volume = min(size, (krw_limit - self._funds(order)) / price)
+            else:
+                volume = min(size, volume_limit - order["executed_volume"])
+            if volume <= 1e-12:
+                break
+            self._apply_trade(order, float(price), float(volume))
+
+    @staticmethod
+    def _funds(order: Dict) -> float:
+        return sum(t["funds"] for t in order["trades"])
+
+    def _apply_trade(self, order: Dict, price: float, volume: float):
+        funds = price * volume
+        fee = funds * self.fee_rate
+        order["trades"].append({"market": order["market"], "price": price, "volume": volume,
+                                "funds": funds, "side": order["side"]})
+        order["executed_volume"] += volume
+        order["paid_fee"] += fee
+        order["trades_count"] += 1
+
+        limit = order["ord_type"] == "limit"
+        if order["side"] == "bid":
+            held = self.balances["BTC"] + self.locked["BTC"]
+            self.avg_buy_price = (self.avg_buy_price * held + funds) / (held + volume)
+            if limit:
+                # 지정가 예약 금액 중 체결분 차감, 지정가보다 싸게 체결된 차액은 반환
+                reserved = volume * order["price"] * (1 + self.fee_rate)
+                self.locked["KRW"] -= reserved
+                self.balances["KRW"] += reserved - funds - fee
+            else:
+                self.balances["KRW"] -= funds + fee
+            self.balances["BTC"] += volume
+        else:
+            if limit:
+                self.locked["BTC"] -= volume
+            else:
+                self.balances["BTC"] -= volume
+            self.balances["KRW"] += funds - fee
+            if self.balances["BTC"] + self.locked["BTC"] <= 1e-12:
+                self.avg_buy_price = 0.0
+
+    def _finish_market(self, order: Dict):
+        # Upbit은 시장가 매수를 금액 소진 후 'cancel', 시장가 매도를 'done'으로 표시
+        order["state"] = "cancel" if order["ord_type"] == "price" else "done"
+        if order["volume"] is not None:
+            order["remaining_volume"] = order["volume"] - order["executed_volume"]
+        self._save_state()
+
+    def _match_limit(self, order: Dict):
+        book = self._book(order["market"])
+        if order["side"] == "bid":
+            self._fill(order, book["ask_prices"], book["ask_sizes"],
+                       volume_limit=order["volume"], price_limit=order["price"])
+        else:
+            self._fill(order, book["bid_prices"], book["bid_sizes"],
+                       volume_limit=order["volume"], price_limit=order["price"])
+        order["remaining_volume"] = order["volume"] - order["executed_volume"]
+        if order["remaining_volume"] <= 1e-12:
+            order["remaining_volume"] = 0.0
+            order["state"] = "done"
+
+    def _public(self, order: Dict) -> Dict:
+        """주문 응답 (Upbit과 같이 숫자는 문자열)"""
+        keys = ("uuid", "side", "ord_type", "price", "state", "market", "created_at", "volume",
+                "remaining_volume", "executed_volume", "paid_fee", "trades_count")
+        public = {k: (str(order[k]) if isinstance(order[k], float) else order[k]) for k in keys}
+        public["trades"] = [{k: (str(v) if isinstance(v, float) else v) for k, v in t.items()}
+                            for t in order["trades"]]
+        return public
+
+# ==================== 거래소 선택 ====================
+
+_paper_exchange: Optional[PaperUpbit] = None
+
+def is_paper_mode() -> bool:
+    return os.getenv("TRADING_MODE", "live").lower() == "paper"
+
+def get_exchange():
+    """
+    TRADING_MODE에 따라 거래소 객체 반환
+
+    - live (기본): pyupbit.Upbit (API 키가 없으면 None)
+    - paper: 프로세스 내에서 공유되는 PaperUpbit
+      (PAPER_STATE_PATH 잔고 파일, PAPER_INITIAL_KRW 초기 자금, PAPER_ORDERBOOK_FILE 기록된 호가)
+    """
+    global _paper_exchange
+
+    if not is_paper_mode():
+        access = os.getenv("UPBIT_ACCESS_KEY")
+        secret = os.getenv("UPBIT_SECRET_KEY")
+        if not access or not secret:
+            return None
+        return pyupbit.Upbit(access, secret)
+
+    if _paper_exchange is None:
+        orderbook_file = os.getenv("PAPER_ORDERBOOK_FILE")
+        state_path = os.getenv("PAPER_STATE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "paper_state.json"))
+        _paper_exchange = PaperUpbit(
+            krw=float(os.getenv("PAPER_INITIAL_KRW", "10000000")),
+            orderbook_source=RecordedOrderbook(orderbook_file) if orderbook_file else None,
+            state_path=state_path,
+        )
+    return _paper_exchange
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == "record":
+        record_orderbooks(sys.argv[2], int(sys.argv[3]) if len(sys.argv) > 3 else 600)
+    else:
+        print(__doc__)
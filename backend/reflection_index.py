@@ -0,0 +1,225 @@
+"""
+반성 일기 검색 인덱스
+모든 반성 일기를 해싱 TF-IDF 벡터(NumPy 행렬)로 보관하고, 현재 시장 상황과 비슷한 일기를 골라
+토큰 예산 안에서 반환합니다.
+
+- 단어/바이그램을 고정 차원(DIMENSIONS)으로 해싱 → 어휘 사전 없이 새 일기를 바로 추가
+- IDF는 문서 수가 10% 늘 때마다 재계산하고, 그 사이 추가된 일기는 기존 IDF로 한 행만 가중치 계산
+- refresh()는 인덱스에 없는 trade ID의 일기만 읽어 추가
+"""
+import re
+import math
+import zlib
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from database import get_db_connection, table_exists
+
+DIMENSIONS = 2048
+DEFAULT_TOP_K = 5
+DEFAULT_TOKEN_BUDGET = 1500
+IDF_REBUILD_GROWTH = 1.1
+
+_TOKEN_RE = re.compile(r"[a-z]+|[가-힣]+|\d+(?:\.\d+)?")
+_STOPWORDS = frozenset(
+    "a an the and or of to in on for with at by from as is are was were be been it this that "
+    "these those its into than then so but if not no can could should would will may might "
+    "has have had do does did i we you they he she our your their".split()
+)
+
+def tokenize(text: str) -> List[str]:
+    words = [w for w in _TOKEN_RE.findall(text.lower()) if w not in _STOPWORDS and len(w) > 1]
+    return words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+
+def _bucket(token: str) -> int:
+    return zlib.crc32(token.encode()) % DIMENSIONS
+
+def vectorize(text: str) -> np.ndarray:
+    """로그 스케일 TF 벡터"""
+    vec = np.zeros(DIMENSIONS, dtype=np.float32)
+    buckets = [_bucket(t) for t in tokenize(text)]
+    if buckets:
+        np.add.at(vec, buckets, 1.0)
+        nonzero = vec > 0
+        vec[nonzero] = 1 + np.log(vec[nonzero])
+    return vec
+
+def estimate_tokens(text: str) -> int:
+    """대략적인 토큰 수 (영문 4자당 1토큰, 그 외 문자는 1자당 1토큰)"""
+    ascii_chars = sum(1 for c in text if ord(c) < 128)
+    return math.ceil(ascii_chars / 4) + (len(text) - ascii_chars)
+
+class ReflectionIndex:
+    """반성 일기 TF-IDF 인덱스 (trade ID 단위)"""
+
+    def __init__(self, capacity: int = 256):
+        self._matrix = np.zeros((capacity, DIMENSIONS), dtype=np.float32)
+        self._weighted = np.zeros((capacity, DIMENSIONS), dtype=np.float32)  # IDF 적용 + 정규화된 행
+        self._doc_freq = np.zeros(DIMENSIONS, dtype=np.float32)
+        self._idf: Optional[np.ndarray] = None
+        self._idf_docs = 0  # IDF를 계산할 때의 문서 수
+        self.ids: List[int] = []
+        self.texts: List[str] = []
+        self.meta: List[Dict] = []
+        self._positions: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(self, trade_id: int, text: str, meta: Optional[Dict] = None):
+        """일기 추가 (이미 있는 trade ID면 내용 교체)"""
+        vec = vectorize(f"{(meta or {}).get('decision', '')} {text}")
+        with self._lock:
+            if trade_id in self._positions:
+                row = self._positions[trade_id]
+                self._doc_freq -= self._matrix[row] > 0
+                self.texts[row], self.meta[row] = text, meta or {}
+            else:
+                row = len(self.ids)
+                if row == len(self._matrix):
+                    self._matrix = np.vstack([self._matrix, np.zeros_like(self._matrix)])
+                    self._weighted = np.vstack([self._weighted, np.zeros_like(self._weighted)])
+                self._positions[trade_id] = row
+                self.ids.append(trade_id)
+                self.texts.append(text)
+                self.meta.append(meta or {})
+            self._matrix[row] = vec
+            self._doc_freq += vec > 0
+            if self._idf is not None:
+                self._weighted[row] = self._normalize(vec * self._idf)
+
+    @staticmethod
+    def _normalize(vec: np.ndarray) -> np.ndarray:
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm > 0 else vec
+
+    def _prepare(self):
+        """
+        IDF 재계산 후 전체 행 가중치 갱신
+
+        문서 수가 IDF_REBUILD_GROWTH배 늘기 전까지는 기존 IDF로 새 행만 가중치를 매김
+        (일기 하나 추가마다 전체 행렬을 다시 계산하지 않도록)
+        """
+        n = len(self.ids)
+        self._idf = (np.log((1 + n) / (1 + self._doc_freq)) + 1).astype(np.float32)
+        self._idf_docs = n
+        weighted = self._matrix[:n] * self._idf
+        norms = np.linalg.norm(weighted, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        self._weighted[:n] = weighted / norms
+
+    def search(self, query: str, top_k: int = DEFAULT_TOP_K,
+               token_budget: int = DEFAULT_TOKEN_BUDGET) -> List[Dict]:
+        """
+        query와 가장 비슷한 일기를 유사도 순으로 반환
+
+        token_budget을 넘기는 일기는 건너뛰고 다음 후보를 확인합니다.
+        """
+        with self._lock:
+            if not self.ids:
+                return []
+            if self._idf is None or len(self.ids) > self._idf_docs * IDF_REBUILD_GROWTH:
+                self._prepare()
+
+            q = vectorize(query) * self._idf
+            q_norm = np.linalg.norm(q)
+            n = len(self.ids)
+            scores = self._weighted[:n] @ (q / q_norm) if q_norm > 0 else np.zeros(n, dtype=np.float32)
+
+            # 점수가 같으면 최신 일기 우선
+            order = np.lexsort((-np.asarray(self.ids), -scores))
+
+            results, used = [], 0
+            for row in order:
+                text = self.texts[row]
+                tokens = estimate_tokens(text)
+                if used + tokens > token_budget:
+                    continue
+                results.append({"trade_id": self.ids[row], "score": float(scores[row]),
+                                "reflection": text, "tokens": tokens, **self.meta[row]})
+                used += tokens
+                if len(results) >= top_k:
+                    break
+            return results
+
+    def refresh(self) -> int:
+        """DB에서 아직 인덱스에 없는 반성 일기를 읽어 추가, 추가한 개수 반환"""
+        conn = get_db_connection()
+        try:
+            if not table_exists(conn, "trades"):
+                return 0
+            ids = {row[0] for row in conn.execute("SELECT id FROM trades WHERE reflection IS NOT NULL AND reflection != ''")}
+            new_ids = sorted(ids - self._positions.keys())
+            rows = []
+            for start in range(0, len(new_ids), 500):
+                chunk = new_ids[start:start + 500]
+                rows.extend(conn.execute(f'''
+                    SELECT id, timestamp, decision, percentage, reflection FROM trades
+                    WHERE id IN ({",".join("?" * len(chunk))})
+                ''', chunk).fetchall())
+        finally:
+            conn.close()
+
+        for row in rows:
+            self.add(row["id"], row["reflection"],
+                     {"timestamp": row["timestamp"], "decision": row["decision"], "percentage": row["percentage"]})
+        return len(rows)
+
+_index: Optional[ReflectionIndex] = None
+_index_lock = threading.Lock()
+
+def get_reflection_index() -> ReflectionIndex:
+    """프로세스 공용 인덱스 (호출할 때마다 새 일기 반영)"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = ReflectionIndex()
+    _index.refresh()
+    return _index
+
+def describe_market(indicators: Dict, fear_greed: Optional[Dict] = None,
+                    headlines: Optional[List[str]] = None, change_24h: Optional[float] = None,
+                    orderbook_features: Optional[Dict] = None) -> str:
+    """
+    검색용 시장 상황 문장
+
+    반성 일기에 자주 등장하는 표현(overbought, bearish, extreme fear 등)으로 현재 지표를 서술합니다.
+    """
+    indicators = {k: v for k, v in indicators.items() if v == v}  # NaN 제외
+    parts = []
+    rsi = indicators.get("rsi")
+    if rsi is not None:
+        level = "overbought" if rsi >= 70 else "oversold" if rsi <= 30 else "neutral"
+        parts.append(f"RSI {rsi:.0f} {level}")
+    macd_diff = indicators.get("macd_diff")
+    if macd_diff is not None:
+        parts.append("MACD bullish momentum" if macd_diff > 0 else "MACD bearish momentum")
+    close, bb_high, bb_low = indicators.get("close"), indicators.get("bb_hband"), indicators.get("bb_lband")
+    if close is not None and bb_high is not None and bb_low is not None:
+        if close >= bb_high:
+            parts.append("price above upper Bollinger band")
+        elif close <= bb_low:
+            parts.append("price below lower Bollinger band")
+    sma = indicators.get("sma_20")
+    if close is not None and sma is not None:
+        parts.append("uptrend above moving average" if close > sma else "downtrend below moving average")
+    if change_24h is not None:
+        direction = "rally" if change_24h > 3 else "drop" if change_24h < -3 else "sideways"
+        parts.append(f"24h change {change_24h:.1f}% {direction}")
+    if orderbook_features:
+        imbalance = orderbook_features.get("imbalance", {}).get("5")
+        if imbalance is not None and abs(imbalance) >= 0.2:
+            parts.append("orderbook buy pressure bids" if imbalance > 0 else "orderbook sell pressure asks")
+    if fear_greed:
+        parts.append(f"Fear and Greed {fear_greed.get('value')} {fear_greed.get('classification', '')}")
+    if headlines:
+        parts.extend(headlines[:5])
+    return ". ".join(parts)
+
+def fetch_relevant_reflections(query: str, top_k: int = DEFAULT_TOP_K,
+                               token_budget: int = DEFAULT_TOKEN_BUDGET) -> List[Dict]:
+    """현재 상황(query)과 가장 관련 있는 과거 반성 일기"""
+    return get_reflection_index().search(query, top_k=top_k, token_budget=token_budget)
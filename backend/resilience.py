@@ -0,0 +1,348 @@
+"""
+외부 호출 복원력 계층
+Upbit 공개 API(pyupbit), alternative.me, SerpApi, OpenAI 호출에 같은 정책을 적용합니다.
+
+- 타임아웃: httpx 클라이언트는 HTTP_TIMEOUT(연결 5초/읽기 10초)을 쓰고, 타임아웃 인자가 없는
+  pyupbit 호출은 별도 스레드에서 실행해 RESILIENCE_CALL_TIMEOUT초까지만 기다림
+- 재시도: 지수 백오프 + full jitter로 RESILIENCE_ATTEMPTS회까지 (4xx 응답은 재시도하지 않음)
+- 서킷 브레이커: 연속 BREAKER_FAILURE_THRESHOLD회 실패하면 BREAKER_RESET_SECONDS 동안 호출하지 않고
+  같은 요청의 마지막 정상 값 또는 fallback을 반환, 이후 한 번 시험 호출(half-open)해 복구 여부 확인
+  (마지막 정상 값은 stale=True인 호출만 저장, 의존성마다 최근 LAST_GOOD_MAX_ENTRIES개,
+   호출마다 정한 max_age보다 오래된 값은 반환하지 않음)
+- 헤지 요청: 현재가 조회가 PRICE_HEDGE_DELAY초 안에 끝나지 않으면 같은 요청을 한 번 더 보내 먼저 온 응답 사용
+- OpenAI: openai_client()가 타임아웃과 SDK 내장 재시도(지수 백오프 + jitter) 횟수를 지정,
+  매매 판단은 model_router.py가 모델별 브레이커로 호출
+
+주문(매수/매도)은 멱등하지 않으므로 이 계층을 거치지 않습니다.
+브레이커 상태는 GET /api/metrics 로 볼 수 있습니다.
+"""
+import os
+import time
+import random
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import httpx
+import pyupbit
+
+TICKER = "KRW-BTC"
+
+# 외부 HTTP API 공용 타임아웃 (연결 5초, 읽기/쓰기 10초)
+HTTP_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+
+RESILIENCE_ATTEMPTS = int(os.getenv("RESILIENCE_ATTEMPTS", "3"))
+RESILIENCE_BACKOFF_BASE = float(os.getenv("RESILIENCE_BACKOFF_BASE", "0.5"))
+RESILIENCE_BACKOFF_MAX = float(os.getenv("RESILIENCE_BACKOFF_MAX", "8"))
+RESILIENCE_CALL_TIMEOUT = float(os.getenv("RESILIENCE_CALL_TIMEOUT", "10"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+PRICE_HEDGE_DELAY = float(os.getenv("PRICE_HEDGE_DELAY", "0.3"))  # 0이면 헤지하지 않음
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+LAST_GOOD_MAX_ENTRIES = int(os.getenv("LAST_GOOD_MAX_ENTRIES", "32"))
+STALE_MAX_AGE = float(os.getenv("STALE_MAX_AGE", "300"))  # 마지막 정상 값 기본 최대 나이 (초)
+PRICE_STALE_MAX_AGE = float(os.getenv("PRICE_STALE_MAX_AGE", "30"))
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+_MISSING = object()
+
+# 타임아웃이 없는 블로킹 호출을 기다리기 위한 스레드 풀 (멈춘 호출은 스레드 하나만 붙잡음)
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="resilient-call")
+
+class CircuitOpenError(RuntimeError):
+    """서킷이 열려 있고 반환할 대체 값도 없을 때"""
+
+class EmptyResponseError(RuntimeError):
+    """예외 없이 None이 반환됐을 때 (pyupbit는 요청 실패 시 None을 반환하기도 함)"""
+
+def backoff_delay(attempt: int, base: float = RESILIENCE_BACKOFF_BASE, cap: float = RESILIENCE_BACKOFF_MAX) -> float:
+    """attempt번째(0부터) 재시도 전 대기 시간 (full jitter: 0 ~ min(cap, base * 2^attempt))"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+def is_retryable(error: Exception) -> bool:
+    """4xx 응답(429 제외)은 다시 보내도 같은 결과이므로 재시도하지 않음"""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return not (isinstance(status, int) and 400 <= status < 500 and status != 429)
+
+# ==================== 서킷 브레이커 ====================
+
+class CircuitBreaker:
+    """의존성 하나의 상태 (closed → open → half_open → closed)와 마지막 정상 값"""
+
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_seconds: float = BREAKER_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None  # time.monotonic()
+        self.opened_at_wall: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self.last_success_at: Optional[str] = None
+        self.counters = {counter: 0 for counter in ("calls", "successes", "failures", "retries", "short_circuits",
+                                              "stale_served", "fallback_served", "hedged", "hedge_wins")}
+        self._trial_in_flight = False
+        self._last_good: "OrderedDict[Any, tuple]" = OrderedDict()  # key → (값, time.monotonic())
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """호출해도 되는지 (open이면 거부, reset_seconds가 지났으면 시험 호출 하나만 허용)"""
+        with self._lock:
+            if self.state == STATE_OPEN:
+                if time.monotonic() - self.opened_at < self.reset_seconds:
+                    self.counters["short_circuits"] += 1
+                    return False
+                self.state = STATE_HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == STATE_HALF_OPEN:
+                if self._trial_in_flight:
+                    self.counters["short_circuits"] += 1
+                    return False
+                self._trial_in_flight = True
+            self.counters["calls"] += 1
+            return True
+
+    def record_success(self, key: Any = None, value: Any = _MISSING):
+        """성공 기록, value를 주면 key의 마지막 정상 값으로 저장 (LRU, 최대 LAST_GOOD_MAX_ENTRIES개)"""
+        with self._lock:
+            if self.state != STATE_CLOSED:
+                print(f"Circuit {self.name} closed")
+            self.counters["successes"] += 1
+            self.state = STATE_CLOSED
+            self.consecutive_failures = 0
+            self.opened_at = self.opened_at_wall = None
+            self._trial_in_flight = False
+            self.last_success_at = datetime.now().isoformat(timespec="seconds")
+            if value is not _MISSING:
+                self._last_good[key] = (value, time.monotonic())
+                self._last_good.move_to_end(key)
+                while len(self._last_good) > LAST_GOOD_MAX_ENTRIES:
+                    self._last_good.popitem(last=False)
+
+    def record_failure(self, error: Exception):
+        with self._lock:
+            self.counters["failures"] += 1
+            self.consecutive_failures += 1
+            self.last_error = f"{type(error).__name__}: {error}"[:200]
+            self._trial_in_flight = False
+            if self.state == STATE_HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != STATE_OPEN:
+                    print(f"Circuit {self.name} opened after {self.consecutive_failures} failures: {self.last_error}")
+                self.state = STATE_OPEN
+                self.opened_at = time.monotonic()
+                self.opened_at_wall = datetime.now().isoformat(timespec="seconds")
+
+    def count(self, counter: str):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def last_good(self, key: Any = None, max_age: float = STALE_MAX_AGE) -> Any:
+        """key의 마지막 정상 값 (없거나 max_age초보다 오래됐으면 _MISSING)"""
+        with self._lock:
+            entry = self._last_good.get(key)
+            if entry is None or time.monotonic() - entry[1] > max_age:
+                return _MISSING
+            self._last_good.move_to_end(key)
+            return entry[0]
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            retry_in = None
+            if self.state == STATE_OPEN:
+                retry_in = round(max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at)), 1)
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_seconds": self.reset_seconds,
+                "retry_in": retry_in,
+                "opened_at": self.opened_at_wall,
+                "last_error": self.last_error,
+                "last_success_at": self.last_success_at,
+                "cached_values": len(self._last_good),
+                **self.counters,
+            }
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """의존성 이름별 프로세스 공용 브레이커"""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+def breaker_states() -> Dict[str, Dict]:
+    """모든 브레이커 상태 (메트릭 용)"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
+
+# ==================== 호출 ====================
+
+def _run(fn: Callable[[], Any], timeout: Optional[float]) -> Any:
+    """timeout이 있으면 별도 스레드에서 실행하고 그 시간까지만 기다림"""
+    if timeout is None:
+        return fn()
+    future = _executor.submit(fn)
+    done, _ = wait([future], timeout=timeout)
+    if not done:
+        future.cancel()
+        raise TimeoutError(f"no response in {timeout:g}s")
+    return future.result()
+
+def _degrade(breaker: CircuitBreaker, key: Any, fallback: Any, stale: bool, max_age: float,
+             error: Exception) -> Any:
+    """실패 시 마지막 정상 값 → fallback 순으로 반환, 둘 다 없으면 마지막 예외"""
+    value = breaker.last_good(key, max_age) if stale else _MISSING
+    if value is not _MISSING:
+        breaker.count("stale_served")
+        print(f"{breaker.name} unavailable ({error}), serving last good value")
+        return value
+    if fallback is not _MISSING:
+        breaker.count("fallback_served")
+        return fallback
+    raise error
+
+def call(name: str, fn: Callable[[], Any], key: Any = None, fallback: Any = _MISSING, stale: bool = True,
+         max_age: float = STALE_MAX_AGE, timeout: Optional[float] = RESILIENCE_CALL_TIMEOUT,
+         attempts: int = RESILIENCE_ATTEMPTS, allow_none: bool = False) -> Any:
+    """
+    fn() 호출에 타임아웃/재시도/서킷 브레이커 적용
+
+    Args:
+        name: 의존성 이름 (브레이커 단위)
+        key: 같은 의존성 안에서 마지막 정상 값을 구분할 키
+        fallback: 실패했고 마지막 정상 값도 없을 때 반환할 값 (지정하지 않으면 예외)
+        stale: False면 마지막 정상 값을 저장/반환하지 않음 (주문에 쓰는 호가처럼 최신 값만 의미 있을 때)
+        max_age: 반환할 수 있는 마지막 정상 값의 최대 나이 (초)
+        timeout: fn 자체에 타임아웃이 없을 때 기다릴 최대 시간 (None이면 fn을 그대로 실행)
+        allow_none: False면 None 반환을 실패로 처리
+    """
+    breaker = get_breaker(name)
+    error: Exception = CircuitOpenError(f"{name} circuit open")
+    for attempt in range(attempts):
+        if not breaker.allow():
+            break
+        if attempt:
+            breaker.count("retries")
+        try:
+            value = _run(fn, timeout)
+            if value is None and not allow_none:
+                raise EmptyResponseError(f"{name} returned no data")
+        except Exception as e:
+            error = e
+            breaker.record_failure(e)
+            if not is_retryable(e) or attempt == attempts - 1:
+                break
+            time.sleep(backoff_delay(attempt))
+            continue
+        if stale:
+            breaker.record_success(key, value)
+        else:
+            breaker.record_success()
+        return value
+    return _degrade(breaker, key, fallback, stale, max_age, error)
+
+async def call_async(name: str, fn: Callable[[], Awaitable[Any]], key: Any = None, fallback: Any = _MISSING,
+                     stale: bool = True, max_age: float = STALE_MAX_AGE, timeout: Optional[float] = None,
+                     attempts: int = RESILIENCE_ATTEMPTS, allow_none: bool = False) -> Any:
+    """call()의 비동기 버전 (fn은 코루틴을 반환하는 함수)"""
+    breaker = get_breaker(name)
+    error: Exception = CircuitOpenError(f"{name} circuit open")
+    for attempt in range(attempts):
+        if not breaker.allow():
+            break
+        if attempt:
+            breaker.count("retries")
+        try:
+            value = await (asyncio.wait_for(fn(), timeout) if timeout is not None else fn())
+            if value is None and not allow_none:
+                raise EmptyResponseError(f"{name} returned no data")
+        except Exception as e:
+            error = e
+            breaker.record_failure(e)
+            if not is_retryable(e) or attempt == attempts - 1:
+                break
+            await asyncio.sleep(backoff_delay(attempt))
+            continue
+        if stale:
+            breaker.record_success(key, value)
+        else:
+            breaker.record_success()
+        return value
+    return _degrade(breaker, key, fallback, stale, max_age, error)
+
+def hedged(name: str, fn: Callable[[], Any], delay: float = PRICE_HEDGE_DELAY,
+           timeout: float = RESILIENCE_CALL_TIMEOUT) -> Any:
+    """
+    delay초 안에 응답이 없으면 같은 요청을 한 번 더 보내고 먼저 성공한 응답 반환
+    (멱등한 조회에만 사용, 요청 수는 느린 경우에만 늘어남)
+    """
+    if delay <= 0:
+        return _run(fn, timeout)
+    first = _executor.submit(fn)
+    done, _ = wait([first], timeout=delay)
+    if done:
+        return first.result()
+
+    breaker = get_breaker(name)
+    breaker.count("hedged")
+    second = _executor.submit(fn)
+    pending = {first, second}
+    deadline = time.monotonic() + timeout - delay
+    error: Optional[Exception] = None
+    while pending and time.monotonic() < deadline:
+        done, pending = wait(pending, timeout=deadline - time.monotonic(), return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                value = future.result()
+            except Exception as e:
+                error = e
+                continue
+            if future is second:
+                breaker.count("hedge_wins")
+            return value
+    for future in pending:
+        future.cancel()
+    raise error or TimeoutError(f"no response in {timeout:g}s")
+
+# ==================== 클라이언트 ====================
+
+def openai_client(**kwargs):
+    """타임아웃(OPENAI_TIMEOUT)과 재시도 횟수를 지정한 OpenAI 클라이언트"""
+    from openai import OpenAI
+
+    return OpenAI(timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=5.0), max_retries=RESILIENCE_ATTEMPTS - 1, **kwargs)
+
+# ==================== Upbit 공개 API ====================
+
+def get_current_price(ticker: str = TICKER, hedge: bool = True, stale: bool = True,
+                      max_age: float = PRICE_STALE_MAX_AGE) -> float:
+    """현재가 (느리면 헤지 요청, 실패하면 max_age초 이내의 마지막 정상 값)"""
+    fetch = lambda: pyupbit.get_current_price(ticker)
+    if hedge:
+        return call("upbit", lambda: hedged("upbit", fetch), key=("price", ticker), stale=stale, max_age=max_age,
+                    timeout=None)
+    return call("upbit", fetch, key=("price", ticker), stale=stale, max_age=max_age)
+
+def get_ohlcv(ticker: str = TICKER, interval: str = "day", count: int = 200, to: Optional[str] = None,
+              stale: bool = True, max_age: float = STALE_MAX_AGE, allow_none: bool = False):
+    """캔들 DataFrame (pyupbit.get_ohlcv와 같은 인자, 페이지 조회는 stale=False)"""
+    return call("upbit", lambda: pyupbit.get_ohlcv(ticker, interval=interval, count=count, to=to),
+                key=("ohlcv", ticker, interval, count, to), stale=stale, max_age=max_age, allow_none=allow_none)
+
+def get_orderbook(ticker: str = TICKER, stale: bool = False, max_age: float = PRICE_STALE_MAX_AGE):
+    """호가 (pyupbit.get_orderbook 원본 형식, 기본은 오래된 값을 반환하지 않음)"""
+    return call("upbit", lambda: pyupbit.get_orderbook(ticker), key=("orderbook", ticker), stale=stale,
+                max_age=max_age)
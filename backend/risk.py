@@ -0,0 +1,336 @@
+"""
+주문 전 리스크 한도 검사
+AI가 정한 비중(percentage)으로 계산한 주문을 실행하기 전에 한도를 검사해 줄이거나 거부합니다.
+
+- 킬 스위치: 모든 주문 거부 (RISK_KILL_SWITCH 또는 set_kill_switch, 프로세스 간 공유)
+- 쿨다운: 마지막 체결 후 RISK_COOLDOWN_SECONDS 안의 주문 거부
+- 일일 손실 한도: 오늘 시작 평가액 대비 RISK_DAILY_LOSS_PCT% 이상 잃었으면 매수 거부 (매도는 허용)
+- 최대 포지션: 매수 후 BTC 평가액이 총 평가액의 RISK_MAX_POSITION_PCT%를 넘지 않도록 축소
+- 호가 깊이: 주문이 보이는 호가 잔량의 RISK_MAX_DEPTH_SHARE를 넘지 않도록 축소
+- 일일 거래 대금: 오늘 체결 금액 합계가 RISK_MAX_DAILY_TURNOVER_KRW를 넘지 않도록 축소 (0이면 끔)
+
+상태(마지막 체결 시각, 오늘 거래 대금, 킬 스위치)는 원장(fills)에서 증분으로 갱신합니다.
+DB가 바뀌지 않았으면(PRAGMA data_version) 조회 없이 메모리 값만으로 검사합니다 (bench_risk.py).
+축소/거부한 주문은 risk_rejections 테이블에 사유와 함께 기록합니다.
+"""
+import os
+import json
+import sqlite3
+import threading
+from datetime import datetime, date, timedelta
+from typing import Dict, List, Optional
+
+import database
+from database import get_db_connection, table_exists
+
+MIN_ORDER_KRW = 5000  # execution.MIN_ORDER_KRW와 같음
+
+ACTION_ALLOW = "allow"
+ACTION_REDUCE = "reduce"
+ACTION_REJECT = "reject"
+
+def _env_bool(name: str) -> bool:
+    return os.getenv(name, "").lower() in ("1", "true", "yes", "on")
+
+class RiskLimits:
+    """리스크 한도 (0 이하인 한도는 검사하지 않음)"""
+
+    def __init__(self, max_position_pct: float = 100.0, max_depth_share: float = 0.3,
+                 daily_loss_pct: float = 5.0, cooldown_seconds: float = 300.0,
+                 max_daily_turnover_krw: float = 0.0, kill_switch: bool = False):
+        self.max_position_pct = max_position_pct
+        self.max_depth_share = max_depth_share
+        self.daily_loss_pct = daily_loss_pct
+        self.cooldown_seconds = cooldown_seconds
+        self.max_daily_turnover_krw = max_daily_turnover_krw
+        self.kill_switch = kill_switch
+
+    @classmethod
+    def from_env(cls) -> "RiskLimits":
+        return cls(
+            max_position_pct=float(os.getenv("RISK_MAX_POSITION_PCT", "100")),
+            max_depth_share=float(os.getenv("RISK_MAX_DEPTH_SHARE", "0.3")),
+            daily_loss_pct=float(os.getenv("RISK_DAILY_LOSS_PCT", "5")),
+            cooldown_seconds=float(os.getenv("RISK_COOLDOWN_SECONDS", "300")),
+            max_daily_turnover_krw=float(os.getenv("RISK_MAX_DAILY_TURNOVER_KRW", "0")),
+            kill_switch=_env_bool("RISK_KILL_SWITCH"),
+        )
+
+    def to_dict(self) -> Dict:
+        return dict(vars(self))
+
+def initialize_risk_tables():
+    """risk_state / risk_rejections 테이블 생성"""
+    conn = get_db_connection()
+    conn.executescript('''
+        CREATE TABLE IF NOT EXISTS risk_state (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS risk_rejections (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at TEXT NOT NULL,
+            source TEXT NOT NULL,
+            side TEXT NOT NULL,
+            requested_amount REAL NOT NULL,
+            allowed_amount REAL NOT NULL,
+            action TEXT NOT NULL,
+            rules TEXT NOT NULL,
+            reason TEXT NOT NULL,
+            state TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_risk_rejections_created_at ON risk_rejections(created_at);
+    ''')
+    conn.commit()
+    conn.close()
+
+def _now() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+def _parse_time(value: str) -> datetime:
+    """체결 시각 (Upbit ISO 8601 또는 원장의 로컬 시각 문자열) → 로컬 naive datetime"""
+    parsed = datetime.fromisoformat(value)
+    return parsed.astimezone().replace(tzinfo=None) if parsed.tzinfo else parsed
+
+def set_risk_state(key: str, value: str, overwrite: bool = True) -> str:
+    """risk_state 값 저장 (overwrite=False면 이미 있는 값 유지), 저장된 값 반환"""
+    conn = get_db_connection()
+    try:
+        conn.execute(f'''
+            INSERT INTO risk_state (key, value, updated_at) VALUES (?, ?, ?)
+            ON CONFLICT(key) DO {"UPDATE SET value = excluded.value, updated_at = excluded.updated_at" if overwrite else "NOTHING"}
+        ''', (key, value, _now()))
+        conn.commit()
+        return conn.execute("SELECT value FROM risk_state WHERE key = ?", (key,)).fetchone()["value"]
+    finally:
+        conn.close()
+
+def set_kill_switch(enabled: bool):
+    """킬 스위치 설정 (모든 프로세스의 다음 검사부터 적용)"""
+    set_risk_state("kill_switch", "1" if enabled else "0")
+
+class RiskEngine:
+    """주문 검사 (상태는 메모리에 두고 원장이 바뀐 만큼만 반영)"""
+
+    def __init__(self, limits: Optional[RiskLimits] = None):
+        self.limits = limits or RiskLimits.from_env()
+        self.last_fill_id = 0
+        self.last_fill_at: Optional[datetime] = None
+        self.day: Optional[date] = None
+        self.day_turnover = 0.0
+        self.day_open_value: Optional[float] = None
+        self.kill_switch = False
+        self._conn: Optional[sqlite3.Connection] = None
+        self._data_version = None
+        self._lock = threading.Lock()
+
+    # ==================== 상태 갱신 ====================
+
+    def _connection(self) -> sqlite3.Connection:
+        # data_version은 연결별 값이므로 같은 연결을 계속 사용
+        if self._conn is None:
+            self._conn = sqlite3.connect(database.DB_PATH, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+        return self._conn
+
+    def _roll_day(self, today: date):
+        if self.day != today:
+            self.day = today
+            self.day_open_value = None
+            # 이미 읽은 체결은 sync에서 다시 읽지 않으므로, 날짜가 정해지기 전(또는 어제 날짜로) 읽은
+            # 오늘 체결까지 포함하도록 원장에서 다시 합산
+            self.day_turnover = self._turnover_on(today)
+
+    def _turnover_on(self, day: date) -> float:
+        """이미 반영한 체결(id <= last_fill_id) 중 day에 체결된 금액 합계"""
+        conn = self._connection()
+        if not table_exists(conn, "fills"):
+            return 0.0
+        # filled_at은 날짜로 시작하는 문자열이므로 하루 앞부터 거르고 시간대는 파싱해서 비교
+        rows = conn.execute('''
+            SELECT filled_at, funds FROM fills WHERE id <= ? AND filled_at >= ?
+        ''', (self.last_fill_id, (day - timedelta(days=1)).isoformat()))
+        return sum(row["funds"] for row in rows if _parse_time(row["filled_at"]).date() == day)
+
+    def apply_fill(self, fill: Dict):
+        filled_at = _parse_time(fill["filled_at"])
+        if filled_at.date() == self.day:
+            self.day_turnover += fill["funds"]
+        if self.last_fill_at is None or filled_at > self.last_fill_at:
+            self.last_fill_at = filled_at
+        self.last_fill_id = fill["id"]
+
+    def sync(self):
+        """DB가 바뀌었으면 새 체결과 킬 스위치만 읽어 반영"""
+        conn = self._connection()
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._data_version:
+            return
+        if table_exists(conn, "fills"):
+            for row in conn.execute('''
+                SELECT id, filled_at, funds FROM fills WHERE id > ? ORDER BY id
+            ''', (self.last_fill_id,)):
+                self.apply_fill(dict(row))
+        if table_exists(conn, "risk_state"):
+            row = conn.execute("SELECT value FROM risk_state WHERE key = 'kill_switch'").fetchone()
+            self.kill_switch = bool(row and row["value"] == "1")
+        self._data_version = version
+
+    def _open_value(self, value: float) -> float:
+        """오늘 시작 평가액 (그날 첫 검사 시점 값을 저장해 프로세스 간 공유)"""
+        if self.day_open_value is None:
+            self.day_open_value = float(set_risk_state(f"open_value:{self.day.isoformat()}", repr(value),
+                                                       overwrite=False))
+        return self.day_open_value
+
+    # ==================== 검사 ====================
+
+    def check(self, side: str, amount: float, orderbook, krw_balance: float, btc_balance: float,
+              source: str = "autotrade", now: Optional[datetime] = None) -> Dict:
+        """
+        주문 검사
+
+        Args:
+            side: buy(amount는 KRW) | sell(amount는 BTC)
+            orderbook: OrderbookSnapshot (평가 가격과 호가 깊이)
+
+        Returns:
+            {"allowed", "action": allow|reduce|reject, "amount": 실행할 양, "violations": [{"rule", "message"}]}
+        """
+        if side not in ("buy", "sell"):
+            raise ValueError(f"알 수 없는 주문 방향: {side}")
+        now = now or datetime.now()
+        limits = self.limits
+        price = orderbook.mid
+        value = krw_balance + btc_balance * price
+        violations: List[Dict] = []
+        rejected = False
+        allowed = amount
+
+        with self._lock:
+            self._roll_day(now.date())
+            self.sync()
+
+            if limits.kill_switch or self.kill_switch:
+                violations.append({"rule": "kill_switch", "message": "킬 스위치가 켜져 있습니다."})
+                rejected = True
+
+            if limits.cooldown_seconds > 0 and self.last_fill_at is not None:
+                elapsed = (now - self.last_fill_at).total_seconds()
+                if elapsed < limits.cooldown_seconds:
+                    violations.append({"rule": "cooldown",
+                                       "message": f"마지막 체결 후 {elapsed:.0f}초 (최소 {limits.cooldown_seconds:.0f}초)"})
+                    rejected = True
+
+            if side == "buy" and limits.daily_loss_pct > 0 and value > 0:
+                open_value = self._open_value(value)
+                loss_pct = (open_value - value) / open_value * 100 if open_value > 0 else 0.0
+                if loss_pct >= limits.daily_loss_pct:
+                    violations.append({"rule": "daily_loss",
+                                       "message": f"오늘 손실 {loss_pct:.2f}% (한도 {limits.daily_loss_pct}%)"})
+                    rejected = True
+
+            turnover_left = (limits.max_daily_turnover_krw - self.day_turnover
+                             if limits.max_daily_turnover_krw > 0 else None)
+
+        def reduce(rule: str, cap: float, message: str):
+            nonlocal allowed
+            if allowed > cap:
+                allowed = max(0.0, cap)
+                violations.append({"rule": rule, "message": message})
+
+        if side == "buy":
+            if limits.max_position_pct < 100 and value > 0:
+                room = value * limits.max_position_pct / 100 - btc_balance * price
+                reduce("max_position", room, f"매수 후 BTC 비중이 {limits.max_position_pct}%를 넘음 (여유 {max(room, 0):,.0f}원)")
+            if limits.max_depth_share > 0:
+                depth = float((orderbook.ask_prices * orderbook.ask_sizes).sum())
+                reduce("depth", depth * limits.max_depth_share,
+                       f"매도 호가 잔량 {depth:,.0f}원의 {limits.max_depth_share:.0%} 초과")
+            if turnover_left is not None:
+                reduce("daily_turnover", turnover_left, f"오늘 거래 대금 한도 초과 (남은 한도 {max(turnover_left, 0):,.0f}원)")
+            allowed_krw = allowed
+        else:
+            if limits.max_depth_share > 0:
+                depth = float(orderbook.bid_sizes.sum())
+                reduce("depth", depth * limits.max_depth_share,
+                       f"매수 호가 잔량 {depth:.4f} BTC의 {limits.max_depth_share:.0%} 초과")
+            if turnover_left is not None:
+                reduce("daily_turnover", turnover_left / price, f"오늘 거래 대금 한도 초과 (남은 한도 {max(turnover_left, 0):,.0f}원)")
+            allowed_krw = allowed * price
+
+        if not rejected and violations and allowed_krw < MIN_ORDER_KRW:
+            # 줄인 주문이 최소 주문 금액보다 작으면 거부
+            rejected = True
+
+        action = ACTION_REJECT if rejected else ACTION_REDUCE if violations else ACTION_ALLOW
+        result = {
+            "allowed": not rejected,
+            "action": action,
+            "amount": 0.0 if rejected else allowed,
+            "violations": violations,
+        }
+        if violations:
+            record_rejection(source, side, amount, result, self.state(price))
+        return result
+
+    def status(self) -> Dict:
+        """한도와 현재 상태 (원장 변경분 반영 후)"""
+        with self._lock:
+            self._roll_day(datetime.now().date())
+            self.sync()
+            return {"limits": self.limits.to_dict(), "state": self.state()}
+
+    def state(self, price: Optional[float] = None) -> Dict:
+        return {
+            "last_fill_id": self.last_fill_id,
+            "last_fill_at": self.last_fill_at.isoformat(sep=" ") if self.last_fill_at else None,
+            "day": self.day.isoformat() if self.day else None,
+            "day_turnover": self.day_turnover,
+            "day_open_value": self.day_open_value,
+            "kill_switch": self.kill_switch or self.limits.kill_switch,
+            "price": price,
+        }
+
+def record_rejection(source: str, side: str, requested: float, result: Dict, state: Dict):
+    """축소/거부한 주문 기록 (기록 실패는 주문 검사에 영향 없음)"""
+    rules = ",".join(v["rule"] for v in result["violations"])
+    reason = "; ".join(v["message"] for v in result["violations"])
+    print(f"Risk {result['action']} {side} {requested:,.8g} -> {result['amount']:,.8g}: {reason}")
+    try:
+        conn = get_db_connection()
+        try:
+            conn.execute('''
+                INSERT INTO risk_rejections (created_at, source, side, requested_amount, allowed_amount,
+                                             action, rules, reason, state)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (_now(), source, side, requested, result["amount"], result["action"], rules, reason,
+                  json.dumps(state)))
+            conn.commit()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"Error recording risk rejection: {e}")
+
+def get_risk_rejections(limit: int = 50) -> List[Dict]:
+    conn = get_db_connection()
+    try:
+        if not table_exists(conn, "risk_rejections"):
+            return []
+        rows = conn.execute("SELECT * FROM risk_rejections ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+    finally:
+        conn.close()
+    return [dict(row, state=json.loads(row["state"]) if row["state"] else None) for row in rows]
+
+_engine: Optional[RiskEngine] = None
+_engine_lock = threading.Lock()
+
+def get_risk_engine() -> RiskEngine:
+    """프로세스 공용 RiskEngine"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = RiskEngine()
+        return _engine
@@ -0,0 +1,210 @@
+"""
+심리 지표 보관소 (공포-탐욕 지수, 뉴스)
+판단 당시의 심리 입력을 나중에 다시 볼 수 있도록 공포-탐욕 지수 이력과 조회한 뉴스 묶음을 SQLite에 저장하고,
+캔들/거래 시각에 맞춰 as-of 조인(그 시각 이전의 가장 최근 값)으로 정렬해 줍니다.
+
+- 공포-탐욕 지수: alternative.me API의 limit 파라미터로 이력을 한 번에 받음 (limit=0이면 전체),
+  이후에는 마지막 저장일 이후 일수만큼만 요청
+- 뉴스: 조회할 때마다 헤드라인 묶음을 조회 시각과 함께 저장
+- as-of 조인: 정렬된 시각 배열에 np.searchsorted (조회 시각 N개, 이력 M개 → O(N log M))
+
+타임스탬프는 모두 epoch 밀리초입니다.
+"""
+import json
+import time
+from typing import Dict, List, Optional, Sequence
+
+import httpx
+import numpy as np
+import pandas as pd
+
+from database import get_db_connection, table_exists
+
+FEAR_GREED_HISTORY_URL = "https://api.alternative.me/fng/"
+DAY_MS = 24 * 3600 * 1000
+
+# as-of 값으로 인정하는 최대 경과 시간 (더 오래되면 값 없음)
+FEAR_GREED_MAX_AGE_MS = 2 * DAY_MS   # 일 단위 지표
+NEWS_MAX_AGE_MS = 12 * 3600 * 1000   # 매매 주기(하루 3회)보다 길게
+
+def initialize_sentiment_tables():
+    """fear_greed_history / news_batches 테이블 생성"""
+    conn = get_db_connection()
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS fear_greed_history (
+            ts INTEGER PRIMARY KEY,
+            value INTEGER NOT NULL,
+            classification TEXT NOT NULL
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS news_batches (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fetched_at INTEGER NOT NULL,
+            query TEXT NOT NULL,
+            headlines TEXT NOT NULL
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_news_batches_fetched_at ON news_batches(fetched_at)')
+    conn.commit()
+    conn.close()
+
+# ==================== 공포-탐욕 지수 ====================
+
+def parse_fear_greed(data: Dict) -> List[tuple]:
+    """alternative.me 응답 → (ts, value, classification) 목록"""
+    return [
+        (int(entry["timestamp"]) * 1000, int(entry["value"]), entry["value_classification"])
+        for entry in data.get("data", [])
+    ]
+
+def record_fear_greed(rows: Sequence[tuple]) -> int:
+    """(ts, value, classification) 저장 (같은 날짜는 덮어씀), 저장한 행 수 반환"""
+    if not rows:
+        return 0
+    conn = get_db_connection()
+    try:
+        conn.executemany('''
+            INSERT INTO fear_greed_history (ts, value, classification) VALUES (?, ?, ?)
+            ON CONFLICT(ts) DO UPDATE SET value = excluded.value, classification = excluded.classification
+        ''', rows)
+        conn.commit()
+    finally:
+        conn.close()
+    return len(rows)
+
+def backfill_fear_greed(full: bool = False) -> int:
+    """
+    공포-탐욕 지수 이력 받아 저장
+
+    Args:
+        full: True면 전체 이력 (limit=0), 아니면 마지막 저장일 이후만 (비어 있으면 전체)
+
+    Returns:
+        저장한 일수
+    """
+    conn = get_db_connection()
+    try:
+        latest = conn.execute("SELECT MAX(ts) FROM fear_greed_history").fetchone()[0]
+    finally:
+        conn.close()
+
+    if full or latest is None:
+        limit = 0
+    else:
+        # 마지막 값도 다시 받아 당일 값 갱신
+        limit = int((time.time() * 1000 - latest) // DAY_MS) + 2
+
+    response = httpx.get(FEAR_GREED_HISTORY_URL, params={"limit": limit, "format": "json"}, timeout=30)
+    response.raise_for_status()
+    return record_fear_greed(parse_fear_greed(response.json()))
+
+def load_fear_greed(since: Optional[int] = None) -> pd.DataFrame:
+    """저장된 공포-탐욕 지수 (ts 오름차순)"""
+    conn = get_db_connection()
+    try:
+        if not table_exists(conn, "fear_greed_history"):
+            return pd.DataFrame(columns=["ts", "value", "classification"])
+        return pd.read_sql_query('''
+            SELECT ts, value, classification FROM fear_greed_history
+            WHERE ts >= ? ORDER BY ts
+        ''', conn, params=(since if since is not None else 0,))
+    finally:
+        conn.close()
+
+# ==================== 뉴스 ====================
+
+def archive_news(headlines: Sequence, query: str = "btc", fetched_at: Optional[int] = None) -> Optional[int]:
+    """
+    조회한 뉴스 묶음 저장
+
+    Args:
+        headlines: (제목, 날짜 문자열) 또는 제목 목록
+        fetched_at: 조회 시각 (기본: 현재)
+
+    Returns:
+        저장한 묶음 ID (빈 묶음이면 None)
+    """
+    if not headlines:
+        return None
+    items = [
+        {"title": h[0], "date": h[1]} if isinstance(h, (list, tuple)) else {"title": h, "date": None}
+        for h in headlines
+    ]
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute('''
+            INSERT INTO news_batches (fetched_at, query, headlines) VALUES (?, ?, ?)
+        ''', (fetched_at if fetched_at is not None else int(time.time() * 1000), query,
+              json.dumps(items, ensure_ascii=False)))
+        conn.commit()
+        return cursor.lastrowid
+    finally:
+        conn.close()
+
+def load_news_batches(since: Optional[int] = None, until: Optional[int] = None) -> pd.DataFrame:
+    """저장된 뉴스 묶음 (fetched_at 오름차순, headlines는 리스트로 변환)"""
+    conn = get_db_connection()
+    try:
+        if not table_exists(conn, "news_batches"):
+            return pd.DataFrame(columns=["id", "fetched_at", "query", "headlines"])
+        frame = pd.read_sql_query('''
+            SELECT id, fetched_at, query, headlines FROM news_batches
+            WHERE fetched_at >= ? AND fetched_at <= ?
+            ORDER BY fetched_at, id
+        ''', conn, params=(since if since is not None else 0,
+                           until if until is not None else np.iinfo(np.int64).max))
+    finally:
+        conn.close()
+    frame["headlines"] = [json.loads(h) for h in frame["headlines"]]
+    return frame
+
+# ==================== as-of 조인 ====================
+
+def asof_positions(series_ts: np.ndarray, query_ts: np.ndarray, max_age: Optional[int] = None) -> np.ndarray:
+    """
+    query_ts 각 시각 이전(같은 시각 포함)의 가장 최근 series_ts 위치, 없거나 max_age보다 오래되면 -1
+
+    series_ts는 오름차순이어야 합니다. query_ts는 정렬되어 있지 않아도 됩니다.
+    """
+    query_ts = np.asarray(query_ts, dtype=np.int64)
+    if len(series_ts) == 0:
+        return np.full(len(query_ts), -1, dtype=np.int64)
+    positions = np.searchsorted(series_ts, query_ts, side="right") - 1
+    if max_age is not None:
+        stale = query_ts - series_ts[np.maximum(positions, 0)] > max_age
+        positions[stale] = -1
+    return positions
+
+def _take(column: pd.Series, positions: np.ndarray) -> pd.Series:
+    """positions 위치의 값 (-1은 결측)"""
+    return column.reset_index(drop=True).reindex(positions).reset_index(drop=True)
+
+def align_sentiment(query_ts: Sequence[int],
+                    fear_greed_max_age: int = FEAR_GREED_MAX_AGE_MS,
+                    news_max_age: int = NEWS_MAX_AGE_MS) -> pd.DataFrame:
+    """
+    각 시각(캔들/거래)에 그 시각 기준의 공포-탐욕 지수와 뉴스 묶음을 붙임
+
+    Returns:
+        query_ts 순서 그대로의 DataFrame (값이 없으면 결측)
+        (ts, fear_greed, fear_greed_class, fear_greed_ts, news_batch_id, news_fetched_at, headlines)
+    """
+    query_ts = np.asarray(query_ts, dtype=np.int64)
+    earliest = int(query_ts.min()) if len(query_ts) else 0
+    latest = int(query_ts.max()) if len(query_ts) else 0
+    result = pd.DataFrame({"ts": query_ts})
+
+    fear_greed = load_fear_greed(since=earliest - fear_greed_max_age)
+    pos = asof_positions(fear_greed["ts"].to_numpy(np.int64), query_ts, fear_greed_max_age)
+    result["fear_greed"] = _take(fear_greed["value"], pos).astype("Int64")
+    result["fear_greed_class"] = _take(fear_greed["classification"], pos)
+    result["fear_greed_ts"] = _take(fear_greed["ts"], pos).astype("Int64")
+
+    news = load_news_batches(since=earliest - news_max_age, until=latest)
+    pos = asof_positions(news["fetched_at"].to_numpy(np.int64), query_ts, news_max_age)
+    result["news_batch_id"] = _take(news["id"], pos).astype("Int64")
+    result["news_fetched_at"] = _take(news["fetched_at"], pos).astype("Int64")
+    headlines = news["headlines"].tolist()
+    result["headlines"] = [headlines[p] if p >= 0 else None for p in pos]
+    return result
@@ -0,0 +1,226 @@
+"""
+응답 직렬화 / 압축
+REST 응답과 WebSocket 메시지의 인코딩을 한 곳에서 처리합니다.
+
+- dumps: orjson이 설치되어 있으면 사용 (큰 목록에서 표준 json보다 수 배 빠름), 없으면 표준 json
+  (표준 json도 orjson과 같은 결과: NaN/Infinity → null, numpy 값 → 파이썬 값, datetime → ISO 문자열)
+- FastJSONResponse: 앱 기본 응답 클래스, 큰 목록은 라우트에서 직접 반환해 검증/변환 단계를 건너뜀
+- CompressionMiddleware: Accept-Encoding 협상 (brotli 설치 시 br, 아니면 gzip), 스트리밍 응답도 조각 단위로 압축
+- WebSocket: ?encoding=msgpack 이면 바이너리 프레임, 기본은 JSON 텍스트 프레임
+  (permessage-deflate는 uvicorn이 클라이언트와 협상)
+"""
+import json
+import math
+import zlib
+from datetime import date, datetime, time
+from typing import Any, Optional
+
+import numpy as np
+
+from fastapi import WebSocket
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import orjson  # 선택 의존성: 빠른 JSON 직렬화
+except ImportError:
+    orjson = None
+
+try:
+    import brotli  # 선택 의존성: br 압축
+except ImportError:
+    brotli = None
+
+try:
+    import msgpack  # 선택 의존성: WebSocket 바이너리 메시지
+except ImportError:
+    msgpack = None
+
+GZIP_LEVEL = 6       # 9보다 크기는 4% 이내로 크지만 CPU는 절반 이하 (bench_serialization.py)
+BROTLI_QUALITY = 4   # 동적 응답용 (11은 정적 파일용)
+MINIMUM_SIZE = 1000
+
+def _to_builtin(value: Any) -> Any:
+    """표준 json/msgpack이 모르는 값 변환 (orjson과 같은 규칙), 모르는 타입은 TypeError"""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+def _json_default(value: Any) -> Any:
+    return _replace_nan(_to_builtin(value))
+
+def _replace_nan(value: Any) -> Any:
+    """NaN/Infinity를 None으로 (orjson은 null로 직렬화)"""
+    if isinstance(value, float):
+        return None if math.isnan(value) or math.isinf(value) else value
+    if isinstance(value, dict):
+        return {k: _replace_nan(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_replace_nan(v) for v in value]
+    return value
+
+def _json_dumps(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, separators=(",", ":"),
+                      default=_json_default).encode("utf-8")
+
+def dumps(value: Any) -> bytes:
+    """JSON 직렬화 (UTF-8 bytes)"""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    try:
+        return _json_dumps(value)
+    except ValueError:
+        # NaN이 있을 때만 전체를 한 번 더 훑음 (대부분의 응답은 바로 직렬화)
+        return _json_dumps(_replace_nan(value))
+
+class FastJSONResponse(JSONResponse):
+    """dumps를 사용하는 JSON 응답"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+# ==================== REST 압축 ====================
+
+class _GzipEncoder:
+    name = "gzip"
+
+    def __init__(self):
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        # 스트리밍 응답은 조각마다 바로 내보내도록 sync flush
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush()
+
+class _BrotliEncoder:
+    name = "br"
+
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.process(data) + self._compressor.finish()
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Accept-Encoding에서 사용할 압축 방식 선택 (br > gzip, q=0은 제외)"""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+class CompressionMiddleware:
+    """Accept-Encoding 협상 압축 (starlette GZipMiddleware와 같은 방식, br 추가)"""
+
+    def __init__(self, app: ASGIApp, minimum_size: int = MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http":
+            encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+            if encoding is not None:
+                encoder = _BrotliEncoder() if encoding == "br" else _GzipEncoder()
+                await _CompressionResponder(self.app, encoder, self.minimum_size)(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+class _CompressionResponder:
+    def __init__(self, app: ASGIApp, encoder, minimum_size: int):
+        self.app = app
+        self.encoder = encoder
+        self.minimum_size = minimum_size
+        self.send: Optional[Send] = None
+        self.initial_message: Message = {}
+        self.started = False
+        self.passthrough = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    def _set_headers(self, length: Optional[int]):
+        headers = MutableHeaders(raw=self.initial_message["headers"])
+        headers["Content-Encoding"] = self.encoder.name
+        if length is None:
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(length)
+        headers.add_vary_header("Accept-Encoding")
+
+    async def send_compressed(self, message: Message):
+        if message["type"] == "http.response.start":
+            # 헤더는 첫 본문을 보고 압축 여부를 정한 뒤 보냄
+            self.initial_message = message
+            self.passthrough = "content-encoding" in Headers(raw=message["headers"])
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.passthrough:
+            if not self.started:
+                self.started = True
+                await self.send(self.initial_message)
+            await self.send(message)
+        elif not self.started:
+            self.started = True
+            if len(body) < self.minimum_size and not more_body:
+                # 작은 응답은 압축하지 않음
+                self.passthrough = True
+                await self.send(self.initial_message)
+                await self.send(message)
+            elif not more_body:
+                body = self.encoder.finish(body)
+                self._set_headers(len(body))
+                await self.send(self.initial_message)
+                await self.send({**message, "body": body})
+            else:
+                self._set_headers(None)
+                await self.send(self.initial_message)
+                await self.send({**message, "body": self.encoder.compress(body)})
+        else:
+            body = self.encoder.compress(body) if more_body else self.encoder.finish(body)
+            await self.send({**message, "body": body})
+
+# ==================== WebSocket ====================
+
+def ws_encoding_available(encoding: str) -> bool:
+    return encoding == "json" or (encoding == "msgpack" and msgpack is not None)
+
+def encode_ws_message(message: Any, encoding: str = "json"):
+    """WebSocket 프레임 내용 (msgpack이면 bytes, json이면 str)"""
+    if encoding == "msgpack":
+        return msgpack.packb(message, default=_to_builtin)
+    return dumps(message).decode("utf-8")
+
+async def send_ws_message(websocket: WebSocket, message: Any, encoding: str = "json"):
+    payload = encode_ws_message(message, encoding)
+    if isinstance(payload, bytes):
+        await websocket.send_bytes(payload)
+    else:
+        await websocket.send_text(payload)
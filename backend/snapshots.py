@@ -0,0 +1,243 @@
+"""
+매매 판단 입력 스냅샷
+매 사이클의 프롬프트 입력을 압축해 내용 주소(SHA-256) 방식으로 저장하고 거래 기록과 연결합니다.
+저장된 입력으로 당시 프롬프트를 그대로 다시 만들어 판단을 재현하거나 분석할 수 있습니다.
+
+- 입력 하나가 blob 하나: 같은 내용(strategy.txt, 바뀌지 않은 차트 이미지 등)은 한 번만 저장
+- 압축: zstandard가 설치되어 있으면 zstd, 아니면 gzip (blob마다 codec 기록)
+- 차트 이미지는 base64 대신 PNG 바이트로 저장
+- 보관 한도(SNAPSHOT_MAX_BYTES)를 넘으면 오래된 스냅샷부터 지우고 참조가 없어진 blob 정리
+"""
+import os
+import gzip
+import json
+import time
+import base64
+import hashlib
+from typing import Any, Dict, Iterable, Optional
+
+from database import get_db_connection
+
+try:
+    import zstandard  # 선택 의존성: 더 빠르고 작은 압축
+except ImportError:
+    zstandard = None
+
+SNAPSHOT_MAX_BYTES = int(os.getenv("SNAPSHOT_MAX_BYTES", str(256 * 1024 * 1024)))
+ZSTD_LEVEL = 10
+GZIP_LEVEL = 6
+RETENTION_BATCH = 20  # 한도를 넘었을 때 한 번에 지우는 스냅샷 수
+
+def initialize_snapshot_tables():
+    """snapshot_blobs / decision_snapshots / snapshot_inputs 테이블 생성"""
+    conn = get_db_connection()
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS snapshot_blobs (
+            hash TEXT PRIMARY KEY,
+            codec TEXT NOT NULL,
+            raw_size INTEGER NOT NULL,
+            stored_size INTEGER NOT NULL,
+            data BLOB NOT NULL,
+            created_at REAL NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS decision_snapshots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at TEXT NOT NULL,
+            trade_id INTEGER,
+            model TEXT NOT NULL,
+            prompt_hash TEXT NOT NULL,
+            response TEXT
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_decision_snapshots_trade ON decision_snapshots(trade_id)')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS snapshot_inputs (
+            snapshot_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            hash TEXT NOT NULL,
+            PRIMARY KEY (snapshot_id, name)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_snapshot_inputs_hash ON snapshot_inputs(hash)')
+    conn.commit()
+    conn.close()
+
+# ==================== blob ====================
+
+def compress(data: bytes) -> tuple:
+    """(codec, 압축된 바이트)"""
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return "gzip", gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+def decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd로 저장된 스냅샷입니다. zstandard 패키지를 설치하세요.")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "gzip":
+        return gzip.decompress(data)
+    raise ValueError(f"알 수 없는 codec: {codec}")
+
+def encode_input(value: Any, kind: str) -> bytes:
+    if kind == "text":
+        return (value or "").encode("utf-8")
+    if kind == "base64":
+        return base64.b64decode(value)
+    return json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+def decode_input(data: bytes, kind: str) -> Any:
+    if kind == "text":
+        return data.decode("utf-8")
+    if kind == "base64":
+        return base64.b64encode(data).decode("ascii")
+    return json.loads(data)
+
+def put_blob(conn, data: bytes) -> tuple:
+    """blob 저장 (이미 있으면 건너뜀), (hash, 새로 저장한 바이트 수) 반환"""
+    digest = hashlib.sha256(data).hexdigest()
+    if conn.execute("SELECT 1 FROM snapshot_blobs WHERE hash = ?", (digest,)).fetchone():
+        return digest, 0
+    codec, stored = compress(data)
+    conn.execute('''
+        INSERT INTO snapshot_blobs (hash, codec, raw_size, stored_size, data, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (digest, codec, len(data), len(stored), stored, time.time()))
+    return digest, len(stored)
+
+def prompt_hash(messages) -> str:
+    return hashlib.sha256(json.dumps(messages, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+# ==================== 스냅샷 ====================
+
+def save_snapshot(inputs: Dict[str, Any], messages, model: str, response: Optional[str] = None,
+                  text_inputs: Iterable[str] = (), base64_inputs: Iterable[str] = (),
+                  trade_id: Optional[int] = None) -> Dict:
+    """
+    사이클 입력 저장
+
+    Args:
+        inputs: {입력 이름: 값} (text_inputs는 문자열, base64_inputs는 base64 문자열, 나머지는 JSON)
+        messages: 실제로 보낸 메시지 (재현 확인용 해시만 저장)
+        response: 모델 응답 원문
+
+    Returns:
+        {"snapshot_id", "new_bytes": 새로 저장한 압축 바이트, "deduplicated": 재사용한 입력 수}
+    """
+    text_inputs, base64_inputs = set(text_inputs), set(base64_inputs)
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute('''
+            INSERT INTO decision_snapshots (created_at, trade_id, model, prompt_hash, response)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (time.strftime("%Y-%m-%d %H:%M:%S"), trade_id, model, prompt_hash(messages), response))
+        snapshot_id = cursor.lastrowid
+
+        new_bytes, deduplicated = 0, 0
+        for name, value in inputs.items():
+            kind = "text" if name in text_inputs else "base64" if name in base64_inputs else "json"
+            if value is None and kind != "json":
+                continue
+            digest, stored = put_blob(conn, encode_input(value, kind))
+            new_bytes += stored
+            deduplicated += stored == 0
+            conn.execute('''
+                INSERT INTO snapshot_inputs (snapshot_id, name, kind, hash) VALUES (?, ?, ?, ?)
+            ''', (snapshot_id, name, kind, digest))
+        conn.commit()
+    finally:
+        conn.close()
+
+    enforce_retention()
+    return {"snapshot_id": snapshot_id, "new_bytes": new_bytes, "deduplicated": deduplicated}
+
+def link_snapshot_to_trade(snapshot_id: int, trade_id: int):
+    """스냅샷을 거래 기록과 연결"""
+    conn = get_db_connection()
+    conn.execute("UPDATE decision_snapshots SET trade_id = ? WHERE id = ?", (trade_id, snapshot_id))
+    conn.commit()
+    conn.close()
+
+def load_snapshot(snapshot_id: Optional[int] = None, trade_id: Optional[int] = None) -> Optional[Dict]:
+    """
+    스냅샷 조회 (snapshot_id 또는 trade_id)
+
+    Returns:
+        {"id", "created_at", "trade_id", "model", "prompt_hash", "response", "inputs": {이름: 값}}
+    """
+    conn = get_db_connection()
+    try:
+        if snapshot_id is not None:
+            row = conn.execute("SELECT * FROM decision_snapshots WHERE id = ?", (snapshot_id,)).fetchone()
+        else:
+            row = conn.execute('''
+                SELECT * FROM decision_snapshots WHERE trade_id = ? ORDER BY id DESC LIMIT 1
+            ''', (trade_id,)).fetchone()
+        if row is None:
+            return None
+        blobs = conn.execute('''
+            SELECT i.name, i.kind, b.codec, b.data
+            FROM snapshot_inputs i JOIN snapshot_blobs b ON b.hash = i.hash
+            WHERE i.snapshot_id = ?
+        ''', (row["id"],)).fetchall()
+    finally:
+        conn.close()
+
+    snapshot = dict(row)
+    snapshot["inputs"] = {b["name"]: decode_input(decompress(b["codec"], b["data"]), b["kind"]) for b in blobs}
+    return snapshot
+
+def get_storage_stats() -> Dict:
+    conn = get_db_connection()
+    try:
+        snapshots = conn.execute("SELECT COUNT(*) FROM decision_snapshots").fetchone()[0]
+        blobs, raw, stored = conn.execute('''
+            SELECT COUNT(*), COALESCE(SUM(raw_size), 0), COALESCE(SUM(stored_size), 0) FROM snapshot_blobs
+        ''').fetchone()
+        referenced_raw = conn.execute('''
+            SELECT COALESCE(SUM(b.raw_size), 0) FROM snapshot_inputs i JOIN snapshot_blobs b ON b.hash = i.hash
+        ''').fetchone()[0]
+    finally:
+        conn.close()
+    # referenced_raw: 중복 제거와 압축이 없었다면 필요했을 크기
+    return {"snapshots": snapshots, "blobs": blobs, "raw_bytes": raw, "stored_bytes": stored,
+            "logical_bytes": referenced_raw}
+
+def enforce_retention(max_bytes: int = SNAPSHOT_MAX_BYTES) -> int:
+    """저장 크기가 max_bytes를 넘으면 오래된 스냅샷부터 삭제, 삭제한 스냅샷 수 반환"""
+    conn = get_db_connection()
+    removed = 0
+    try:
+        while conn.execute("SELECT COALESCE(SUM(stored_size), 0) FROM snapshot_blobs").fetchone()[0] > max_bytes:
+            ids = [r[0] for r in conn.execute(
+                "SELECT id FROM decision_snapshots ORDER BY id LIMIT ?", (RETENTION_BATCH,))]
+            if not ids:
+                break
+            placeholders = ",".join("?" * len(ids))
+            conn.execute(f"DELETE FROM snapshot_inputs WHERE snapshot_id IN ({placeholders})", ids)
+            conn.execute(f"DELETE FROM decision_snapshots WHERE id IN ({placeholders})", ids)
+            # 남은 스냅샷이 참조하지 않는 blob 정리
+            conn.execute('''
+                DELETE FROM snapshot_blobs
+                WHERE NOT EXISTS (SELECT 1 FROM snapshot_inputs i WHERE i.hash = snapshot_blobs.hash)
+            ''')
+            removed += len(ids)
+        conn.commit()
+    finally:
+        conn.close()
+    return removed
+
+def replay_messages(snapshot: Dict):
+    """
+    스냅샷 입력으로 프롬프트 메시지 재생성
+
+    Returns:
+        (messages, 당시 프롬프트와 같은지 여부)
+    """
+    from decision_prompt import build_messages
+
+    messages = build_messages(snapshot["inputs"])
+    return messages, prompt_hash(messages) == snapshot["prompt_hash"]
@@ -0,0 +1,99 @@
+"""
+OpenAI chat.completions 스텁 서버
+모델 라우터(model_router.py)의 시간 초과/대체/앙상블 동작을 실제 API 없이 시험하기 위한 로컬 서버입니다.
+모델별로 응답할 판단과 지연 시간을 정할 수 있습니다.
+
+사용법:
+    python stub_openai.py --port 8010 \
+        --model gpt-4o-2024-08-06=buy:3 --model gpt-4o-mini=hold:0.2
+    OPENAI_BASE_URL=http://127.0.0.1:8010/v1 OPENAI_API_KEY=stub DECISION_BUDGET_SECONDS=5 \
+        python ../autotrade.py dry-run --no-chart
+
+모델 규칙 "이름=판단:지연초[:비중]"
+    판단: buy | sell | hold | random | fail (HTTP 500) | invalid (스키마에 맞지 않는 응답)
+    규칙이 없는 모델은 hold, 0.2초
+"""
+import json
+import math
+import time
+import random
+import asyncio
+import argparse
+from typing import Dict, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+DEFAULT_RULE = {"decision": "hold", "delay": 0.2, "percentage": 0}
+
+def parse_rule(text: str) -> tuple:
+    """"name=decision:delay[:percentage]" → (name, rule)"""
+    name, _, spec = text.partition("=")
+    parts = spec.split(":")
+    return name, {
+        "decision": parts[0] or DEFAULT_RULE["decision"],
+        "delay": float(parts[1]) if len(parts) > 1 else DEFAULT_RULE["delay"],
+        "percentage": int(parts[2]) if len(parts) > 2 else 30,
+    }
+
+def completion(model: str, content: str, decision: Optional[str], logprobs: bool) -> Dict:
+    choice = {
+        "index": 0,
+        "message": {"role": "assistant", "content": content},
+        "finish_reason": "stop",
+        "logprobs": None,
+    }
+    if logprobs and decision is not None:
+        # decision 값 토큰만 확률을 흉내 냄 (나머지는 확실한 토큰)
+        confidence = random.uniform(0.5, 0.99)
+        choice["logprobs"] = {"content": [
+            {"token": '{"decision":"', "logprob": 0.0, "bytes": None, "top_logprobs": []},
+            {"token": decision, "logprob": math.log(confidence), "bytes": None, "top_logprobs": []},
+            {"token": content[len('{"decision":"') + len(decision):], "logprob": 0.0, "bytes": None, "top_logprobs": []},
+        ]}
+    return {
+        "id": f"chatcmpl-stub-{int(time.time() * 1000)}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [choice],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+def create_app(rules: Optional[Dict[str, Dict]] = None) -> FastAPI:
+    rules = rules or {}
+    app = FastAPI(title="OpenAI stub")
+    app.state.requests = 0
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "")
+        rule = rules.get(model, DEFAULT_RULE)
+        app.state.requests += 1
+        await asyncio.sleep(rule["delay"])
+
+        decision = rule["decision"]
+        if decision == "fail":
+            return JSONResponse({"error": {"message": "stub failure", "type": "server_error"}}, status_code=500)
+        if decision == "invalid":
+            return completion(model, "not json", None, False)
+        if decision == "random":
+            decision = random.choice(["buy", "sell", "hold"])
+        content = json.dumps({"decision": decision, "reason": f"stub answer from {model}",
+                              "percentage": rule["percentage"] if decision != "hold" else 0},
+                             separators=(",", ":"))
+        return completion(model, content, decision, bool(body.get("logprobs")))
+
+    return app
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="OpenAI chat.completions stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8010)
+    parser.add_argument("--model", action="append", default=[], help="이름=판단:지연초[:비중]")
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(dict(parse_rule(rule) for rule in args.model)), host=args.host, port=args.port)
@@ -0,0 +1,161 @@
+"""
+거래 결과 라벨
+각 거래 이후 고정 구간(1h/4h/24h/72h)의 수익률을 로컬 1시간 캔들로 계산해 trades 테이블에 저장합니다.
+
+- 라벨 컬럼(ret_1h ...)은 trades에 ALTER TABLE로 추가 (이미 있으면 건너뜀)
+- 구간이 지난 라벨만 채우고, 한 번 채운 라벨은 다시 계산하지 않음 (증분)
+- 아직 72h 라벨이 없는 거래만 부분 인덱스로 찾아 처리
+
+반성 일기, 성과 분석, 백테스트가 거래소 호출 없이 같은 기준의 결과를 사용할 수 있습니다.
+"""
+import time
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from database import get_db_connection, table_exists
+from candle_cache import backfill_range
+
+HOUR_MS = 3600 * 1000
+EPOCH = pd.Timestamp("1970-01-01", tz="UTC")
+HORIZONS = {"1h": 1, "4h": 4, "24h": 24, "72h": 72}  # 시간 단위
+LABEL_COLUMNS = [f"ret_{label}" for label in HORIZONS]
+
+PRICE_INTERVAL = "minute60"
+
+def initialize_label_columns():
+    """trades 테이블에 라벨 컬럼/인덱스와 trade_label_state 테이블 추가"""
+    conn = get_db_connection()
+    # trades 테이블은 autotrade.py / init_db.py가 만들므로 아직 없으면 건너뜀
+    if table_exists(conn, "trades"):
+        existing = {row["name"] for row in conn.execute("PRAGMA table_info(trades)")}
+        for column in LABEL_COLUMNS:
+            if column not in existing:
+                conn.execute(f"ALTER TABLE trades ADD COLUMN {column} REAL")
+        # 아직 라벨이 다 채워지지 않은 거래 (72h가 가장 늦게 채워짐)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_trades_label_pending ON trades (id) WHERE ret_72h IS NULL")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_trades_decision_ret_24h ON trades (decision, ret_24h)")
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS trade_label_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            labeled_total INTEGER NOT NULL,
+            last_run_at REAL NOT NULL
+        )
+    ''')
+    conn.commit()
+    conn.close()
+
+def has_label_columns(conn) -> bool:
+    return all(column in {row["name"] for row in conn.execute("PRAGMA table_info(trades)")}
+               for column in LABEL_COLUMNS)
+
+def get_label_version(conn) -> Optional[int]:
+    """지금까지 채운 라벨 수 (캐시 키용, 라벨이 채워질 때마다 증가)"""
+    if not table_exists(conn, "trade_label_state"):
+        return None
+    row = conn.execute("SELECT labeled_total FROM trade_label_state WHERE id = 1").fetchone()
+    return row["labeled_total"] if row else 0
+
+def to_epoch_ms(timestamps: pd.Series) -> np.ndarray:
+    """KST 문자열 → epoch 밀리초"""
+    return ((pd.to_datetime(timestamps).dt.tz_localize("Asia/Seoul") - EPOCH)
+            // pd.Timedelta(milliseconds=1)).to_numpy(np.int64)
+
+def forward_returns(trade_ts: np.ndarray, trade_price: np.ndarray,
+                    price_ts: np.ndarray, price: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    거래 시점부터 각 구간 뒤의 수익률
+
+    구간 끝 이후 첫 가격을 사용하며, 그 가격이 구간 끝에서 너무 멀면(max(1시간, 구간의 25%)) NaN
+    """
+    result = {}
+    if len(price_ts) == 0:
+        return {label: np.full(len(trade_ts), np.nan) for label in HORIZONS}
+    for label, hours in HORIZONS.items():
+        target = trade_ts + hours * HOUR_MS
+        idx = np.searchsorted(price_ts, target, side="left")
+        valid = idx < len(price_ts)
+        idx = np.minimum(idx, len(price_ts) - 1)
+        tolerance = max(HOUR_MS, hours * HOUR_MS // 4)
+        valid &= (price_ts[idx] - target) <= tolerance
+        result[label] = np.where(valid, price[idx] / trade_price - 1, np.nan)
+    return result
+
+def label_trades(fetch_candles: bool = False) -> Dict:
+    """
+    구간이 지난 라벨을 채움
+
+    Args:
+        fetch_candles: 캐시에 없는 캔들을 거래소에서 받아 채운 뒤 계산
+
+    Returns:
+        {"pending": 대상 거래 수, "labeled": 새로 채운 라벨 수}
+    """
+    conn = get_db_connection()
+    try:
+        if not table_exists(conn, "trades") or not has_label_columns(conn):
+            return {"pending": 0, "labeled": 0}
+        pending = pd.read_sql_query(f'''
+            SELECT id, timestamp, btc_krw_price, {", ".join(LABEL_COLUMNS)}
+            FROM trades WHERE ret_72h IS NULL AND btc_krw_price > 0
+            ORDER BY id
+        ''', conn)
+    finally:
+        conn.close()
+
+    if pending.empty:
+        return {"pending": 0, "labeled": 0}
+
+    trade_ts = to_epoch_ms(pending["timestamp"])
+    now_ms = int(time.time() * 1000)
+    if fetch_candles:
+        backfill_range(PRICE_INTERVAL, int(trade_ts.min()) - HOUR_MS)
+
+    conn = get_db_connection()
+    try:
+        candles = pd.read_sql_query('''
+            SELECT ts, close FROM candles
+            WHERE interval = ? AND ts >= ?
+            ORDER BY ts
+        ''', conn, params=(PRICE_INTERVAL, int(trade_ts.min()) - HOUR_MS))
+    finally:
+        conn.close()
+
+    # 종가는 캔들이 끝나는 시각의 가격 (진행 중인 마지막 캔들은 제외)
+    price_ts = candles["ts"].to_numpy(np.int64) + HOUR_MS
+    closed = price_ts <= now_ms
+    returns = forward_returns(trade_ts, pending["btc_krw_price"].to_numpy(np.float64),
+                              price_ts[closed], candles["close"].to_numpy(np.float64)[closed])
+
+    # 이미 채운 라벨은 유지하고 새로 계산된 라벨만 추가
+    merged = pending[LABEL_COLUMNS].to_numpy(dtype=np.float64, copy=True)
+    computed = np.column_stack([returns[label] for label in HORIZONS])
+    fill = np.isnan(merged) & ~np.isnan(computed)
+    merged[fill] = computed[fill]
+    labeled = int(fill.sum())
+
+    changed = fill.any(axis=1)
+    updates = [
+        (*[None if np.isnan(v) else float(v) for v in row], int(trade_id))
+        for row, trade_id in zip(merged[changed], pending["id"].to_numpy()[changed])
+    ]
+
+    if labeled:
+        conn = get_db_connection()
+        try:
+            conn.executemany(f'''
+                UPDATE trades SET {", ".join(f"{c} = ?" for c in LABEL_COLUMNS)}
+                WHERE id = ?
+            ''', updates)
+            conn.execute('''
+                INSERT INTO trade_label_state (id, labeled_total, last_run_at) VALUES (1, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    labeled_total = labeled_total + excluded.labeled_total,
+                    last_run_at = excluded.last_run_at
+            ''', (labeled, time.time()))
+            conn.commit()
+        finally:
+            conn.close()
+
+    return {"pending": int(len(pending)), "labeled": labeled}
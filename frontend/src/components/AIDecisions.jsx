@@ -1,31 +1,12 @@
-import { useState, useEffect } from 'react';
+import { useState } from 'react';
 import { Brain, ChevronDown, ChevronUp } from 'lucide-react';
-import { getReflections } from '../services/api';
+import { useDashboardSection } from '../context/DashboardContext';
 
 const AIDecisions = () => {
-  const [reflections, setReflections] = useState([]);
-  const [loading, setLoading] = useState(true);
+  const { data, loading } = useDashboardSection('reflections');
+  const reflections = data || [];
   const [expandedIds, setExpandedIds] = useState(new Set());
 
-  useEffect(() => {
-    const fetchReflections = async () => {
-      try {
-        const data = await getReflections(10);
-        setReflections(data);
-        setLoading(false);
-      } catch (error) {
-        console.error('Failed to fetch reflections:', error);
-        setLoading(false);
-      }
-    };
-
-    fetchReflections();
-
-    // 30초마다 업데이트
-    const interval = setInterval(fetchReflections, 30000);
-    return () => clearInterval(interval);
-  }, []);
-
   const toggleExpand = (id) => {
     setExpandedIds((prev) => {
       const newSet = new Set(prev);
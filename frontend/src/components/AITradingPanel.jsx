@@ -20,12 +20,17 @@ const AITradingPanel = () => {
       const response = await requestAIAnalysis(includeBalance);
       if (response.success) {
         setAiAnalysis(response.data);
+      } else {
+        setAiAnalysis({
+          error: true,
+          message: response.data?.reason || 'AI 분석에 실패했습니다.'
+        });
       }
     } catch (error) {
       console.error('AI 분석 실패:', error);
       setAiAnalysis({
         error: true,
-        message: error.response?.data?.detail || 'AI 분석 요청에 실패했습니다.'
+        message: error.response?.data?.detail || error.message || 'AI 분석 요청에 실패했습니다.'
       });
     } finally {
       setLoading(false);
@@ -79,7 +84,7 @@ const AITradingPanel = () => {
       console.error('AI 자동 거래 실패:', error);
       setTradeResult({
         success: false,
-        message: error.response?.data?.detail || 'AI 자동 거래 실행에 실패했습니다.'
+        message: error.response?.data?.detail || error.message || 'AI 자동 거래 실행에 실패했습니다.'
       });
     } finally {
       setTradeLoading(false);
@@ -1,46 +1,27 @@
 import { useState, useEffect } from 'react';
 import { TrendingUp, TrendingDown, Activity } from 'lucide-react';
-import { getMarketData, getFearGreedIndex, connectMarketWebSocket } from '../services/api';
+import { connectMarketWebSocket } from '../services/api';
+import { useDashboardSection } from '../context/DashboardContext';
 
 const MarketInfo = () => {
-  const [marketData, setMarketData] = useState(null);
-  const [fearGreed, setFearGreed] = useState(null);
+  const { data: marketData, loading } = useDashboardSection('market');
+  const { data: fearGreed } = useDashboardSection('fear_greed');
   const [realtimePrice, setRealtimePrice] = useState(null);
-  const [loading, setLoading] = useState(true);
 
   useEffect(() => {
-    // 초기 데이터 로드
-    const fetchData = async () => {
-      try {
-        const [market, fg] = await Promise.all([
-          getMarketData(),
-          getFearGreedIndex(),
-        ]);
-        setMarketData(market);
-        setFearGreed(fg);
-        setRealtimePrice(market.current_price);
-        setLoading(false);
-      } catch (error) {
-        console.error('Failed to fetch market data:', error);
-        setLoading(false);
-      }
-    };
-
-    fetchData();
+    if (marketData?.current_price) setRealtimePrice(marketData.current_price);
+  }, [marketData]);
 
-    // WebSocket 연결
+  useEffect(() => {
+    // 1초 단위 가격은 /ws/market 스트림 사용
     const ws = connectMarketWebSocket((data) => {
       if (data.type === 'market_update') {
         setRealtimePrice(data.data.price);
       }
     });
 
-    // 정기적으로 데이터 새로고침 (공포-탐욕 지수는 자주 변하지 않으므로)
-    const interval = setInterval(fetchData, 60000); // 1분마다
-
     return () => {
       ws.close();
-      clearInterval(interval);
     };
   }, []);
 
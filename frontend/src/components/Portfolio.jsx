@@ -1,31 +1,49 @@
 import { useState, useEffect } from 'react';
+import { AreaChart, Area, XAxis, YAxis, Tooltip, ResponsiveContainer } from 'recharts';
 import { Wallet, TrendingUp, Bitcoin, DollarSign, RefreshCw } from 'lucide-react';
-import { getLivePortfolio } from '../services/api';
+import { getPortfolioHistory } from '../services/api';
+import { useDashboardSection } from '../context/DashboardContext';
+
+const DAY_MS = 24 * 60 * 60 * 1000;
+const HISTORY_RANGES = [
+  { key: '1d', label: '1일', ms: DAY_MS },
+  { key: '1w', label: '1주', ms: 7 * DAY_MS },
+  { key: '1m', label: '1개월', ms: 30 * DAY_MS },
+  { key: '1y', label: '1년', ms: 365 * DAY_MS },
+  { key: 'all', label: '전체', ms: 10 * 365 * DAY_MS },
+];
 
 const Portfolio = () => {
-  const [portfolio, setPortfolio] = useState(null);
-  const [loading, setLoading] = useState(true);
-  const [isLive, setIsLive] = useState(false);
+  // 실시간 잔고 (API 키가 없으면 서버가 DB 기반 성과로 대체)
+  const { data: portfolio, loading } = useDashboardSection('portfolio');
+  const isLive = portfolio?.is_live || false;
+  const [historyRange, setHistoryRange] = useState('1m');
+  const [history, setHistory] = useState([]);
 
   useEffect(() => {
-    const fetchPortfolio = async () => {
+    const range = HISTORY_RANGES.find((r) => r.key === historyRange);
+
+    const fetchHistory = async () => {
       try {
-        const data = await getLivePortfolio();
-        setPortfolio(data);
-        setIsLive(data.is_live || false);
-        setLoading(false);
+        const end = Date.now();
+        const data = await getPortfolioHistory({ start: end - range.ms, end });
+        setHistory(data.data.map((point) => ({
+          time: new Date(point.ts).toLocaleString('ko-KR', range.ms > 2 * DAY_MS
+            ? { month: 'short', day: 'numeric' }
+            : { hour: '2-digit', minute: '2-digit' }),
+          equity: point.close,
+        })));
       } catch (error) {
-        console.error('Failed to fetch portfolio:', error);
-        setLoading(false);
+        console.error('Failed to fetch portfolio history:', error);
       }
     };
 
-    fetchPortfolio();
+    fetchHistory();
 
-    // 30초마다 업데이트
-    const interval = setInterval(fetchPortfolio, 30000);
+    // 1분마다 업데이트 (기록 주기와 동일)
+    const interval = setInterval(fetchHistory, 60000);
     return () => clearInterval(interval);
-  }, []);
+  }, [historyRange]);
 
   const formatNumber = (num) => {
     if (!num) return '0';
@@ -97,6 +115,49 @@ const Portfolio = () => {
         </div>
       </div>
 
+      {/* 평가액 추이 */}
+      <div className="mb-6">
+        <div className="flex items-center justify-between mb-2">
+          <p className="text-sm font-semibold text-gray-600 dark:text-gray-400">평가액 추이</p>
+          <div className="flex gap-1">
+            {HISTORY_RANGES.map((range) => (
+              <button
+                key={range.key}
+                onClick={() => setHistoryRange(range.key)}
+                className={`px-2 py-1 rounded text-xs font-medium ${
+                  historyRange === range.key
+                    ? 'bg-blue-500 text-white'
+                    : 'bg-gray-100 dark:bg-gray-800 text-gray-600 dark:text-gray-400'
+                }`}
+              >
+                {range.label}
+              </button>
+            ))}
+          </div>
+        </div>
+        {history.length > 1 ? (
+          <ResponsiveContainer width="100%" height={160}>
+            <AreaChart data={history} margin={{ top: 5, right: 0, left: 0, bottom: 0 }}>
+              <defs>
+                <linearGradient id="colorEquity" x1="0" y1="0" x2="0" y2="1">
+                  <stop offset="5%" stopColor="#6366f1" stopOpacity={0.6} />
+                  <stop offset="95%" stopColor="#6366f1" stopOpacity={0} />
+                </linearGradient>
+              </defs>
+              <XAxis dataKey="time" tick={{ fill: '#6b7280', fontSize: 10 }} minTickGap={30} />
+              <YAxis hide domain={['auto', 'auto']} />
+              <Tooltip
+                formatter={(value) => [formatKRW(value), '평가액']}
+                contentStyle={{ backgroundColor: '#1f2937', border: '1px solid #374151', borderRadius: '8px', color: '#fff' }}
+              />
+              <Area type="monotone" dataKey="equity" stroke="#6366f1" fill="url(#colorEquity)" strokeWidth={2} />
+            </AreaChart>
+          </ResponsiveContainer>
+        ) : (
+          <p className="text-sm text-gray-500 py-6 text-center">기록된 평가액이 아직 없습니다</p>
+        )}
+      </div>
+
       {/* 자산 상세 */}
       <div className="grid grid-cols-1 md:grid-cols-2 gap-4">
         {/* BTC 보유량 */}
@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import {
   LineChart,
   Line,
@@ -18,16 +18,41 @@ const PriceChart = () => {
   const [chartData, setChartData] = useState([]);
   const [interval, setInterval] = useState('day');
   const [loading, setLoading] = useState(true);
+  // interval별로 받은 캔들 보관 (다시 선택하면 새 캔들만 요청)
+  const candleCache = useRef({});
 
   useEffect(() => {
     const fetchChartData = async () => {
-      setLoading(true);
+      const count = interval === 'day' ? 30 : interval === 'minute60' ? 24 : 60;
+      const cached = candleCache.current[interval];
+      if (!cached) setLoading(true);
+
       try {
-        const count = interval === 'day' ? 30 : interval === 'minute60' ? 24 : 60;
-        const response = await getOHLCVData(interval, count);
+        // 마지막 캔들부터 요청 (진행 중이던 마지막 캔들 갱신 포함)
+        const lastTs = cached?.length ? cached[cached.length - 1].ts : undefined;
+        let response = await getOHLCVData(interval, count, { since: lastTs, format: 'columnar' });
+        // 마지막 캔들 이후가 한 페이지를 넘으면 (next_cursor) 보관한 캔들은 버리고 최근 캔들을 다시 받음
+        const stale = lastTs !== undefined && response.next_cursor;
+        if (stale) {
+          response = await getOHLCVData(interval, count, { format: 'columnar' });
+        }
+        const { columns } = response;
+
+        const merged = new Map((stale ? [] : cached || []).map((candle) => [candle.ts, candle]));
+        columns.ts.forEach((ts, i) => {
+          merged.set(ts, {
+            ts,
+            close: columns.close[i],
+            high: columns.high[i],
+            low: columns.low[i],
+            volume: columns.volume[i],
+          });
+        });
+        const candles = [...merged.values()].sort((a, b) => a.ts - b.ts).slice(-count);
+        candleCache.current[interval] = candles;
 
-        const formattedData = response.data.map((item) => ({
-          time: new Date(item.index).toLocaleString('ko-KR', {
+        const formattedData = candles.map((item) => ({
+          time: new Date(item.ts).toLocaleString('ko-KR', {
             month: 'short',
             day: 'numeric',
             hour: interval !== 'day' ? 'numeric' : undefined,
@@ -1,30 +1,10 @@
-import { useState, useEffect } from 'react';
 import { PieChart, Pie, Cell, ResponsiveContainer, Legend, Tooltip } from 'recharts';
 import { BarChart2 } from 'lucide-react';
-import { getStatistics } from '../services/api';
+import { useDashboardSection } from '../context/DashboardContext';
 
 const Statistics = () => {
-  const [stats, setStats] = useState(null);
-  const [loading, setLoading] = useState(true);
-
-  useEffect(() => {
-    const fetchStats = async () => {
-      try {
-        const data = await getStatistics();
-        setStats(data);
-        setLoading(false);
-      } catch (error) {
-        console.error('Failed to fetch statistics:', error);
-        setLoading(false);
-      }
-    };
-
-    fetchStats();
-
-    // 30초마다 업데이트
-    const interval = setInterval(fetchStats, 30000);
-    return () => clearInterval(interval);
-  }, []);
+  const { data: stats, loading } = useDashboardSection('statistics');
+  const { data: analytics } = useDashboardSection('analytics');
 
   if (loading) {
     return (
@@ -148,8 +128,59 @@ const Statistics = () => {
           )}
         </div>
       </div>
+
+      {/* 성과 분석 */}
+      {analytics?.risk && analytics.trade_count > 0 && (
+        <div className="mt-6 pt-6 border-t border-gray-200 dark:border-gray-700">
+          <h3 className="text-lg font-semibold mb-4 text-gray-700 dark:text-gray-300">
+            성과 분석
+          </h3>
+          <div className="grid grid-cols-2 md:grid-cols-4 gap-3 mb-4">
+            {[
+              ['최대 낙폭', formatPct(analytics.risk.max_drawdown)],
+              ['샤프 비율', formatRatio(analytics.risk.sharpe)],
+              ['소르티노 비율', formatRatio(analytics.risk.sortino)],
+              ['BTC 노출', formatPct(analytics.risk.exposure)],
+            ].map(([label, value]) => (
+              <div key={label} className="p-3 bg-gray-50 dark:bg-gray-800/50 rounded-lg">
+                <p className="text-xs text-gray-500 dark:text-gray-400">{label}</p>
+                <p className="text-lg font-bold text-gray-900 dark:text-white">{value}</p>
+              </div>
+            ))}
+          </div>
+          <div className="overflow-x-auto">
+            <table className="w-full text-sm">
+              <thead>
+                <tr className="text-gray-500 dark:text-gray-400">
+                  <th className="text-left py-1">적중률</th>
+                  {analytics.horizons.map((h) => (
+                    <th key={h} className="text-right py-1">{h}</th>
+                  ))}
+                </tr>
+              </thead>
+              <tbody>
+                {Object.entries(analytics.by_decision).map(([decision, row]) => (
+                  <tr key={decision} className="border-t border-gray-100 dark:border-gray-800">
+                    <td className="py-1 font-semibold uppercase" style={{ color: COLORS[decision.toUpperCase()] }}>
+                      {decision}
+                    </td>
+                    {analytics.horizons.map((h) => (
+                      <td key={h} className="text-right py-1 text-gray-900 dark:text-white">
+                        {formatPct(row[h]?.hit_rate, 0)}
+                      </td>
+                    ))}
+                  </tr>
+                ))}
+              </tbody>
+            </table>
+          </div>
+        </div>
+      )}
     </div>
   );
 };
 
+const formatPct = (value, digits = 1) => (value == null ? '-' : `${value.toFixed(digits)}%`);
+const formatRatio = (value) => (value == null ? '-' : value.toFixed(2));
+
 export default Statistics;
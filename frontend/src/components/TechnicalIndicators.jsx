@@ -1,29 +1,8 @@
-import { useState, useEffect } from 'react';
 import { BarChart3 } from 'lucide-react';
-import { getTechnicalIndicators } from '../services/api';
+import { useDashboardSection } from '../context/DashboardContext';
 
 const TechnicalIndicators = () => {
-  const [indicators, setIndicators] = useState(null);
-  const [loading, setLoading] = useState(true);
-
-  useEffect(() => {
-    const fetchIndicators = async () => {
-      try {
-        const data = await getTechnicalIndicators();
-        setIndicators(data);
-        setLoading(false);
-      } catch (error) {
-        console.error('Failed to fetch indicators:', error);
-        setLoading(false);
-      }
-    };
-
-    fetchIndicators();
-
-    // 1분마다 업데이트
-    const interval = setInterval(fetchIndicators, 60000);
-    return () => clearInterval(interval);
-  }, []);
+  const { data: indicators, loading } = useDashboardSection('indicators');
 
   const formatNumber = (num) => {
     if (!num) return 'N/A';
@@ -1,36 +1,10 @@
-import { useState, useEffect } from 'react';
 import { History, TrendingUp, TrendingDown, Minus } from 'lucide-react';
-import { getTrades, connectTradesWebSocket } from '../services/api';
+import { useDashboardSection } from '../context/DashboardContext';
 
 const TradeHistory = () => {
-  const [trades, setTrades] = useState([]);
-  const [loading, setLoading] = useState(true);
-
-  useEffect(() => {
-    const fetchTrades = async () => {
-      try {
-        const data = await getTrades(20);
-        setTrades(data);
-        setLoading(false);
-      } catch (error) {
-        console.error('Failed to fetch trades:', error);
-        setLoading(false);
-      }
-    };
-
-    fetchTrades();
-
-    // WebSocket 연결 (새로운 거래 실시간 수신)
-    const ws = connectTradesWebSocket((data) => {
-      if (data.type === 'new_trade') {
-        setTrades((prev) => [data.data, ...prev.slice(0, 19)]);
-      }
-    });
-
-    return () => {
-      ws.close();
-    };
-  }, []);
+  // 최근 20건 (새 거래는 대시보드 스트림의 trades 섹션 변경으로 수신)
+  const { data, loading } = useDashboardSection('trades');
+  const trades = data || [];
 
   const getDecisionBadge = (decision) => {
     const styles = {
@@ -107,7 +81,7 @@ const TradeHistory = () => {
               </div>
 
               <p className="text-sm text-gray-700 dark:text-gray-300 mb-3 line-clamp-2">
-                {trade.reason}
+                {trade.reason_preview ?? trade.reason}
               </p>
 
               <div className="grid grid-cols-2 md:grid-cols-4 gap-3 text-xs">
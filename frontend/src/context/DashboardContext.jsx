@@ -0,0 +1,80 @@
+import { createContext, useContext, useEffect, useState } from 'react';
+import { getDashboard, connectDashboardWebSocket } from '../services/api';
+
+// 위젯들이 각자 API를 폴링하지 않고 /ws/dashboard 스트림 하나를 공유
+const DashboardContext = createContext(null);
+
+const POLL_INTERVAL = 30000;   // WebSocket이 끊겼을 때 /api/dashboard 폴링 주기
+const RECONNECT_DELAY = 10000;
+
+export const DashboardProvider = ({ children }) => {
+  const [state, setState] = useState({ sections: {}, errors: {}, loaded: false });
+
+  useEffect(() => {
+    let ws = null;
+    let pollTimer = null;
+    let reconnectTimer = null;
+    let closed = false;
+
+    const applySnapshot = (snapshot) => {
+      setState({ sections: snapshot.sections, errors: snapshot.errors || {}, loaded: true });
+    };
+
+    const poll = async () => {
+      try {
+        applySnapshot(await getDashboard());
+      } catch (error) {
+        console.error('Failed to fetch dashboard:', error);
+        setState((prev) => ({ ...prev, loaded: true }));
+      }
+    };
+
+    const connect = () => {
+      ws = connectDashboardWebSocket(
+        (message) => {
+          if (message.type === 'snapshot') {
+            applySnapshot(message);
+          } else if (message.type === 'patch') {
+            // 바뀐 섹션만 교체, 오류는 패치에 담긴 현재 오류 전체로 교체
+            setState((prev) => ({
+              ...prev,
+              sections: { ...prev.sections, ...message.sections },
+              errors: message.errors ?? prev.errors,
+            }));
+          }
+        },
+        null,
+        () => {
+          if (closed) return;
+          // 끊긴 동안은 폴링하고 잠시 후 다시 연결
+          if (!pollTimer) {
+            poll();
+            pollTimer = setInterval(poll, POLL_INTERVAL);
+          }
+          reconnectTimer = setTimeout(connect, RECONNECT_DELAY);
+        }
+      );
+      ws.addEventListener('open', () => {
+        clearInterval(pollTimer);
+        pollTimer = null;
+      });
+    };
+
+    connect();
+
+    return () => {
+      closed = true;
+      clearInterval(pollTimer);
+      clearTimeout(reconnectTimer);
+      if (ws) ws.close();
+    };
+  }, []);
+
+  return <DashboardContext.Provider value={state}>{children}</DashboardContext.Provider>;
+};
+
+// 섹션 하나의 값 (statistics, trades, reflections, market, portfolio, indicators, fear_greed, analytics)
+export const useDashboardSection = (name) => {
+  const { sections, errors, loaded } = useContext(DashboardContext);
+  return { data: sections[name] ?? null, error: errors[name] ?? null, loading: !loaded };
+};
@@ -10,8 +10,21 @@ const api = axios.create({
 });
 
 // API 함수들
-export const getTrades = async (limit = 100) => {
-  const response = await api.get(`/api/trades?limit=${limit}`);
+export const getTrades = async (limit = 100, { cursor, fields } = {}) => {
+  const response = await api.get('/api/trades', {
+    params: { limit, cursor, fields: fields?.join(',') }
+  });
+  return response.data;
+};
+
+// 거래 내역 목록용 필드 (긴 reason/reflection 텍스트 제외)
+export const TRADE_LIST_FIELDS = [
+  'id', 'timestamp', 'decision', 'reason_preview', 'percentage',
+  'btc_balance', 'krw_balance', 'btc_avg_buy_price', 'btc_krw_price',
+];
+
+export const getTradeReflection = async (id) => {
+  const response = await api.get(`/api/trades/${id}/reflection`);
   return response.data;
 };
 
@@ -25,11 +38,25 @@ export const getStatistics = async () => {
   return response.data;
 };
 
+export const getAnalytics = async () => {
+  const response = await api.get('/api/analytics');
+  return response.data;
+};
+
 export const getPortfolio = async () => {
   const response = await api.get('/api/portfolio');
   return response.data;
 };
 
+// 평가액 시계열 (start/end: epoch 밀리초, resolution: 1m | 1h | 1d | auto)
+export const getPortfolioHistory = async ({ start, end, resolution = 'auto' } = {}) => {
+  const params = { resolution };
+  if (start != null) params.start = start;
+  if (end != null) params.end = end;
+  const response = await api.get('/api/portfolio/history', { params });
+  return response.data;
+};
+
 export const getLivePortfolio = async () => {
   const response = await api.get('/api/portfolio/live');
   return response.data;
@@ -55,8 +82,18 @@ export const getReflections = async (limit = 5) => {
   return response.data;
 };
 
-export const getOHLCVData = async (interval = 'day', count = 30) => {
-  const response = await api.get(`/api/chart/ohlcv?interval=${interval}&count=${count}`);
+export const getOHLCVData = async (interval = 'day', count = 30, { since, until, format } = {}) => {
+  const response = await api.get('/api/chart/ohlcv', {
+    params: { interval, count, since, until, format }
+  });
+  return response.data;
+};
+
+// 대시보드 위젯 데이터 한 번에 조회 (sections: 섹션 이름 배열, 생략 시 전체)
+export const getDashboard = async (sections) => {
+  const response = await api.get('/api/dashboard', {
+    params: { sections: sections?.join(',') }
+  });
   return response.data;
 };
 
@@ -109,12 +146,58 @@ export const connectTradesWebSocket = (onMessage, onError) => {
   return ws;
 };
 
+// 대시보드 스트림: 처음에 {type: 'snapshot'}, 이후 바뀐 섹션만 {type: 'patch'}
+export const connectDashboardWebSocket = (onMessage, onError, onClose) => {
+  const ws = new WebSocket(`${WS_BASE_URL}/ws/dashboard`);
+
+  ws.onopen = () => {
+    console.log('Dashboard WebSocket connected');
+  };
+
+  ws.onmessage = (event) => {
+    const data = JSON.parse(event.data);
+    onMessage(data);
+  };
+
+  ws.onerror = (error) => {
+    console.error('WebSocket error:', error);
+    if (onError) onError(error);
+  };
+
+  ws.onclose = () => {
+    console.log('Dashboard WebSocket disconnected');
+    if (onClose) onClose();
+  };
+
+  return ws;
+};
+
+// 백그라운드 작업 API
+export const getJob = async (jobId) => {
+  const response = await api.get(`/api/jobs/${jobId}`);
+  return response.data;
+};
+
+// 작업이 끝날 때까지 상태를 폴링하고 결과를 반환
+export const waitForJob = async (jobId, { interval = 1500, timeout = 180000 } = {}) => {
+  const deadline = Date.now() + timeout;
+
+  while (Date.now() < deadline) {
+    const job = await getJob(jobId);
+    if (job.status === 'done') return job.result;
+    if (job.status === 'failed') throw new Error(job.error || '작업이 실패했습니다.');
+    await new Promise((resolve) => setTimeout(resolve, interval));
+  }
+
+  throw new Error('작업 대기 시간이 초과되었습니다.');
+};
+
 // AI 분석 및 거래 API
 export const requestAIAnalysis = async (includeBalance = false) => {
   const response = await api.post('/api/ai-analysis', null, {
     params: { include_balance: includeBalance }
   });
-  return response.data;
+  return waitForJob(response.data.job_id);
 };
 
 export const executeManualTrade = async (decision, percentage) => {
@@ -126,7 +209,7 @@ export const executeManualTrade = async (decision, percentage) => {
 
 export const executeAITrade = async () => {
   const response = await api.post('/api/ai-trade');
-  return response.data;
+  return waitForJob(response.data.job_id);
 };
 
 export default api;
@@ -0,0 +1,160 @@
+"""
+asyncio 기반 작업 스케줄러
+autotrade.py의 매매 사이클을 정해진 시각에 실행합니다.
+
+- 정확한 시작 시각: 1분 폴링 대신 다음 실행 시각까지 직접 대기
+- 중복 실행 정책: 이전 실행이 끝나지 않았을 때 skip(건너뜀) 또는 queue(끝난 뒤 실행)
+- 작업별 타임아웃: 제한 시간을 넘기면 실패로 기록 (스레드는 강제 종료할 수 없으므로 끝날 때까지 다음 실행을 막음)
+- 예외 격리: 작업에서 예외가 나도 스케줄러는 계속 동작
+- 안전한 종료: SIGINT/SIGTERM 시 새 실행을 멈추고 실행 중인 작업이 끝나길 기다림
+"""
+import time
+import signal
+import asyncio
+import traceback
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+
+OVERLAP_SKIP = "skip"
+OVERLAP_QUEUE = "queue"
+
+class ScheduledJob:
+    """매일 정해진 시각에 실행되는 작업"""
+
+    def __init__(self, func: Callable, times: List[str], name: Optional[str] = None,
+                 overlap: str = OVERLAP_SKIP, timeout: Optional[float] = None):
+        if overlap not in (OVERLAP_SKIP, OVERLAP_QUEUE):
+            raise ValueError(f"overlap은 '{OVERLAP_SKIP}' 또는 '{OVERLAP_QUEUE}'여야 합니다.")
+
+        self.func = func
+        self.times = sorted(datetime.strptime(t, "%H:%M").time() for t in times)
+        self.name = name or func.__name__
+        self.overlap = overlap
+        self.timeout = timeout
+
+        self.running: Optional[asyncio.Future] = None
+        self.queued = 0
+        self.last_started: Optional[datetime] = None
+        self.last_duration: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def next_run(self, now: datetime) -> datetime:
+        """now 이후 가장 가까운 실행 시각"""
+        for t in self.times:
+            candidate = datetime.combine(now.date(), t)
+            if candidate > now:
+                return candidate
+        return datetime.combine(now.date() + timedelta(days=1), self.times[0])
+
+class AsyncScheduler:
+    """ScheduledJob들을 이벤트 루프에서 관리하는 스케줄러"""
+
+    def __init__(self, shutdown_timeout: float = 600):
+        self.jobs: List[ScheduledJob] = []
+        self.shutdown_timeout = shutdown_timeout
+        self._stop = None
+
+    def add_daily_job(self, func: Callable, times: List[str], **kwargs) -> ScheduledJob:
+        job = ScheduledJob(func, times, **kwargs)
+        self.jobs.append(job)
+        return job
+
+    def stop(self):
+        """새 실행을 멈추고 종료 절차 시작"""
+        if self._stop is not None:
+            self._stop.set()
+
+    async def run(self):
+        self._stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows 등 시그널 핸들러를 지원하지 않는 환경
+
+        for job in self.jobs:
+            print(f"[scheduler] {job.name}: {', '.join(t.strftime('%H:%M') for t in job.times)} "
+                  f"(overlap={job.overlap}, timeout={job.timeout})")
+
+        tasks = [asyncio.create_task(self._job_loop(job)) for job in self.jobs]
+        await self._stop.wait()
+
+        print("[scheduler] 종료 요청 - 실행 중인 작업이 끝나길 기다립니다.")
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        running = [job.running for job in self.jobs if job.running is not None]
+        if running:
+            done, pending = await asyncio.wait(running, timeout=self.shutdown_timeout)
+            if pending:
+                print(f"[scheduler] {len(pending)}개 작업이 {self.shutdown_timeout}초 안에 끝나지 않았습니다.")
+        print("[scheduler] 종료")
+
+    async def _sleep_until(self, target: datetime) -> bool:
+        """target 시각까지 대기 (종료 요청 시 False)"""
+        while True:
+            remaining = (target - datetime.now()).total_seconds()
+            if remaining <= 0:
+                return True
+            # 시스템 시계 변경이나 절전 복귀에 대비해 최대 1시간 단위로 다시 계산
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=min(remaining, 3600))
+                return False
+            except asyncio.TimeoutError:
+                pass
+
+    async def _job_loop(self, job: ScheduledJob):
+        while True:
+            target = job.next_run(datetime.now())
+            if not await self._sleep_until(target):
+                return
+            self.trigger(job)
+
+    def trigger(self, job: ScheduledJob):
+        """작업 실행 요청 (중복 실행 정책 적용)"""
+        if job.running is not None:
+            if job.overlap == OVERLAP_QUEUE:
+                job.queued += 1
+                print(f"[scheduler] {job.name} 실행 중 - 대기열에 추가 ({job.queued}건 대기)")
+            else:
+                print(f"[scheduler] {job.name} 실행 중 - 이번 실행은 건너뜁니다.")
+            return
+        job.running = asyncio.ensure_future(self._execute(job))
+
+    async def _execute(self, job: ScheduledJob):
+        try:
+            while True:
+                await self._run_once(job)
+                if job.queued == 0 or self._stop.is_set():
+                    break
+                job.queued -= 1
+        finally:
+            job.running = None
+
+    async def _run_once(self, job: ScheduledJob):
+        job.last_started = datetime.now()
+        started = time.monotonic()
+        print(f"[scheduler] {job.name} 시작 ({job.last_started:%Y-%m-%d %H:%M:%S})")
+
+        # 스레드에서 실행해 이벤트 루프(다른 작업의 대기, 시그널 처리)가 막히지 않도록 함
+        thread_future = asyncio.ensure_future(asyncio.to_thread(job.func))
+        try:
+            await asyncio.wait_for(asyncio.shield(thread_future), timeout=job.timeout)
+            job.last_error = None
+        except asyncio.TimeoutError:
+            job.last_error = f"{job.timeout}초 타임아웃"
+            print(f"[scheduler] {job.name} 타임아웃 ({job.timeout}초) - 작업이 끝날 때까지 다음 실행을 막습니다.")
+            # 스레드는 강제로 멈출 수 없으므로 실제로 끝날 때까지 기다렸다가 running 해제
+            try:
+                await thread_future
+            except Exception:
+                traceback.print_exc()
+        except Exception as e:
+            job.last_error = str(e)
+            print(f"[scheduler] {job.name} 실패: {e}")
+            traceback.print_exc()
+        finally:
+            job.last_duration = time.monotonic() - started
+            print(f"[scheduler] {job.name} 종료 ({job.last_duration:.1f}초)")
@@ -1,11 +1,15 @@
+import os
 import sqlite3
 import pandas as pd
 import streamlit as st
 import plotly.express as px
 
+# autotrade.py, backend와 같은 DB 파일 (backend/database.py의 DB_PATH와 같은 규칙)
+DB_PATH = os.getenv("AI_TRADING_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "ai_trading.db"))
+
 # DB 연결 함수
 def get_trades_data():
-    conn = sqlite3.connect('ai_trading.db')  # SQLite 데이터베이스에 연결
+    conn = sqlite3.connect(DB_PATH)          # SQLite 데이터베이스에 연결
     query = "SELECT * FROM trades"           # trades 테이블의 모든 데이터를 조회하는 쿼리
     df = pd.read_sql(query, conn)            # SQL 쿼리를 사용해 데이터프레임으로 변환
     conn.close()                             # DB 연결 종료
@@ -0,0 +1,60 @@
+"""
+판단 서비스 소켓 회귀 테스트
+
+소켓 모드의 decide 요청에는 base64 차트 이미지가 들어가 asyncio 기본 줄 길이 한도(64 KiB)보다 큽니다.
+실제 크기의 이미지를 DecisionClient → 서버로 보내 판단 결과가 그대로 돌아오는지 확인합니다.
+
+실행: python -m pytest -q tests
+"""
+import os
+import sys
+import base64
+import asyncio
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+from decision_service import DecisionClient, start_server  # noqa: E402
+
+CHART_IMAGE_BYTES = 300 * 1024  # 크롭/양자화 후에도 수백 KB인 차트 PNG
+
+class FakeService:
+    """입력 크기만 돌려주는 판단 서비스 (OpenAI 호출 없음)"""
+
+    def decide(self, balances=None, chart_image=None, chart_detail=None, chart_unchanged_since=None):
+        return {"decision": "hold", "reason": "test", "percentage": 0,
+                "chart_image_length": len(chart_image or ""), "chart_detail": chart_detail}
+
+    def status(self):
+        return {"models": []}
+
+def serve(socket_path: str, ready: threading.Event, stop: list):
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(start_server(FakeService(), socket_path))
+    stop.append((loop, server))
+    ready.set()
+    loop.run_forever()
+    server.close()
+    loop.run_until_complete(server.wait_closed())
+    loop.close()
+
+def test_decide_with_large_chart_image():
+    socket_path = os.path.join(tempfile.mkdtemp(), "decision.sock")
+    ready, stop = threading.Event(), []
+    thread = threading.Thread(target=serve, args=(socket_path, ready, stop), daemon=True)
+    thread.start()
+    assert ready.wait(5)
+
+    chart_image = base64.b64encode(os.urandom(CHART_IMAGE_BYTES)).decode()
+    try:
+        result = DecisionClient(socket_path, timeout=10).decide(
+            balances=[{"currency": "KRW", "balance": "1000000"}], chart_image=chart_image, chart_detail="high")
+    finally:
+        loop, _ = stop[0]
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(5)
+
+    assert result["decision"] == "hold"
+    assert result["chart_image_length"] == len(chart_image)
+    assert result["chart_detail"] == "high"
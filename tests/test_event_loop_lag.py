@@ -0,0 +1,85 @@
+"""
+이벤트 루프 지연 회귀 테스트
+
+AI 분석(수 초씩 걸리는 블로킹 OpenAI 호출)이 진행되는 동안에도 이벤트 루프가 막히지 않아야
+시세 WebSocket과 대시보드가 계속 응답합니다 (async_utils.run_ai / 작업 큐 워커).
+get_ai_trading_decision을 1초 동안 블로킹하는 함수로 바꾸고, 요청이 끝날 때까지
+이벤트 루프 지연 표본이 기준 이하인지 확인합니다.
+
+실행: python -m pytest -q tests
+"""
+import os
+import sys
+import time
+import asyncio
+import tempfile
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+import database  # noqa: E402
+
+# 실제 ai_trading.db를 건드리지 않도록 임시 DB 사용 (main import 전에 설정)
+database.DB_PATH = os.path.join(tempfile.mkdtemp(), "test_event_loop_lag.db")
+
+import main  # noqa: E402
+from async_utils import run_blocking  # noqa: E402
+from job_queue import initialize_job_table  # noqa: E402
+
+AI_CALL_SECONDS = 1.0
+SAMPLE_INTERVAL = 0.01
+MAX_LAG = 0.1  # 블로킹 호출이 루프에서 실행되면 약 1초
+
+def slow_decision(include_balance: bool = False):
+    """OpenAI 호출처럼 1초 동안 스레드를 블로킹하는 판단"""
+    time.sleep(AI_CALL_SECONDS)
+    return {"decision": "hold", "reason": "test", "percentage": 0, "current_price": 1.0,
+            "timestamp": "2025-01-01T00:00:00"}
+
+async def sample_loop_lag(samples: list, stop: asyncio.Event):
+    """SAMPLE_INTERVAL마다 깨어나 예정보다 늦게 깨어난 시간(초)을 기록"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        started = loop.time()
+        await asyncio.sleep(SAMPLE_INTERVAL)
+        samples.append(loop.time() - started - SAMPLE_INTERVAL)
+
+async def run_analysis_while_sampling():
+    await run_blocking(initialize_job_table)
+    await main.job_worker.start()
+
+    samples, stop = [], asyncio.Event()
+    sampler = asyncio.create_task(sample_loop_lag(samples, stop))
+    started = time.monotonic()
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post("/api/ai-analysis")
+            assert response.status_code == 202
+            job_id = response.json()["job_id"]
+
+            job = None
+            while time.monotonic() - started < AI_CALL_SECONDS + 10:
+                job = (await client.get(f"/api/jobs/{job_id}")).json()
+                if job["status"] in ("done", "failed"):
+                    break
+                await asyncio.sleep(0.05)
+    finally:
+        stop.set()
+        await sampler
+        await main.job_worker.stop()
+
+    return job, samples, time.monotonic() - started
+
+def test_ai_analysis_does_not_block_event_loop(monkeypatch):
+    monkeypatch.setattr(main, "get_ai_trading_decision", slow_decision)
+
+    job, samples, elapsed = asyncio.run(run_analysis_while_sampling())
+
+    assert job["status"] == "done", job
+    assert job["result"]["success"] is True
+    assert max(samples) < MAX_LAG, f"event loop lag {max(samples) * 1000:.0f} ms"
+    # 표본이 실제로 AI 호출이 진행되는 동안 수집되었는지
+    assert elapsed >= AI_CALL_SECONDS
+    assert len(samples) >= AI_CALL_SECONDS / SAMPLE_INTERVAL / 2
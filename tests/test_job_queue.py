@@ -0,0 +1,49 @@
+"""
+작업 큐 소유권 회귀 테스트
+
+하트비트가 끊겨 실패 처리된 작업은 원래 워커가 뒤늦게 끝내도 결과를 덮어쓰지 않아야 합니다.
+
+실행: python -m pytest -q tests
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+import database  # noqa: E402
+from job_queue import (  # noqa: E402
+    JOB_DONE, JOB_FAILED, initialize_job_table, enqueue_job, claim_next_job, finish_job,
+    fail_stale_jobs, get_job
+)
+
+@pytest.fixture(autouse=True)
+def job_db(monkeypatch):
+    monkeypatch.setattr(database, "DB_PATH", os.path.join(tempfile.mkdtemp(), "test_jobs.db"))
+    initialize_job_table()
+
+def test_owner_finishes_job():
+    job, _ = enqueue_job("ai_analysis", {"include_balance": False})
+    claim_next_job(worker_id="worker-a")
+
+    assert finish_job(job["id"], result={"success": True}, worker_id="worker-a") is True
+    assert get_job(job["id"])["status"] == JOB_DONE
+
+def test_stale_worker_cannot_overwrite_failed_job():
+    job, _ = enqueue_job("ai_analysis", {"include_balance": False})
+    claim_next_job(worker_id="worker-a")
+    assert fail_stale_jobs(stale_seconds=-1) == 1  # worker-a의 하트비트가 끊긴 것으로 처리
+
+    assert finish_job(job["id"], result={"success": True}, worker_id="worker-a") is False
+    stored = get_job(job["id"])
+    assert stored["status"] == JOB_FAILED
+    assert stored["result"] is None
+
+def test_other_worker_cannot_finish_job():
+    job, _ = enqueue_job("ai_trade", {})
+    claim_next_job(worker_id="worker-a")
+
+    assert finish_job(job["id"], error="boom", worker_id="worker-b") is False
+    assert get_job(job["id"])["worker_id"] == "worker-a"
@@ -0,0 +1,66 @@
+"""
+일일 거래 대금 한도 회귀 테스트
+
+RiskEngine은 원장(fills)을 증분으로 읽으므로, 날짜가 정해지기 전(status만 호출된 상태)이나
+자정 전 날짜로 읽은 체결도 그날 거래 대금에 들어가야 합니다.
+
+실행: python -m pytest -q tests
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+import database  # noqa: E402
+from ledger import initialize_ledger_tables  # noqa: E402
+from orderbook_analytics import OrderbookSnapshot  # noqa: E402
+from risk import RiskEngine, RiskLimits, initialize_risk_tables  # noqa: E402
+
+PRICE = 100_000_000
+TURNOVER_LIMIT = 1_000_000
+
+@pytest.fixture
+def engine(monkeypatch):
+    monkeypatch.setattr(database, "DB_PATH", os.path.join(tempfile.mkdtemp(), "test_risk.db"))
+    initialize_ledger_tables()
+    initialize_risk_tables()
+    limits = RiskLimits(max_depth_share=0, daily_loss_pct=0, cooldown_seconds=0,
+                        max_daily_turnover_krw=TURNOVER_LIMIT)
+    return RiskEngine(limits)
+
+def add_fill(seq: int, filled_at: datetime, funds: float):
+    conn = database.get_db_connection()
+    conn.execute('''
+        INSERT INTO fills (order_uuid, seq, filled_at, side, price, volume, funds, fee)
+        VALUES (?, ?, ?, 'bid', ?, ?, ?, 0)
+    ''', (f"order-{seq}", seq, filled_at.strftime("%Y-%m-%d %H:%M:%S"), PRICE, funds / PRICE, funds))
+    conn.commit()
+    conn.close()
+
+def orderbook() -> OrderbookSnapshot:
+    return OrderbookSnapshot([PRICE + 1000], [10.0], [PRICE - 1000], [10.0])
+
+def test_status_before_check_keeps_fill_in_turnover(engine):
+    engine.status()
+    add_fill(1, datetime.now(), 800_000)
+    engine.status()  # 체결을 먼저 읽어도
+
+    result = engine.check("buy", 500_000, orderbook(), krw_balance=10_000_000, btc_balance=0)
+
+    assert engine.day_turnover == 800_000
+    assert result["amount"] == pytest.approx(TURNOVER_LIMIT - 800_000)
+
+def test_fill_read_before_midnight_counts_for_new_day(engine):
+    midnight = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    engine.check("buy", 10_000, orderbook(), 10_000_000, 0, now=midnight - timedelta(seconds=30))
+    add_fill(1, midnight + timedelta(seconds=5), 900_000)
+    engine.sync()  # 자정 직후 체결을 아직 어제 날짜인 상태에서 읽음
+
+    result = engine.check("buy", 500_000, orderbook(), 10_000_000, 0, now=midnight + timedelta(seconds=10))
+
+    assert engine.day_turnover == 900_000
+    assert result["amount"] == pytest.approx(TURNOVER_LIMIT - 900_000)
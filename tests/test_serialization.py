@@ -0,0 +1,57 @@
+"""
+직렬화 회귀 테스트
+
+orjson/msgpack 설치 여부와 관계없이 분석/대시보드 응답에 들어가는 값(NaN, numpy, datetime)이
+같은 결과로 직렬화되는지 확인합니다.
+
+실행: python -m pytest -q tests
+"""
+import os
+import sys
+import json
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+import serialization  # noqa: E402
+
+PAYLOAD = {
+    "sharpe": float("nan"),
+    "max_drawdown": np.float64("nan"),
+    "win_rate": np.float32(0.5),
+    "trades": np.int64(12),
+    "returns": np.array([0.1, np.nan, -0.2]),
+    "generated_at": datetime(2025, 1, 15, 9, 0, 0),
+    "rows": [{"ts": np.int64(1), "close": float("inf")}],
+}
+
+EXPECTED = {
+    "sharpe": None,
+    "max_drawdown": None,
+    "win_rate": 0.5,
+    "trades": 12,
+    "returns": [0.1, None, -0.2],
+    "generated_at": "2025-01-15T09:00:00",
+    "rows": [{"ts": 1, "close": None}],
+}
+
+def test_stdlib_fallback_matches_orjson(monkeypatch):
+    monkeypatch.setattr(serialization, "orjson", None)
+    assert json.loads(serialization.dumps(PAYLOAD)) == EXPECTED
+
+def test_orjson(monkeypatch):
+    if serialization.orjson is None:
+        pytest.skip("orjson이 설치되어 있지 않음")
+    assert json.loads(serialization.dumps(PAYLOAD)) == EXPECTED
+
+def test_msgpack_handles_numpy_and_datetime():
+    if serialization.msgpack is None:
+        pytest.skip("msgpack이 설치되어 있지 않음")
+    message = {"type": "snapshot", "data": {k: v for k, v in PAYLOAD.items() if k != "rows"}}
+    decoded = serialization.msgpack.unpackb(serialization.encode_ws_message(message, "msgpack"))
+    assert decoded["data"]["trades"] == 12
+    assert decoded["data"]["generated_at"] == "2025-01-15T09:00:00"
+    assert decoded["data"]["returns"][0] == 0.1